@@ -0,0 +1,346 @@
+"""
+Servidor de análise de longa duração, para editores e hooks de pre-commit: o
+interpretador e os backends são carregados uma única vez, e cada pedido só
+paga a análise. Os pedidos são atendidos por um pool de processos, então
+vários podem estar em andamento ao mesmo tempo.
+
+Protocolo: JSON-RPC 2.0, um objeto JSON por linha, pela entrada e saída
+padrão (padrão) ou por um socket Unix (--socket). As respostas saem na ordem
+em que ficam prontas, cada uma com o id do seu pedido. Métodos:
+
+    analyze       params: {"path": "..."} ou {"source": "...", "name": "..."},
+                  e opcionalmente "metrics" (lista ou texto, como em --metrics)
+                  e "timeout" (segundos; null desliga). Resultado: o registro
+                  do arquivo, como no formato jsonl do metrics.py.
+    list_metrics  nomes das métricas, das padrão e dos grupos.
+    ping          "pong".
+    shutdown      encerra o servidor depois dos pedidos em andamento.
+
+Exemplo:
+    $ echo '{"jsonrpc": "2.0", "id": 1, "method": "analyze", "params": {"source": "x = 1"}}' \\
+        | python analysisServer.py
+    {"jsonrpc": "2.0", "id": 1, "result": {"path": "<source>", "cyclomatic_complexity": 0, ...}}
+
+Teste de carga: server_load_test.py.
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+from multiprocessing import Pool, util
+
+from metrics import Metrics
+from metricsCache import DEFAULT_CACHE_DIR, CachedParseError
+from metricRegistry import registry
+from timeBudget import AnalysisTimeout
+
+# Códigos de erro do JSON-RPC 2.0 e os do servidor (-32000 a -32099)
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+ANALYSIS_FAILED = -32000
+FILE_NOT_FOUND = -32001
+
+DEFAULT_TIMEOUT = 30.0
+# Seleções de métricas diferentes guardadas em cada processo (cada uma com o seu engine e cache)
+MAX_ANALYZERS = 16
+# Código analisado antes de o pool ser criado, para que os processos já nasçam com tudo importado
+WARMUP_SOURCE = "def f(values):\n    for value in values:\n        if value and value > 1:\n            return value\n"
+
+# Estado de cada processo do pool, criado em init_server_worker
+_server_cache_dir = None
+_server_time_budget = None
+_server_analyzers = {}
+
+
+class RequestError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def init_server_worker(cache_dir, time_budget):
+    global _server_cache_dir, _server_time_budget
+    # Um print de algum backend não pode ir parar no canal das respostas (--stdio)
+    sys.stdout = sys.stderr
+    _server_cache_dir = cache_dir
+    _server_time_budget = time_budget
+    # Roda quando o processo sai depois de pool.close() (atexit não roda nos processos do pool)
+    util.Finalize(None, close_analyzers, exitpriority=10)
+
+
+def close_analyzers():
+    while _server_analyzers:
+        _, analyzer = _server_analyzers.popitem()
+        if analyzer.cache is not None:
+            analyzer.cache.close()
+
+
+def analyzer_for(metric_names):
+    key = tuple(metric_names)
+    analyzer = _server_analyzers.get(key)
+    if analyzer is None:
+        if len(_server_analyzers) >= MAX_ANALYZERS:
+            # Descarta a seleção mais antiga
+            oldest = _server_analyzers.pop(next(iter(_server_analyzers)))
+            if oldest.cache is not None:
+                oldest.cache.close()
+        analyzer = Metrics(Metrics.open_cache(_server_cache_dir, metric_names), None, metric_names)
+        _server_analyzers[key] = analyzer
+    return analyzer
+
+
+def analyze_request(params):
+    """
+    Executado em um processo do pool. Devolve {"result": ...} ou {"error": ...}.
+    """
+    try:
+        return {"result": analyze(params)}
+    except RequestError as e:
+        return error_reply(e.code, e.message)
+
+
+def analyze(params):
+    if not isinstance(params, dict):
+        raise RequestError(INVALID_PARAMS, "params must be an object")
+    path = params.get("path")
+    source = params.get("source")
+    if (path is None) == (source is None):
+        raise RequestError(INVALID_PARAMS, "give exactly one of 'path' or 'source'")
+    if not isinstance(path if path is not None else source, str):
+        raise RequestError(INVALID_PARAMS, "'path' and 'source' must be strings")
+    timeout = params.get("timeout", _server_time_budget)
+    if timeout is not None and (not isinstance(timeout, (int, float)) or timeout < 0):
+        raise RequestError(INVALID_PARAMS, "'timeout' must be a non-negative number or null")
+    try:
+        metric_names = [metric.name for metric in registry.resolve(params.get("metrics"))]
+    except (ValueError, TypeError) as e:
+        raise RequestError(INVALID_PARAMS, str(e)) from None
+
+    if path is not None:
+        name = path
+        try:
+            with open(path, 'r') as file:
+                source = file.read()
+        except FileNotFoundError:
+            raise RequestError(FILE_NOT_FOUND, f"The file '{path}' was not found.") from None
+        except (OSError, ValueError) as e:
+            raise RequestError(ANALYSIS_FAILED, f"Error opening the file: {e}") from None
+    else:
+        name = params.get("name") or "<source>"
+
+    analyzer = analyzer_for(metric_names)
+    # O processo atende um pedido por vez, então o limite do pedido pode ser trocado no analisador
+    analyzer.time_budget = timeout or None
+    try:
+        try:
+            metrics_info = analyzer.build_metrics_info(name, "", analyzer.analyze_source(source))
+        finally:
+            # Cada pedido confirma o que gravou: o processo fica vivo, e uma transação aberta
+            # travaria o cache para os outros processos e execuções
+            if analyzer.cache is not None:
+                analyzer.cache.commit()
+    except AnalysisTimeout:
+        metrics_info = analyzer.build_metrics_info(name, "", dict.fromkeys(metric_names), "timeout")
+    except (SyntaxError, ValueError, CachedParseError, sqlite3.Error) as e:
+        # sqlite3.Error: cache indisponível
+        raise RequestError(ANALYSIS_FAILED, f"Error analyzing '{name}': {e}") from None
+    return metrics_info.metrics_to_record()
+
+
+def list_metrics(params):
+    return {"metrics": list(registry.metrics), "default": registry.default_names(),
+            "groups": {group: list(names) for group, names in registry.groups.items()}}
+
+
+class Connection:
+    """
+    Um cliente (a entrada/saída padrão ou uma conexão do socket): respostas
+    escritas uma por vez, e a contagem dos pedidos ainda sem resposta.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.done = threading.Condition(self.lock)
+
+    def send(self, response):
+        line = json.dumps(response) + "\n"
+        with self.lock:
+            try:
+                self.writer.write(line)
+                self.writer.flush()
+            except (OSError, ValueError):
+                # Cliente já desconectado
+                pass
+
+    def begin(self):
+        with self.lock:
+            self.pending += 1
+
+    def finish(self, response):
+        if response is not None:
+            self.send(response)
+        with self.lock:
+            self.pending -= 1
+            self.done.notify_all()
+
+    def drain(self):
+        with self.lock:
+            while self.pending:
+                self.done.wait()
+
+
+def response(request_id, reply):
+    message = {"jsonrpc": "2.0", "id": request_id}
+    message.update(reply)
+    return message
+
+
+def error_reply(code, message):
+    return {"error": {"code": code, "message": message}}
+
+
+class AnalysisServer:
+    def __init__(self, jobs=0, cache_dir=None, time_budget=DEFAULT_TIMEOUT):
+        # Backends importados antes do fork: os processos do pool já nascem prontos
+        Metrics(metrics=[metric.name for metric in registry.resolve("all")]).engine.analyze(WARMUP_SOURCE)
+        self.jobs = jobs or os.cpu_count() or 1
+        self.pool = Pool(processes=self.jobs, initializer=init_server_worker, initargs=(cache_dir, time_budget))
+        self.stopping = threading.Event()
+
+    def handle_line(self, line, connection):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            connection.send(response(None, error_reply(PARSE_ERROR, "Parse error")))
+            return
+        if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or not isinstance(request.get("method"), str):
+            request_id = request.get("id") if isinstance(request, dict) else None
+            connection.send(response(request_id, error_reply(INVALID_REQUEST, "Invalid request (batches are not supported)")))
+            return
+
+        request_id = request.get("id")
+        # Notificação (sem id): executada, mas sem resposta
+        notification = "id" not in request
+        method = request["method"]
+        params = request.get("params", {})
+
+        if method == "analyze":
+            connection.begin()
+            self.pool.apply_async(
+                analyze_request, (params,),
+                callback=lambda reply: connection.finish(None if notification else response(request_id, reply)),
+                error_callback=lambda error: connection.finish(
+                    None if notification else response(request_id, error_reply(INTERNAL_ERROR, f"Internal error: {error}"))))
+            return
+
+        if method == "ping":
+            reply = {"result": "pong"}
+        elif method == "list_metrics":
+            reply = {"result": list_metrics(params)}
+        elif method == "shutdown":
+            self.stopping.set()
+            reply = {"result": "ok"}
+        else:
+            reply = error_reply(METHOD_NOT_FOUND, f"Method not found: {method}")
+        if not notification:
+            connection.send(response(request_id, reply))
+
+    def serve_stream(self, reader, writer):
+        connection = Connection(writer)
+        for line in reader:
+            if line.strip():
+                self.handle_line(line, connection)
+            if self.stopping.is_set():
+                break
+        # Fim da entrada: as respostas pendentes ainda são entregues
+        connection.drain()
+
+    def serve_stdio(self):
+        # Só as respostas vão para a saída padrão; qualquer outro print vai para stderr
+        writer = sys.stdout
+        sys.stdout = sys.stderr
+        self.serve_stream(sys.stdin, writer)
+
+    def serve_connection(self, client):
+        with client, client.makefile('r', encoding='utf-8') as reader, \
+                client.makefile('w', encoding='utf-8') as writer:
+            try:
+                self.serve_stream(reader, writer)
+            except OSError:
+                pass
+
+    def serve_socket(self, path):
+        if os.path.exists(path):
+            # Socket de uma execução anterior: só é removido se ninguém estiver ouvindo
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(path)
+                except OSError:
+                    os.unlink(path)
+                else:
+                    raise RuntimeError(f"Another server is already listening on '{path}'")
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(path)
+            server.listen()
+            # Acorda de tempos em tempos para ver se um shutdown foi pedido
+            server.settimeout(0.2)
+            print(f"Listening on {path} with {self.jobs} workers", file=sys.stderr)
+            while not self.stopping.is_set():
+                try:
+                    client, _ = server.accept()
+                except socket.timeout:
+                    continue
+                client.settimeout(None)
+                threading.Thread(target=self.serve_connection, args=(client,), daemon=True).start()
+        finally:
+            server.close()
+            os.unlink(path)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-lived metrics server speaking newline-delimited JSON-RPC 2.0 "
+                                                 "over stdin/stdout (default) or a Unix socket.")
+    parser.add_argument('--socket', type=str, default=None, metavar='PATH',
+                        help="Listen on this Unix socket instead of stdin/stdout.")
+    parser.add_argument('--jobs', '-j', type=int, default=0,
+                        help="Worker processes that analyze requests concurrently (default 0: every core).")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, metavar='SECONDS',
+                        help=f"Default wall-clock budget per request (default {DEFAULT_TIMEOUT:g}; 0 disables).")
+    parser.add_argument('--no-cache', action='store_true', help="Do not read or write the result cache.")
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR,
+                        help=f"Directory of the result cache (default: {DEFAULT_CACHE_DIR}).")
+    args = parser.parse_args()
+    if args.jobs < 0:
+        parser.error("--jobs must be a positive number of processes, or 0 for one per core")
+
+    server = AnalysisServer(args.jobs, None if args.no_cache else args.cache_dir, args.timeout or None)
+    try:
+        if args.socket:
+            server.serve_socket(args.socket)
+        else:
+            server.serve_stdio()
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
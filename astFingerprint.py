@@ -0,0 +1,204 @@
+"""
+Impressão digital estrutural de uma árvore do ast, para reaproveitar as
+métricas de soluções repetidas. Comentários, espaços e formatação já não
+aparecem na árvore; opcionalmente os identificadores são trocados por nomes
+canônicos (na ordem em que aparecem, de forma consistente) e as constantes
+pelo tipo delas.
+
+Nenhuma métrica estrutural depende do nome dos identificadores ou do valor das
+constantes, com duas exceções que a normalização preserva: funções chamadas
+`main` (fora da complexidade ciclomática) e chamadas recursivas da
+cognitive_complexity, que só comparam o nome da chamada com o da função e por
+isso continuam iguais com a troca consistente.
+"""
+import ast
+import hashlib
+import time
+
+DEDUPE_LEVELS = ("none", "ast", "names", "all")
+
+# Nomes que mudam o valor de alguma métrica e por isso não são canonizados
+PRESERVED_NAMES = frozenset({"main"})
+
+# Entradas do registro que dependem só da árvore; as demais (texto, tokens,
+# léxicas) dependem da formatação e são sempre recalculadas
+STRUCTURAL_INPUTS = frozenset({"ast", "traversal", "radon_functions"})
+
+
+def ast_fingerprint(tree, canonicalize_names=False, canonicalize_constants=False):
+    """
+    Hash (hex) da árvore em pré-ordem: tipo de cada nó e os valores dos campos,
+    com o tamanho de cada lista, o que torna a serialização inequívoca.
+    """
+    names = {}
+    parts = []
+    emit = parts.append
+    AST = ast.AST
+    Constant = ast.Constant
+
+    stack = [tree]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        node = pop()
+        if not isinstance(node, AST):
+            # Valores primitivos já convertidos, empilhados junto com os nós
+            emit(node)
+            continue
+
+        emit(type(node).__name__)
+        if type(node) is Constant:
+            value = node.value
+            emit(type(value).__name__ if canonicalize_constants else repr(value))
+            continue
+
+        # Campos empilhados de trás para frente: saem na ordem de _fields
+        for field in reversed(node._fields):
+            value = getattr(node, field, None)
+            if field == "type_comment" or field == "kind":
+                continue
+            if isinstance(value, list):
+                for item in reversed(value):
+                    push(item if isinstance(item, AST) else canonical_name(item, names, canonicalize_names))
+                push(f"[{len(value)}")
+            elif isinstance(value, AST):
+                push(value)
+            elif isinstance(value, str):
+                push(canonical_name(value, names, canonicalize_names))
+            else:
+                push(repr(value))
+
+    return hashlib.blake2b("\x00".join(parts).encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+def canonical_name(name, names, canonicalize):
+    if not canonicalize or not isinstance(name, str) or name in PRESERVED_NAMES:
+        return repr(name)
+    canonical = names.get(name)
+    if canonical is None:
+        canonical = names[name] = f"v{len(names)}"
+    return canonical
+
+
+class DedupeIndex:
+    """
+    Métricas já calculadas, em dois níveis. Um texto idêntico a outro já visto
+    (hash do código) reaproveita todas as métricas sem nem fazer o parse. Uma
+    solução cuja impressão digital da árvore já apareceu só recalcula as
+    métricas de texto (sloc, léxicas); as estruturais vêm da primeira solução
+    do grupo. Cada processo tem o seu índice; os grupos de duplicatas e os
+    contadores são juntados por um DedupeReport.
+    """
+
+    def __init__(self, level="ast"):
+        if level not in DEDUPE_LEVELS or level == "none":
+            raise ValueError(f"Invalid dedupe level '{level}'")
+        self.canonicalize_names = level in ("names", "all")
+        self.canonicalize_constants = level == "all"
+        # impressão digital -> (métricas estruturais, tempo da análise completa)
+        self.entries = {}
+        # hash do texto -> (impressão digital, valores de todas as métricas na ordem do engine)
+        self.text_entries = {}
+        # Impressão digital da última solução analisada, para o agrupamento das duplicatas
+        self.last_fingerprint = None
+        self.text_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.time_saved = 0.0
+        self.fingerprint_time = 0.0
+
+    def analyze(self, engine, source_code):
+        """
+        Mesmo resultado de engine.analyze(source_code), reaproveitando as
+        métricas de uma solução idêntica ou equivalente já vista.
+        """
+        start = time.perf_counter()
+        text_key = hashlib.blake2b(source_code.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        cached = self.text_entries.get(text_key)
+        if cached is not None:
+            fingerprint, values = cached
+            self.last_fingerprint = fingerprint
+            self.text_hits += 1
+            self.time_saved += max(self.entries[fingerprint][1] - (time.perf_counter() - start), 0.0)
+            return dict(zip(engine.metric_names, values))
+
+        tree = engine.parse(source_code)
+        fingerprint_start = time.perf_counter()
+        fingerprint = ast_fingerprint(tree, self.canonicalize_names, self.canonicalize_constants)
+        self.fingerprint_time += time.perf_counter() - fingerprint_start
+
+        entry = self.entries.get(fingerprint)
+        metrics = engine.analyze(source_code, tree=tree, known=entry[0] if entry else None)
+        elapsed = time.perf_counter() - start
+
+        if entry is None:
+            self.misses += 1
+            structural = {metric.name: metrics[metric.name] for metric in engine.metrics
+                          if metric.input in STRUCTURAL_INPUTS}
+            self.entries[fingerprint] = (structural, elapsed)
+        else:
+            self.hits += 1
+            self.time_saved += max(entry[1] - elapsed, 0.0)
+        self.text_entries[text_key] = (fingerprint, tuple(metrics.values()))
+        self.last_fingerprint = fingerprint
+        return metrics
+
+    def stats(self):
+        return {"text_hits": self.text_hits, "structure_hits": self.hits, "misses": self.misses,
+                "time_saved": self.time_saved, "fingerprint_time": self.fingerprint_time}
+
+
+class DedupeReport:
+    """
+    Grupos de soluções com a mesma impressão digital e contadores somados dos
+    DedupeIndex de cada processo. Os rótulos das soluções só são guardados
+    quando o relatório JSON é pedido; senão basta o tamanho de cada grupo.
+    """
+
+    def __init__(self, keep_labels=False):
+        self.keep_labels = keep_labels
+        # impressão digital -> lista de rótulos (ou quantidade de soluções)
+        self.groups = {}
+        # Contadores acumulados de cada processo; vale o último recebido de cada um
+        self.stats_by_worker = {}
+
+    def add(self, fingerprint, label):
+        if self.keep_labels:
+            self.groups.setdefault(fingerprint, []).append(label)
+        else:
+            self.groups[fingerprint] = self.groups.get(fingerprint, 0) + 1
+
+    def update_stats(self, worker, stats):
+        self.stats_by_worker[worker] = stats
+
+    def totals(self):
+        totals = {"text_hits": 0, "structure_hits": 0, "misses": 0, "time_saved": 0.0, "fingerprint_time": 0.0}
+        for stats in self.stats_by_worker.values():
+            for name, value in stats.items():
+                totals[name] += value
+        return totals
+
+    def duplicate_groups(self):
+        # Grupos com mais de uma solução, do maior para o menor
+        size = len if self.keep_labels else int
+        groups = [(fingerprint, members) for fingerprint, members in self.groups.items() if size(members) > 1]
+        groups.sort(key=lambda group: -size(group[1]))
+        return groups
+
+    def summary(self):
+        totals = self.totals()
+        reused = totals["text_hits"] + totals["structure_hits"]
+        total = reused + totals["misses"]
+        hit_rate = reused / total if total else 0.0
+        return (f"Dedupe: {reused} of {total} solutions reused ({hit_rate:.1%}: {totals['text_hits']} identical "
+                f"text, {totals['structure_hits']} same structure), {len(self.duplicate_groups())} duplicate groups, "
+                f"~{totals['time_saved']:.2f}s of analysis saved (fingerprinting cost {totals['fingerprint_time']:.2f}s)")
+
+    def write_report(self, report_path):
+        import json
+        groups = [{"fingerprint": fingerprint, "size": len(labels), "solutions": labels}
+                  for fingerprint, labels in self.duplicate_groups()]
+        report = self.totals()
+        report["groups"] = groups
+        with open(report_path, 'w') as file:
+            json.dump(report, file, indent=2)
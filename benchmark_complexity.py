@@ -0,0 +1,90 @@
+import ast
+import argparse
+import gc
+import time
+import myComplexity as mc
+
+
+def generate_nested_solution(depth, repeat=1):
+    """
+    Gera uma solução com `repeat` blocos de ifs aninhados até `depth` níveis, com
+    um laço em cada nível. É o pior caso da busca pelos pais da versão anterior.
+    """
+    lines = ["import sys", "n = int(sys.stdin.readline())", "total = 0"]
+    for block in range(repeat):
+        for level in range(depth):
+            indent = "    " * level
+            lines.append(f"{indent}if total % {level + 2} == {block}:")
+            lines.append(f"{indent}    for i in range(n):")
+            lines.append(f"{indent}        total += i * {level}")
+            lines.append(f"{indent}    while total > n:")
+            lines.append(f"{indent}        total -= n")
+        lines.append("    " * depth + "total -= 1")
+    lines.append("print(total)")
+    return "\n".join(lines) + "\n"
+
+
+def legacy_complexity(tree):
+    """
+    Implementação anterior de myComplexity: grava .parent em cada nó e sobe a
+    cadeia de pais para cada For/While. Mantida aqui só para comparação.
+    """
+    analyzer = mc.myComplexity()
+    complexity = 0
+    for node in ast.walk(tree):
+        for child in ast.iter_child_nodes(node):
+            child.parent = node
+        if isinstance(node, ast.If):
+            complexity += analyzer.if_complexity
+        elif isinstance(node, (ast.For, ast.While)):
+            parent = getattr(node, 'parent', None)
+            inside_loop = False
+            while parent:
+                if isinstance(parent, (ast.For, ast.While)):
+                    inside_loop = True
+                    break
+                parent = getattr(parent, 'parent', None)
+            weight = analyzer.for_complexity if isinstance(node, ast.For) else analyzer.while_complexity
+            complexity += weight + (analyzer.nested_loop if inside_loop else 0)
+        elif isinstance(node, ast.FunctionDef) and node.name != "main":
+            complexity += analyzer.function_complexity
+    return complexity
+
+
+def best_time(function, tree, rounds):
+    best = float('inf')
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            function(tree)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da complexidade ciclomática de myComplexity em soluções aninhadas.")
+    parser.add_argument('--depths', type=str, default="10,20,40,90", help="Profundidades de aninhamento, separadas por vírgula.")
+    parser.add_argument('--repeat', type=int, default=20, help="Quantidade de blocos aninhados por solução.")
+    parser.add_argument('--rounds', type=int, default=5, help="Repetições por medida (vale a melhor).")
+    args = parser.parse_args()
+
+    analyzer = mc.myComplexity()
+    print(f"{'depth':>6} {'nodes':>8} {'new (ms)':>10} {'ns/node':>9} {'legacy (ms)':>12} {'ns/node':>9}")
+    for depth in (int(value) for value in args.depths.split(',')):
+        # O parse fica fora da medida: só a travessia é comparada
+        tree = ast.parse(generate_nested_solution(depth, args.repeat))
+        nodes = sum(1 for _ in ast.walk(tree))
+
+        assert analyzer.calculateTreeComplexity(tree) == legacy_complexity(tree)
+        new_time = best_time(analyzer.calculateTreeComplexity, tree, args.rounds)
+        legacy_time = best_time(legacy_complexity, tree, args.rounds)
+
+        print(f"{depth:>6} {nodes:>8} {new_time * 1e3:>10.2f} {new_time / nodes * 1e9:>9.0f} "
+              f"{legacy_time * 1e3:>12.2f} {legacy_time / nodes * 1e9:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import argparse
+import contextlib
+import gc
+import glob
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import myComplexity as mc
+import lexicalMetrics
+from metrics import Metrics
+from metricsEngine import MetricsEngine
+from benchmark_complexity import generate_nested_solution
+
+
+def generate_large_module(repeat):
+    """
+    Módulo grande e determinístico: cada exemplo de code/ vira o corpo de uma
+    função, repetido `repeat` vezes.
+    """
+    parts = []
+    for copy in range(repeat):
+        for example_path in sorted(glob.glob('code/example*.py')):
+            with open(example_path, 'r') as file:
+                body = file.read()
+            name = os.path.splitext(os.path.basename(example_path))[0]
+            indented = "\n".join("    " + line if line.strip() else "" for line in body.splitlines())
+            parts.append(f"def {name}_{copy}():\n{indented}\n    return None\n")
+    return "\n\n".join(parts)
+
+
+def load_inputs():
+    """
+    Entradas fixas: os pares code/exampleN.py / code/exampleN_main.py e arquivos gerados maiores.
+    """
+    inputs = {}
+    for example_path in sorted(glob.glob('code/example*.py')):
+        with open(example_path, 'r') as file:
+            inputs[os.path.basename(example_path)] = file.read()
+    inputs["generated_module_x20"] = generate_large_module(20)
+    inputs["generated_nested_d40"] = generate_nested_solution(40, 5)
+    return inputs
+
+
+def metric_functions():
+    metrics = Metrics()
+    engine = MetricsEngine()
+    functions = {
+        "Metrics.calculate_unique_operators": metrics.calculate_unique_operators,
+        "Metrics.calculate_total_statements": metrics.calculate_total_statements,
+        "Metrics.calculate_cyclomatic_complexity": metrics.calculate_cyclomatic_complexity,
+        "Metrics.calculate_average_depth": metrics.calculate_average_depth,
+        "Metrics.calculate_total_operators": metrics.calculate_total_operators,
+        "Metrics.calculate_sloc": metrics.calculate_sloc,
+        "Metrics.calculate_cognitive_complexity": metrics.calculate_cognitive_complexity,
+        "Metrics.calculate_complexipy_cognitive_complexity": metrics.calculate_complexipy_cognitive_complexity,
+        "Metrics.radon_cc": metrics.radon_cc,
+        "myComplexity.calculateComplexity": lambda source_code: mc.myComplexity().calculateComplexity(source_code),
+        "MetricsEngine.analyze": engine.analyze,
+        "MetricsEngine.iter_functions": lambda source_code: list(engine.iter_functions(source_code)),
+        # Caminho léxico (sem parse) contra o caminho pela árvore para as mesmas contagens
+        "lexicalMetrics.lexical_metrics": lexicalMetrics.lexical_metrics,
+        "lexicalMetrics.lexical_metrics_tokenize": lexicalMetrics.lexical_metrics_tokenize,
+        "MetricsEngine.analyze[sloc,operators]": MetricsEngine(metrics="sloc,unique_operators,total_operators").analyze,
+    }
+
+    # metrics_no_class depende de pandas; fica de fora se não estiver instalado
+    try:
+        import metrics_no_class as mnc
+    except ImportError:
+        return functions
+    for name in ("calculate_unique_operators", "calculate_total_statements", "calculate_cyclomatic_complexity",
+                 "calculate_average_depth", "calculate_total_operators", "calculate_sloc",
+                 "calculate_cognitive_complexity", "radon_cc"):
+        functions[f"metrics_no_class.{name}"] = getattr(mnc, name)
+    return functions
+
+
+def time_call(function, argument, rounds, min_time):
+    """
+    Tempo por chamada (segundos): calibra o número de chamadas por rodada para
+    durar pelo menos min_time e devolve o mínimo e a mediana entre as rodadas.
+    """
+    # Algumas funções antigas imprimem durante o cálculo
+    with contextlib.redirect_stdout(io.StringIO()):
+        loops = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(loops):
+                function(argument)
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time or loops >= 1 << 20:
+                break
+            loops *= 2
+
+        samples = []
+        gc.disable()
+        try:
+            for _ in range(rounds):
+                start = time.perf_counter()
+                for _ in range(loops):
+                    function(argument)
+                samples.append((time.perf_counter() - start) / loops)
+        finally:
+            gc.enable()
+    return {"min": min(samples), "median": statistics.median(samples), "loops": loops, "rounds": rounds}
+
+
+def run_benchmarks(args):
+    inputs = load_inputs()
+    functions = metric_functions()
+    selected = [name for name in functions if not args.filter or args.filter in name]
+    results = {}
+
+    for function_name in selected:
+        for input_name, source_code in inputs.items():
+            key = f"{function_name}[{input_name}]"
+            results[key] = time_call(functions[function_name], source_code, args.rounds, args.min_time)
+            print(f"{key:<80} {results[key]['min'] * 1e6:>12.1f} us")
+
+    # process_file de ponta a ponta, lendo do disco e sem cache
+    if not args.filter or args.filter in "Metrics.process_file":
+        metrics = Metrics()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for input_name, source_code in inputs.items():
+                file_path = os.path.join(temp_dir, input_name if input_name.endswith('.py') else input_name + '.py')
+                with open(file_path, 'w') as file:
+                    file.write(source_code)
+                key = f"Metrics.process_file[{input_name}]"
+                results[key] = time_call(lambda path: metrics.process_file(path, None), file_path,
+                                         args.rounds, args.min_time)
+                print(f"{key:<80} {results[key]['min'] * 1e6:>12.1f} us")
+
+    report = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+    print(f"Resultados gravados em {args.output}")
+
+
+def compare_benchmarks(args):
+    with open(args.baseline, 'r') as file:
+        baseline = json.load(file)["results"]
+    with open(args.current, 'r') as file:
+        current = json.load(file)["results"]
+
+    regressions = 0
+    print(f"{'benchmark':<80} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for key in sorted(set(baseline) & set(current)):
+        before = baseline[key][args.statistic]
+        after = current[key][args.statistic]
+        ratio = after / before if before else float('inf')
+        flag = ""
+        if ratio > 1 + args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif ratio < 1 - args.threshold:
+            flag = "  faster"
+        print(f"{key:<80} {before * 1e6:>10.1f}us {after * 1e6:>10.1f}us {ratio:>7.2f}{flag}")
+
+    missing = set(baseline) - set(current)
+    if missing:
+        print(f"{len(missing)} medidas da linha de base ausentes na medição atual")
+
+    print(f"{regressions} regressões acima de {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks das funções de métricas.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Mede cada função de métrica e process_file.")
+    run_parser.add_argument('--output', '-o', type=str, default='bench_results.json', help="Arquivo JSON de saída.")
+    run_parser.add_argument('--rounds', type=int, default=5, help="Rodadas por medida.")
+    run_parser.add_argument('--min-time', type=float, default=0.05, help="Duração mínima de cada rodada, em segundos.")
+    run_parser.add_argument('--filter', type=str, default=None, help="Só mede funções cujo nome contém este texto.")
+
+    compare_parser = subparsers.add_parser('compare', help="Compara uma medição com uma linha de base.")
+    compare_parser.add_argument('baseline', type=str, help="JSON da linha de base.")
+    compare_parser.add_argument('current', type=str, help="JSON da medição atual.")
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help="Aumento relativo que conta como regressão (padrão 0.10).")
+    compare_parser.add_argument('--statistic', choices=('min', 'median'), default='min')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run_benchmarks(args)
+    else:
+        sys.exit(compare_benchmarks(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+# Latência alvo de uma execução a frio em um único arquivo (ganchos de editor)
+DEFAULT_TARGET_MS = 150.0
+
+
+def import_times(module):
+    """
+    Executa `python -X importtime -c "import <module>"` em um processo novo e
+    devolve (tempo cumulativo do módulo em us, lista de (cumulativo em us, nome)).
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    imports = []
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative), name.rstrip()))
+        if name.strip() == module:
+            total = int(cumulative)
+    return total, imports
+
+
+def command_latency(command, rounds):
+    # Tempo de parede de cada execução, em segundos, cada uma em um processo novo
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de inicialização: importações de metrics e latência a frio em um arquivo.")
+    parser.add_argument('--file', type=str, default='code/example1.py', help="Arquivo analisado na medida de latência.")
+    parser.add_argument('--rounds', type=int, default=10, help="Execuções por medida de latência.")
+    parser.add_argument('--top', type=int, default=15, help="Quantidade de importações mais caras listadas.")
+    parser.add_argument('--target-ms', type=float, default=DEFAULT_TARGET_MS,
+                        help=f"Mediana máxima aceita para a saída jsonl, em ms (padrão {DEFAULT_TARGET_MS:.0f}).")
+    args = parser.parse_args()
+
+    total, imports = import_times("metrics")
+    print(f"import metrics: {total / 1e3:.1f} ms")
+    for cumulative, name in sorted(imports, reverse=True)[:args.top]:
+        print(f"{cumulative / 1e3:>10.1f} ms  {name}")
+
+    metrics_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metrics.py')
+    baseline = command_latency([sys.executable, "-c", "pass"], args.rounds)
+    print(f"\n{'command':<40} {'min (ms)':>10} {'median (ms)':>12}")
+    print(f"{'python -c pass':<40} {min(baseline) * 1e3:>10.1f} {statistics.median(baseline) * 1e3:>12.1f}")
+
+    within_target = True
+    for output_format in ("jsonl", "table"):
+        samples = command_latency([sys.executable, metrics_script, args.file, "--no-cache", "--format", output_format],
+                                  args.rounds)
+        median = statistics.median(samples) * 1e3
+        print(f"{'metrics.py --format ' + output_format:<40} {min(samples) * 1e3:>10.1f} {median:>12.1f}")
+        if output_format == "jsonl" and median > args.target_ms:
+            within_target = False
+
+    if not within_target:
+        print(f"Latência a frio acima do alvo de {args.target_ms:.0f} ms")
+        sys.exit(1)
+    print(f"Latência a frio dentro do alvo de {args.target_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
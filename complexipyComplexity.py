@@ -0,0 +1,155 @@
+"""
+Complexidade cognitiva no nível de arquivo, compatível com a saída de
+`complexipy <path> -l file` (complexipy 0.4), calculada sobre a mesma árvore
+do ast usada pelas outras métricas.
+"""
+import ast
+
+
+def file_cognitive_complexity(tree):
+    """
+    Soma da complexidade de cada comando do módulo, começando com aninhamento 0.
+    """
+    return sum(statement_cognitive_complexity(node, 0) for node in tree.body)
+
+
+def is_decorator(node):
+    # Mesmo critério do complexipy: função cujo corpo é só uma função interna e um return
+    return (
+        type(node) is ast.FunctionDef
+        and len(node.body) == 2
+        and type(node.body[0]) is ast.FunctionDef
+        and type(node.body[1]) is ast.Return
+    )
+
+
+# Comandos com regra própria em statement_frame
+SCORED_STATEMENTS = frozenset((ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Assign, ast.For, ast.While,
+                               ast.If, ast.Try, ast.Match))
+
+
+def statement_cognitive_complexity(node, nesting_level):
+    """
+    Pilha explícita em vez de recursão: uma cadeia de elif, por exemplo, é um
+    If dentro do orelse do anterior, sem limite de tamanho no parser. Cada
+    quadro guarda a complexidade já somada do comando e os filhos que faltam;
+    quando os filhos terminam, o total do comando é combinado com o do pai.
+    """
+    stack = [statement_frame(node, nesting_level, False)]
+    while True:
+        frame = stack[-1]
+        children = frame[3]
+        if children:
+            child = children.pop()
+            # Comandos sem regra (expressões, return, import...) valem 0 e nem ganham quadro
+            if type(child[0]) in SCORED_STATEMENTS:
+                stack.append(statement_frame(*child))
+            continue
+
+        stack.pop()
+        complexity, nesting_level, node_type, _, is_orelse = frame
+        # try e match só somam o aninhamento quando algo dentro deles tem complexidade
+        if (node_type is ast.Try or node_type is ast.Match) and complexity > 0:
+            complexity += nesting_level
+        if not stack:
+            return complexity
+        # elif/else: só os ramos com complexidade entram, descontando o aninhamento de cada um
+        if is_orelse:
+            if complexity > 0:
+                stack[-1][0] += complexity - nesting_level
+        else:
+            stack[-1][0] += complexity
+
+
+def statement_frame(node, nesting_level, is_orelse):
+    """
+    Quadro [complexidade, aninhamento, tipo, filhos, é ramo elif/else] de um
+    comando: a complexidade começa com o termo do próprio comando, e cada filho
+    é (nó, aninhamento, é ramo elif/else).
+    """
+    if is_decorator(node):
+        return [0, nesting_level, None, [(node.body[0], nesting_level, False)], is_orelse]
+
+    complexity = 0
+    children = []
+    node_type = type(node)
+
+    if node_type is ast.FunctionDef or node_type is ast.AsyncFunctionDef:
+        for child in node.body:
+            if type(child) is ast.FunctionDef or type(child) is ast.AsyncFunctionDef:
+                children.append((child, nesting_level + 1, False))
+            else:
+                children.append((child, nesting_level, False))
+
+    elif node_type is ast.ClassDef:
+        children.extend((child, nesting_level, False) for child in node.body)
+
+    elif node_type is ast.Assign:
+        complexity += count_bool_ops(node.value, nesting_level)
+
+    elif node_type is ast.For:
+        complexity += 1 + nesting_level + count_bool_ops(node.iter, nesting_level)
+        children.extend((child, nesting_level + 1, False) for child in node.body)
+
+    elif node_type is ast.While:
+        complexity += 1 + nesting_level + count_bool_ops(node.test, nesting_level)
+        children.extend((child, nesting_level + 1, False) for child in node.body)
+
+    elif node_type is ast.If:
+        complexity += 1 + nesting_level + count_bool_ops(node.test, nesting_level)
+        children.extend((child, nesting_level + 1, False) for child in node.body)
+        children.extend((child, nesting_level, True) for child in node.orelse)
+
+    elif node_type is ast.Try:
+        complexity += len(node.handlers)
+        children.extend((child, nesting_level + 1, False) for child in node.body)
+        for handler in node.handlers:
+            children.extend((child, nesting_level + 1, False) for child in handler.body)
+        children.extend((child, nesting_level + 1, False) for child in node.orelse)
+        children.extend((child, nesting_level + 1, False) for child in node.finalbody)
+
+    elif node_type is ast.Match:
+        for case in node.cases:
+            children.extend((child, nesting_level + 1, False) for child in case.body)
+
+    return [complexity, nesting_level, node_type, children, is_orelse]
+
+
+def count_bool_ops(expr, nesting_level):
+    """
+    Pilha explícita em vez de recursão: cada nó soma só o seu próprio termo,
+    então a ordem da visita não muda o total e expressões aninhadas em qualquer
+    profundidade (`not not ... x`, `a if b else c if d else ...`) não estouram
+    o limite de recursão.
+    """
+    complexity = 0
+    stack = [expr]
+    pop = stack.pop
+    push = stack.append
+    extend = stack.extend
+    while stack:
+        expr = pop()
+        expr_type = type(expr)
+
+        if expr_type is ast.BoolOp:
+            complexity += 1
+            extend(expr.values)
+        elif expr_type is ast.UnaryOp:
+            push(expr.operand)
+        elif expr_type is ast.Compare:
+            push(expr.left)
+            extend(expr.comparators)
+        elif expr_type is ast.IfExp:
+            complexity += 1 + nesting_level
+            push(expr.test)
+            push(expr.body)
+            push(expr.orelse)
+        elif expr_type is ast.Call:
+            extend(expr.args)
+        elif expr_type is ast.Tuple or expr_type is ast.List or expr_type is ast.Set:
+            extend(expr.elts)
+        elif expr_type is ast.Dict:
+            extend(key for key in expr.keys if key is not None)
+            extend(expr.values)
+
+    return complexity
@@ -0,0 +1,208 @@
+import os
+import re
+import sys
+
+# Diretórios que nunca têm código a ser medido; podados antes de descer neles
+DEFAULT_IGNORED_DIRS = frozenset({
+    ".git", ".hg", ".svn", ".venv", "venv", "__pycache__", ".tox", ".nox",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".eggs", "node_modules", "site-packages",
+})
+
+
+def translate_pattern(pattern):
+    """
+    Converte um padrão no estilo do .gitignore em expressão regular sobre o
+    caminho relativo (com '/'): '*' e '?' não atravessam diretórios, '**' sim.
+    """
+    index = 0
+    parts = []
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+            continue
+        if pattern.startswith("**", index):
+            parts.append(".*")
+            index += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", index + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                content = pattern[index + 1:end]
+                if content.startswith("!"):
+                    content = "^" + content[1:]
+                parts.append("[" + content.replace("\\", "\\\\") + "]")
+                index = end
+        elif char == "\\" and index + 1 < len(pattern):
+            index += 1
+            parts.append(re.escape(pattern[index]))
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    return "".join(parts)
+
+
+class IgnoreRules:
+    """
+    Padrões de um arquivo .gitignore (ou de --exclude), relativos ao diretório
+    base. Vale a última regra que casar; '!' reinclui, '/' no fim só casa
+    diretórios e um padrão sem '/' casa o nome em qualquer nível.
+    """
+
+    def __init__(self, base, patterns):
+        self.base = base
+        self.rules = []
+        for line in patterns:
+            line = line.rstrip("\n")
+            if line.endswith("\\ "):
+                line = line[:-2] + " "
+            else:
+                line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            elif line.startswith("\\"):
+                line = line[1:]
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if not line:
+                continue
+            regex = translate_pattern(line)
+            if not anchored:
+                regex = "(?:.*/)?" + regex
+            self.rules.append((re.compile(regex + r"\Z", re.DOTALL), negated, directory_only))
+
+    @classmethod
+    def from_file(cls, base, file_path):
+        try:
+            with open(file_path, "r", encoding="utf-8", errors="replace") as file:
+                return cls(base, file.readlines())
+        except OSError:
+            return None
+
+    def match(self, path, is_dir):
+        """
+        True se o caminho é ignorado, False se uma regra '!' o reinclui e None
+        se nenhuma regra casou (quem decide é o .gitignore de um nível acima).
+        """
+        relative = os.path.relpath(path, self.base).replace(os.sep, "/")
+        result = None
+        for regex, negated, directory_only in self.rules:
+            if directory_only and not is_dir:
+                continue
+            if regex.match(relative):
+                result = not negated
+        return result
+
+
+class FileDiscovery:
+    """
+    Busca dos arquivos .py com os.scandir. Os diretórios ignorados são podados
+    antes da descida, e os arquivos são produzidos à medida que aparecem, para
+    que a análise comece antes de a busca terminar.
+    """
+
+    def __init__(self, excludes=(), use_gitignore=True, ignored_dirs=DEFAULT_IGNORED_DIRS):
+        self.excludes = list(excludes)
+        self.use_gitignore = use_gitignore
+        self.ignored_dirs = ignored_dirs
+
+    def is_ignored(self, path, is_dir, rules_chain, exclude_rules):
+        if exclude_rules is not None and exclude_rules.match(path, is_dir):
+            return True
+        # O .gitignore mais profundo tem a palavra final
+        for rules in reversed(rules_chain):
+            result = rules.match(path, is_dir)
+            if result is not None:
+                return result
+        return False
+
+    def iter_files(self, root, on_directory=None):
+        """
+        on_directory, se dado, é chamado com cada diretório logo antes de ele
+        ser listado (o --watch guarda o estado dele para saber quando listar de novo).
+        """
+        exclude_rules = IgnoreRules(root, self.excludes) if self.excludes else None
+        stack = [(root, ())]
+        while stack:
+            directory, rules_chain = stack.pop()
+            if on_directory is not None:
+                on_directory(directory)
+            try:
+                with os.scandir(directory) as iterator:
+                    entries = sorted(iterator, key=lambda entry: entry.name)
+            except OSError as e:
+                print(f"Error reading directory '{directory}': {e}", file=sys.stderr)
+                continue
+
+            if self.use_gitignore:
+                for entry in entries:
+                    if entry.name == ".gitignore":
+                        rules = IgnoreRules.from_file(directory, entry.path)
+                        if rules is not None and rules.rules:
+                            rules_chain = rules_chain + (rules,)
+                        break
+
+            subdirectories = []
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if is_dir:
+                    if entry.name in self.ignored_dirs:
+                        continue
+                    if not self.is_ignored(entry.path, True, rules_chain, exclude_rules):
+                        subdirectories.append((entry.path, rules_chain))
+                elif entry.name.endswith(".py"):
+                    if not self.is_ignored(entry.path, False, rules_chain, exclude_rules):
+                        yield entry.path
+
+            # Invertidos para que a pilha visite os subdiretórios em ordem alfabética
+            stack.extend(reversed(subdirectories))
+
+    def iter_paths(self, paths, on_directory=None):
+        """
+        Caminhos vindos de uma lista (--files0-from): arquivos são usados como
+        estão e diretórios são percorridos com as regras de ignore.
+        """
+        for path in paths:
+            if os.path.isdir(path):
+                yield from self.iter_files(path, on_directory)
+            else:
+                if on_directory is not None:
+                    # O arquivo pode sumir e voltar: o diretório dele também é observado
+                    on_directory(os.path.dirname(path) or ".")
+                yield path
+
+
+def read_paths0(stream, chunk_size=65536):
+    """
+    Lê caminhos separados por NUL (como `find -print0` ou `git ls-files -z`),
+    entregando cada um assim que chega.
+    """
+    # read1 devolve o que já chegou, sem esperar o bloco inteiro
+    read = getattr(stream, "read1", stream.read)
+    pending = b""
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        pending += chunk
+        *paths, pending = pending.split(b"\0")
+        for path in paths:
+            if path:
+                yield os.fsdecode(path)
+    if pending:
+        yield os.fsdecode(pending)
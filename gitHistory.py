@@ -0,0 +1,321 @@
+"""
+Métricas ao longo do histórico de um repositório git (--git-range A..B), sem
+checkout: commits, árvores e arquivos são lidos dos objetos do git por um
+único processo `git cat-file --batch`.
+
+Os resultados são guardados pelo hash do blob, então cada versão distinta de
+um arquivo é analisada uma única vez, não importa em quantos commits ela
+apareça; a lista de arquivos de cada árvore também fica guardada pelo hash da
+árvore, e um diretório que não mudou não é lido de novo. A saída é uma série
+temporal com uma linha por commit: quantidade de arquivos, blobs novos e, para
+cada métrica, soma, média e máximo entre os arquivos do commit.
+"""
+import csv
+import importlib.util
+import json
+import subprocess
+import sys
+import threading
+from datetime import datetime, timezone
+
+from fileDiscovery import IgnoreRules
+from timeBudget import AnalysisTimeout
+
+TREE_MODE = b"40000"
+# Arquivos comuns e executáveis; links simbólicos e submódulos ficam de fora
+BLOB_MODES = frozenset((b"100644", b"100755"))
+
+# Instância de cada processo do pool, criada em init_blob_worker
+_blob_metrics = None
+
+
+def run_git(directory, *args):
+    result = subprocess.run(["git", "-C", directory, *args], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ValueError(result.stderr.strip() or f"git {args[0]} failed")
+    return result.stdout.strip()
+
+
+def init_blob_worker(cache_dir, metric_names, time_budget):
+    global _blob_metrics
+    # Import tardio: metrics importa este módulo
+    from metrics import Metrics
+    from multiprocessing import util
+    _blob_metrics = Metrics(Metrics.open_cache(cache_dir, metric_names), None, metric_names, time_budget)
+    # Fecha o cache quando um processo do pool sai normalmente (atexit não roda nos processos do pool)
+    util.Finalize(None, close_blob_worker, exitpriority=10)
+
+
+def close_blob_worker():
+    global _blob_metrics
+    if _blob_metrics is not None and _blob_metrics.cache is not None:
+        _blob_metrics.cache.close()
+    _blob_metrics = None
+
+
+def analyze_blob(task):
+    """
+    (blob, rótulo, conteúdo) -> (blob, métricas, erro). As marcas de fim de
+    commit (blob None) passam direto, na ordem.
+    """
+    blob, label, data = task
+    if blob is None:
+        return task
+    try:
+        # Mesma decodificação do import: BOM, comentário de encoding e quebras de linha
+        code = importlib.util.decode_source(data)
+        return blob, _blob_metrics.analyze_source(code), None
+    except AnalysisTimeout as e:
+        return blob, None, f"Timeout analyzing '{label}': {e}"
+    except Exception as e:
+        # A falha fica restrita ao blob: erro de sintaxe, entrada negativa do cache, cache indisponível...
+        return blob, None, f"Error analyzing '{label}': {e}"
+    finally:
+        # Cada blob confirma o que gravou: um pool encerrado com terminate() não perde nada
+        if _blob_metrics.cache is not None:
+            _blob_metrics.cache.commit()
+
+
+class CatFileBatch:
+    """
+    Um processo `git cat-file --batch` para todas as leituras: pede-se um
+    objeto por linha e a resposta vem com o tipo e o tamanho.
+    """
+
+    def __init__(self, repository):
+        self.process = subprocess.Popen(["git", "-C", repository, "cat-file", "--batch"],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def read(self, sha, expected_type):
+        self.process.stdin.write(sha.encode("ascii") + b"\n")
+        self.process.stdin.flush()
+        header = self.process.stdout.readline().split()
+        if len(header) != 3:
+            raise ValueError(f"git object {sha} is missing")
+        object_type, size = header[1].decode("ascii"), int(header[2])
+        data = self.process.stdout.read(size)
+        # Quebra de linha depois do conteúdo
+        self.process.stdout.read(1)
+        if object_type != expected_type:
+            raise ValueError(f"git object {sha} is a {object_type}, expected a {expected_type}")
+        return data
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+
+class GitCommit:
+    __slots__ = ("sha", "tree", "timestamp", "subject")
+
+    def __init__(self, sha, data):
+        self.sha = sha
+        header, _, message = data.partition(b"\n\n")
+        self.tree = None
+        self.timestamp = None
+        for line in header.split(b"\n"):
+            if line.startswith(b"tree ") and self.tree is None:
+                self.tree = line[5:].decode("ascii")
+            elif line.startswith(b"committer "):
+                # committer Nome <email> 1700000000 +0000
+                self.timestamp = int(line.rsplit(b" ", 2)[1])
+        self.subject = message.split(b"\n", 1)[0].decode("utf-8", "replace")
+
+
+class GitHistory:
+    """
+    Commits de um intervalo e os arquivos .py de cada um, restritos ao
+    subdiretório pedido (path dentro do repositório) e aos --exclude.
+    """
+
+    def __init__(self, path=".", excludes=()):
+        self.top = run_git(path, "rev-parse", "--show-toplevel")
+        # Caminho de path dentro do repositório ('' na raiz, 'src/' em um subdiretório)
+        self.prefix = run_git(path, "rev-parse", "--show-prefix")
+        object_format = subprocess.run(["git", "-C", path, "rev-parse", "--show-object-format"],
+                                       capture_output=True, text=True).stdout.strip()
+        self.hash_size = 32 if object_format == "sha256" else 20
+        self.exclude_rules = IgnoreRules(".", excludes) if excludes else None
+        # caminho -> excluído ou não (diretórios e arquivos já decididos)
+        self.excluded = {}
+        # hash da árvore -> ((caminho relativo, hash do blob), ...) dos arquivos .py abaixo dela
+        self.tree_files = {}
+        self.batch = CatFileBatch(self.top)
+
+    def commits(self, revision_range):
+        # Do mais antigo ao mais novo, como uma série temporal
+        for sha in run_git(self.top, "rev-list", "--reverse", revision_range, "--").split():
+            yield GitCommit(sha, self.batch.read(sha, "commit"))
+
+    def tree_entries(self, sha):
+        data = self.batch.read(sha, "tree")
+        hash_size = self.hash_size
+        entries = []
+        position = 0
+        # Cada entrada: "<modo> <nome>\0<hash binário>"
+        while position < len(data):
+            space = data.index(b" ", position)
+            nul = data.index(b"\0", space)
+            entries.append((data[position:space], data[space + 1:nul].decode("utf-8", "surrogateescape"),
+                            data[nul + 1:nul + 1 + hash_size].hex()))
+            position = nul + 1 + hash_size
+        return entries
+
+    def files_of_tree(self, sha):
+        files = self.tree_files.get(sha)
+        if files is None:
+            files = []
+            for mode, name, child in self.tree_entries(sha):
+                if mode == TREE_MODE:
+                    files.extend((f"{name}/{path}", blob) for path, blob in self.files_of_tree(child))
+                elif mode in BLOB_MODES and name.endswith(".py"):
+                    files.append((name, child))
+            files = self.tree_files[sha] = tuple(files)
+        return files
+
+    def is_excluded(self, path):
+        # Um arquivo é excluído se ele ou algum diretório acima dele casar com um --exclude
+        if self.exclude_rules is None:
+            return False
+        parts = path.split("/")
+        for depth in range(1, len(parts) + 1):
+            partial = "/".join(parts[:depth])
+            excluded = self.excluded.get(partial)
+            if excluded is None:
+                excluded = self.excluded[partial] = bool(self.exclude_rules.match(partial, depth < len(parts)))
+            if excluded:
+                return True
+        return False
+
+    def python_files(self, commit):
+        """
+        [(caminho no repositório, hash do blob)] dos arquivos .py do commit.
+        """
+        tree = commit.tree
+        for part in self.prefix.strip("/").split("/") if self.prefix else ():
+            tree = next((child for mode, name, child in self.tree_entries(tree)
+                         if mode == TREE_MODE and name == part), None)
+            if tree is None:
+                # O subdiretório ainda não existia neste commit
+                return []
+        return [(self.prefix + path, blob) for path, blob in self.files_of_tree(tree)
+                if not self.is_excluded(self.prefix + path)]
+
+    def iter_blob_tasks(self, commits, scheduled, open_commits, in_flight=None, stop=None):
+        """
+        Blobs ainda não vistos de cada commit, seguidos de uma marca de fim do
+        commit; os dados do commit ficam em open_commits até a marca voltar.
+        """
+        for index, commit in enumerate(commits):
+            files = self.python_files(commit)
+            new_blobs = 0
+            for path, blob in files:
+                if blob in scheduled:
+                    continue
+                scheduled.add(blob)
+                new_blobs += 1
+                if in_flight is not None:
+                    in_flight.acquire()
+                    if stop.is_set():
+                        return
+                yield blob, f"{path}@{commit.sha[:12]}", self.batch.read(blob, "blob")
+            open_commits[index] = (commit, files, new_blobs)
+            if in_flight is not None:
+                in_flight.acquire()
+                if stop.is_set():
+                    return
+            yield None, index, None
+
+    def run(self, revision_range, metric_names, emit, jobs=1, cache_dir=None, time_budget=None, chunksize=8):
+        """
+        Analisa cada blob distinto do intervalo uma vez e chama emit com a
+        linha de cada commit, em ordem. Devolve (commits, blobs analisados,
+        versões de arquivo).
+        """
+        # hash do blob -> métricas (None se a análise falhou)
+        blob_metrics = {}
+        scheduled = set()
+        open_commits = {}
+        jobs = jobs or 1
+        in_flight = threading.Semaphore(chunksize * jobs * 4) if jobs > 1 else None
+        stop = threading.Event()
+        tasks = self.iter_blob_tasks(self.commits(revision_range), scheduled, open_commits, in_flight, stop)
+        commits = 0
+        file_versions = 0
+
+        if jobs == 1:
+            init_blob_worker(cache_dir, metric_names, time_budget)
+            pool = None
+            results = map(analyze_blob, tasks)
+        else:
+            from multiprocessing import Pool
+            pool = Pool(processes=jobs, initializer=init_blob_worker, initargs=(cache_dir, metric_names, time_budget))
+            results = pool.imap(analyze_blob, tasks, chunksize=chunksize)
+        completed = False
+        try:
+            for blob, value, error in results:
+                if in_flight is not None:
+                    in_flight.release()
+                if blob is not None:
+                    blob_metrics[blob] = value
+                    if error is not None:
+                        print(error, file=sys.stderr)
+                    continue
+                commit, files, new_blobs = open_commits.pop(value)
+                commits += 1
+                file_versions += len(files)
+                emit(commit_row(commit, files, new_blobs, blob_metrics, metric_names))
+            completed = True
+        finally:
+            # Libera a thread do pool que espera vaga no semáforo antes de fechar o pool
+            stop.set()
+            if in_flight is not None:
+                in_flight.release()
+            if pool is None:
+                close_blob_worker()
+            else:
+                if completed:
+                    # Todos os blobs voltaram: os processos saem sozinhos e fecham os seus caches
+                    pool.close()
+                else:
+                    pool.terminate()
+                pool.join()
+            self.batch.close()
+        return commits, len(blob_metrics), file_versions
+
+
+def commit_row(commit, files, new_blobs, blob_metrics, metric_names):
+    """
+    Linha da série temporal: o commit e, para cada métrica, soma, média e
+    máximo entre os arquivos com resultado.
+    """
+    row = {"commit": commit.sha,
+           "date": datetime.fromtimestamp(commit.timestamp, timezone.utc).isoformat() if commit.timestamp else "",
+           "subject": commit.subject, "files": len(files), "new_blobs": new_blobs}
+    analyzed = [blob_metrics[blob] for _, blob in files if blob_metrics.get(blob) is not None]
+    row["failed"] = len(files) - len(analyzed)
+    for metric in metric_names:
+        values = [metrics[metric] for metrics in analyzed if metrics[metric] is not None]
+        total = sum(values)
+        row[f"{metric}_sum"] = total
+        row[f"{metric}_mean"] = total / len(values) if values else None
+        row[f"{metric}_max"] = max(values) if values else None
+    return row
+
+
+class TimeSeriesWriter:
+    # Linhas da série no formato jsonl ou csv, gravadas assim que cada commit termina
+    def __init__(self, output_format, stream):
+        self.output_format = output_format
+        self.stream = stream
+        self.writer = None
+
+    def row(self, row):
+        if self.output_format == "jsonl":
+            self.stream.write(json.dumps(row) + "\n")
+        else:
+            if self.writer is None:
+                self.writer = csv.DictWriter(self.stream, fieldnames=list(row))
+                self.writer.writeheader()
+            self.writer.writerow(row)
+        self.stream.flush()
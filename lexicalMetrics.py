@@ -0,0 +1,293 @@
+"""
+Métricas léxicas calculadas em uma única passada pelos tokens, sem ast.parse:
+linhas de código, de comentário e em branco, e o conjunto de Halstead. Nada
+de lista de tokens nem de árvore, então arquivos muito grandes ou que nem
+passam pelo parse também são medidos.
+
+Convenções:
+    - Uma linha lógica formada só por strings (docstrings, blocos '''...''' de
+      exemplo) não conta como código nem entra no Halstead.
+    - Linha de código: coberta por algum token de uma linha lógica que conta.
+    - Linha de comentário: tem um token COMMENT (inclusive no fim de uma linha de código).
+    - Linha em branco: não é coberta por nenhum token (strings de várias linhas
+      cobrem todas as suas linhas).
+    - Operadores: tokens OP (parênteses, colchetes e chaves contam uma vez, na
+      abertura) e palavras reservadas; operandos: nomes, números, strings,
+      True, False e None.
+"""
+import io
+import keyword
+import math
+import re
+import tokenize
+
+LEXICAL_FIELDS = ("lexical_sloc", "comment_lines", "blank_lines",
+                  "halstead_n1", "halstead_n2", "halstead_N1", "halstead_N2",
+                  "halstead_volume", "halstead_difficulty", "halstead_effort")
+
+KEYWORD_OPERATORS = frozenset(keyword.kwlist) - {"True", "False", "None"}
+CLOSING_BRACKETS = frozenset(")]}")
+
+STRING_PREFIX = r"(?:[rRbBuUfF]{1,2})?"
+# Mesmas classes de token do tokenize. Strings de três aspas sem fechamento
+# vão até o fim do arquivo; qualquer outro caractere solto vira um operando
+# (como o ERRORTOKEN do tokenize).
+TOKEN_PATTERN = re.compile("|".join((
+    r"(?P<newline>\r?\n)",
+    r"(?P<space>[ \t\f\r]+|\\\r?\n)",
+    r"(?P<comment>#[^\r\n]*)",
+    r"(?P<string>" + STRING_PREFIX + r"(?:'''(?:[^'\\]|\\[\s\S]|'(?!''))*(?:'''|\Z)"
+    + r'|"""(?:[^"\\]|\\[\s\S]|"(?!""))*(?:"""|\Z)'
+    + r"|'(?:[^'\\\r\n]|\\[\s\S])*'"
+    + r'|"(?:[^"\\\r\n]|\\[\s\S])*"))',
+    r"(?P<number>0[xXoObB][0-9a-fA-F_]+|(?:\d[\d_]*\.?[\d_]*|\.\d[\d_]*)(?:[eE][-+]?\d[\d_]*)?[jJ]?)",
+    r"(?P<name>\w+)",
+    r"(?P<op>\*\*=|//=|>>=|<<=|\.\.\.|->|:=|[-+*/%&|^@<>=!]=|\*\*|//|<<|>>|[-+*/%&|^~@<>=.,:;()\[\]{}])",
+    r"(?P<error>.)",
+)))
+
+# Tokens do tokenize que não cobrem linha nenhuma
+LAYOUT_TOKENS = frozenset((tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER))
+# Python 3.12+ divide f-strings em vários tokens; antes disso são um STRING só
+FSTRING_START = getattr(tokenize, "FSTRING_START", None)
+FSTRING_END = getattr(tokenize, "FSTRING_END", None)
+
+
+def lexical_metrics(source_code):
+    """
+    Dicionário com os campos de LEXICAL_FIELDS. Mesmo resultado de
+    lexical_metrics_tokenize, mas com uma única expressão regular compilada
+    percorrendo o texto: o tokenize em Python puro é mais lento que o próprio
+    ast.parse.
+    """
+    keyword_operators = KEYWORD_OPERATORS
+    closing_brackets = CLOSING_BRACKETS
+
+    operators = {}
+    operands = {}
+    total_operators = 0
+    total_operands = 0
+
+    code_lines = 0
+    comment_lines = 0
+    covered_lines = 0
+    last_covered_row = 0
+
+    row = 1
+    bracket_depth = 0
+    # Linha lógica atual: linhas cobertas, se já começou e se até agora só teve strings
+    line_rows = 0
+    line_last_row = 0
+    line_started = False
+    only_strings = True
+    # Strings da linha lógica atual, guardadas até se saber se ela é só de strings
+    pending_strings = []
+
+    for match in TOKEN_PATTERN.finditer(source_code):
+        kind = match.lastgroup
+        if kind == "space":
+            if match.group().endswith("\n"):
+                row += 1
+            continue
+        if kind == "newline":
+            # Dentro de parênteses a quebra de linha não encerra a linha lógica
+            if bracket_depth == 0 and line_started:
+                if not only_strings:
+                    code_lines += line_rows
+                line_rows = 0
+                line_last_row = 0
+                line_started = False
+                only_strings = True
+                pending_strings = []
+            row += 1
+            continue
+
+        text = match.group()
+        start_row = row
+        if kind == "string":
+            row += text.count("\n")
+
+        # Linhas cobertas por algum token, para as linhas em branco
+        if row > last_covered_row:
+            covered_lines += row - max(start_row, last_covered_row + 1) + 1
+            last_covered_row = row
+
+        if kind == "comment":
+            comment_lines += 1
+            continue
+
+        line_started = True
+        if row > line_last_row:
+            line_rows += row - max(start_row, line_last_row + 1) + 1
+            line_last_row = row
+
+        if kind == "string":
+            if only_strings:
+                pending_strings.append(text)
+            else:
+                operands[text] = operands.get(text, 0) + 1
+                total_operands += 1
+            continue
+
+        if only_strings:
+            only_strings = False
+            for pending in pending_strings:
+                operands[pending] = operands.get(pending, 0) + 1
+            total_operands += len(pending_strings)
+            pending_strings = []
+
+        if kind == "op":
+            if text in closing_brackets:
+                if bracket_depth:
+                    bracket_depth -= 1
+            else:
+                if text in "([{":
+                    bracket_depth += 1
+                operators[text] = operators.get(text, 0) + 1
+                total_operators += 1
+        elif kind == "name" and text in keyword_operators:
+            operators[text] = operators.get(text, 0) + 1
+            total_operators += 1
+        else:
+            operands[text] = operands.get(text, 0) + 1
+            total_operands += 1
+
+    # Última linha lógica, sem '\n' no fim do arquivo
+    if line_started and not only_strings:
+        code_lines += line_rows
+    total_rows = source_code.count("\n") + (1 if source_code and not source_code.endswith("\n") else 0)
+    return halstead_summary(code_lines, comment_lines, max(total_rows - covered_lines, 0),
+                            operators, operands, total_operators, total_operands)
+
+
+def lexical_metrics_tokenize(source_code):
+    # Versão de referência sobre o tokenize, usada para conferir lexical_metrics
+    return analyze_tokens(tokenize.generate_tokens(io.StringIO(source_code).readline))
+
+
+def analyze_tokens(tokens):
+    """
+    Consome um iterador de tokens (tokenize.generate_tokens) à medida que eles
+    saem. Um erro de tokenização só encerra a contagem naquele ponto.
+    """
+    NAME = tokenize.NAME
+    OP = tokenize.OP
+    STRING = tokenize.STRING
+    COMMENT = tokenize.COMMENT
+    NEWLINE = tokenize.NEWLINE
+    ENDMARKER = tokenize.ENDMARKER
+    layout_tokens = LAYOUT_TOKENS
+    keyword_operators = KEYWORD_OPERATORS
+    closing_brackets = CLOSING_BRACKETS
+
+    operators = {}
+    operands = {}
+    total_operators = 0
+    total_operands = 0
+
+    code_lines = 0
+    comment_lines = 0
+    covered_lines = 0
+    last_covered_row = 0
+    total_rows = 0
+
+    line_rows = 0
+    line_last_row = 0
+    only_strings = True
+    pending_strings = []
+    fstring_depth = 0
+
+    try:
+        for token_type, string, start, end, _ in tokens:
+            start_row = start[0]
+            end_row = end[0]
+
+            if token_type in layout_tokens:
+                if token_type == NEWLINE:
+                    if not only_strings:
+                        code_lines += line_rows
+                    line_rows = 0
+                    line_last_row = 0
+                    only_strings = True
+                    pending_strings = []
+                elif token_type == ENDMARKER:
+                    total_rows = start_row - 1
+                continue
+
+            if end_row > last_covered_row:
+                covered_lines += end_row - max(start_row, last_covered_row + 1) + 1
+                last_covered_row = end_row
+
+            if token_type == COMMENT:
+                comment_lines += 1
+                continue
+
+            if end_row > line_last_row:
+                line_rows += end_row - max(start_row, line_last_row + 1) + 1
+                line_last_row = end_row
+
+            if fstring_depth:
+                # Partes internas de uma f-string (3.12+): a string já contou como operando
+                if token_type == FSTRING_START:
+                    fstring_depth += 1
+                elif token_type == FSTRING_END:
+                    fstring_depth -= 1
+                continue
+
+            if token_type == STRING or token_type == FSTRING_START:
+                if token_type == FSTRING_START:
+                    fstring_depth = 1
+                if only_strings:
+                    pending_strings.append(string)
+                else:
+                    operands[string] = operands.get(string, 0) + 1
+                    total_operands += 1
+                continue
+
+            if only_strings:
+                only_strings = False
+                for pending in pending_strings:
+                    operands[pending] = operands.get(pending, 0) + 1
+                total_operands += len(pending_strings)
+                pending_strings = []
+
+            if token_type == OP:
+                if string not in closing_brackets:
+                    operators[string] = operators.get(string, 0) + 1
+                    total_operators += 1
+            elif token_type == NAME and string in keyword_operators:
+                operators[string] = operators.get(string, 0) + 1
+                total_operators += 1
+            else:
+                operands[string] = operands.get(string, 0) + 1
+                total_operands += 1
+    except (tokenize.TokenError, SyntaxError):
+        # Arquivo quebrado: a linha lógica interrompida conta como código
+        if not only_strings:
+            code_lines += line_rows
+        total_rows = max(total_rows, last_covered_row)
+
+    return halstead_summary(code_lines, comment_lines, max(total_rows - covered_lines, 0),
+                            operators, operands, total_operators, total_operands)
+
+
+def halstead_summary(code_lines, comment_lines, blank_lines, operators, operands, total_operators, total_operands):
+    distinct_operators = len(operators)
+    distinct_operands = len(operands)
+    vocabulary = distinct_operators + distinct_operands
+    length = total_operators + total_operands
+    volume = length * math.log2(vocabulary) if vocabulary else 0.0
+    difficulty = (distinct_operators / 2) * (total_operands / distinct_operands) if distinct_operands else 0.0
+
+    return {
+        "lexical_sloc": code_lines,
+        "comment_lines": comment_lines,
+        "blank_lines": blank_lines,
+        "halstead_n1": distinct_operators,
+        "halstead_n2": distinct_operands,
+        "halstead_N1": total_operators,
+        "halstead_N2": total_operands,
+        "halstead_volume": volume,
+        "halstead_difficulty": difficulty,
+        "halstead_effort": difficulty * volume,
+    }
@@ -0,0 +1,331 @@
+"""
+Junta as saídas das partes de um --shard (metrics.py ou
+process_dataset_metrics.py) em um único resultado em ordem determinística:
+arquivos pelo caminho, linhas do dataset por (dataset_index, solution_number).
+Antes de gravar confere, pelos manifestos das partes, que todas as partes
+estão presentes, que cada item está na parte certa e que nenhum item falta
+nem aparece duas vezes. Nada é gravado se a conferência falhar.
+
+Teste local, cada parte em um processo:
+    for i in 0 1 2 3; do python metrics.py code --shard $i/4 -o out.jsonl & done; wait
+    python merge_shards.py -o merged.jsonl out.shard-*-of-4.jsonl
+"""
+import argparse
+import csv
+import heapq
+import json
+import os
+import sys
+
+from metricSummary import SummaryStats
+from shardAssignment import read_shard_manifest, shard_of_index, shard_of_path
+
+# Quantidade máxima de problemas listados na mensagem de erro
+MAX_REPORTED_ERRORS = 20
+
+
+class ShardCheck:
+    # Acumula os problemas encontrados para mostrar todos de uma vez
+    def __init__(self):
+        self.errors = []
+
+    def error(self, message):
+        self.errors.append(message)
+
+    def raise_if_failed(self):
+        if not self.errors:
+            return
+        shown = self.errors[:MAX_REPORTED_ERRORS]
+        if len(self.errors) > len(shown):
+            shown.append(f"... and {len(self.errors) - len(shown)} more")
+        raise ValueError("Shard outputs are inconsistent:\n  " + "\n  ".join(shown))
+
+
+def load_shards(shard_outputs):
+    """
+    Lê o manifesto de cada saída e confere que todas são do mesmo tipo e da
+    mesma configuração, e que cada parte de 0 a N-1 aparece exatamente uma vez.
+    Devolve [(caminho, manifesto)] na ordem das partes.
+    """
+    shards = [(path, read_shard_manifest(path)) for path in shard_outputs]
+    if not shards:
+        raise ValueError("No shard outputs given")
+    first = shards[0][1]
+    for path, manifest in shards:
+        for field in ("kind", "count", "metrics", "format"):
+            if manifest.get(field) != first.get(field):
+                raise ValueError(f"'{path}' has {field}={manifest.get(field)!r}, "
+                                 f"but '{shards[0][0]}' has {first.get(field)!r}")
+
+    count = first["count"]
+    by_index = {}
+    for path, manifest in shards:
+        if manifest["shard"] in by_index:
+            raise ValueError(f"Shard {manifest['shard']}/{count} given twice: "
+                             f"'{by_index[manifest['shard']][0]}' and '{path}'")
+        by_index[manifest["shard"]] = (path, manifest)
+    missing = [str(index) for index in range(count) if index not in by_index]
+    if missing:
+        raise ValueError(f"Missing shard(s) {', '.join(missing)} of {count}")
+    return [by_index[index] for index in range(count)]
+
+
+def load_summaries(shards, check, rows_per_shard):
+    """
+    Junta, na ordem das partes, os resumos das distribuições listados nos
+    manifestos, conferindo que cada um cobre as linhas da sua parte. Devolve
+    None se as partes não gravaram resumo.
+    """
+    with_summary = [path for path, manifest in shards if manifest.get("summary")]
+    if not with_summary:
+        return None
+    if len(with_summary) != len(shards):
+        check.error("Only some shards have a summary: " + ", ".join(f"'{path}'" for path in with_summary))
+        return None
+    merged = None
+    for (path, manifest), rows in zip(shards, rows_per_shard):
+        summary_path = os.path.join(os.path.dirname(os.path.abspath(path)), manifest["summary"])
+        try:
+            summary = SummaryStats.load(summary_path)
+        except (OSError, ValueError) as e:
+            check.error(str(e))
+            continue
+        if summary.rows() != rows:
+            check.error(f"'{summary_path}' summarizes {summary.rows()} rows, but '{path}' has {rows}")
+        if merged is None:
+            merged = summary
+        else:
+            merged.merge(summary)
+    return merged
+
+
+def default_summary_path(output_path):
+    return os.path.splitext(output_path)[0] + '_summary.json'
+
+
+def read_file_records(path, output_format):
+    # (caminho do arquivo analisado, linha original ou linha do csv); o cabeçalho vem à parte
+    with open(path, 'r', newline='') as file:
+        if output_format == "jsonl":
+            return None, [(json.loads(line)["path"], line) for line in file if line.strip()]
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return None, []
+        path_column = header.index("path")
+        return header, [(row[path_column], row) for row in reader]
+
+
+def merge_file_shards(shards, output_path, summary_output_path=None):
+    """
+    Saídas de metrics.py --shard: registros ordenados pelo caminho. Confere que
+    cada caminho está na parte dada pelo hash, que não se repete e que cada
+    parte tem um registro por arquivo recebido, menos os que falharam. Os
+    resumos das partes (--summary-output) são juntados em um só.
+    """
+    check = ShardCheck()
+    output_format = shards[0][1]["format"]
+    count = shards[0][1]["count"]
+    header = None
+    records = []
+    seen = {}
+    records_per_shard = []
+    for path, manifest in shards:
+        shard_header, shard_records = read_file_records(path, output_format)
+        records_per_shard.append(len(shard_records))
+        if shard_header is not None:
+            if header is not None and shard_header != header:
+                check.error(f"'{path}' has different columns")
+            header = header or shard_header
+        failed = set(manifest["failed"])
+        if len(shard_records) + len(failed) != manifest["assigned"]:
+            check.error(f"'{path}' has {len(shard_records)} records and {len(failed)} failures, "
+                        f"but {manifest['assigned']} files were assigned to shard {manifest['shard']}")
+        for file_path, record in shard_records:
+            if shard_of_path(file_path, count) != manifest["shard"]:
+                check.error(f"'{file_path}' belongs to shard {shard_of_path(file_path, count)}, "
+                            f"found in shard {manifest['shard']}")
+            if file_path in failed:
+                check.error(f"'{file_path}' is listed as failed but has a record in '{path}'")
+            if file_path in seen:
+                check.error(f"'{file_path}' appears in '{seen[file_path]}' and '{path}'")
+            seen[file_path] = path
+            records.append((file_path, record))
+    summary = load_summaries(shards, check, records_per_shard)
+    check.raise_if_failed()
+
+    records.sort(key=lambda item: item[0])
+    temp_path = output_path + '.tmp'
+    with open(temp_path, 'w', newline='') as file:
+        if output_format == "jsonl":
+            file.writelines(record for _, record in records)
+        elif header is not None:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            writer.writerows(record for _, record in records)
+    os.replace(temp_path, output_path)
+    failures = sum(len(manifest["failed"]) for _, manifest in shards)
+    message = f"{len(records)} records from {count} shards ({failures} failed files) in {output_path}"
+    if summary is not None:
+        summary_output_path = summary_output_path or default_summary_path(output_path)
+        summary.write(summary_output_path)
+        message += f", summary in {summary_output_path}"
+    return message
+
+
+def iter_csv_rows(path, key_columns):
+    """
+    Linhas de um CSV de uma parte como (chave, linha), lidas sob demanda: as
+    partes já estão em ordem, então o merge não guarda o arquivo em memória.
+    """
+    with open(path, 'r', newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        positions = [header.index(column) for column in key_columns]
+        yield header
+        for row in reader:
+            yield tuple(int(row[position]) for position in positions), row
+
+
+def merge_sorted_csv(paths, key_columns, output_path, on_row):
+    """
+    Intercala CSVs já ordenados pela chave, chamando on_row(chave, parte,
+    linha) para a conferência. Devolve o caminho temporário gravado.
+    """
+    readers = [iter_csv_rows(path, key_columns) for path in paths]
+    headers = [next(reader) for reader in readers]
+    for path, header in zip(paths, headers):
+        if header != headers[0]:
+            raise ValueError(f"'{path}' has different columns than '{paths[0]}'")
+
+    def tagged(reader, shard):
+        for key, row in reader:
+            yield key, shard, row
+
+    temp_path = output_path + '.tmp'
+    with open(temp_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(headers[0])
+        for key, shard, row in heapq.merge(*(tagged(reader, shard) for shard, reader in enumerate(readers)),
+                                           key=lambda item: item[0]):
+            on_row(key, shard, row)
+            writer.writerow(row)
+    return temp_path
+
+
+def missing_problems(first, last):
+    if first == last:
+        return f"Problem {first} is missing"
+    return f"Problems {first} to {last} are missing"
+
+
+def merge_dataset_shards(shards, output_path, problems_output_path=None, summary_output_path=None):
+    """
+    Saídas de process_dataset_metrics.py --shard: soluções ordenadas por
+    (dataset_index, solution_number) e agregados por dataset_index. Confere que
+    os agregados cobrem todos os problemas de 0 ao total exatamente uma vez,
+    cada um na parte certa, e que cada problema tem tantas soluções quanto o
+    seu agregado diz. Os resumos das distribuições são juntados em um só.
+    """
+    # Campos grandes (o código das soluções) passam do limite padrão do csv
+    csv.field_size_limit(sys.maxsize)
+    check = ShardCheck()
+    count = shards[0][1]["count"]
+    problems = {manifest["problems"] for _, manifest in shards}
+    if len(problems) != 1:
+        raise ValueError(f"Shards disagree on the number of problems in the dataset: {sorted(problems)}")
+    total_problems = problems.pop()
+    problems_output_path = problems_output_path or os.path.splitext(output_path)[0] + '_problems.csv'
+
+    solution_paths = [path for path, _ in shards]
+    problem_paths = [os.path.join(os.path.dirname(os.path.abspath(path)), manifest["problems_output"])
+                     for path, manifest in shards]
+
+    solutions_per_problem = {}
+    rows_per_shard = [0] * count
+    previous = [None]
+
+    def check_solution(key, shard, row):
+        dataset_index = key[0]
+        if previous[0] is not None and key <= previous[0]:
+            check.error(f"Solution {key[1]} of problem {dataset_index} is duplicated or out of order")
+        previous[0] = key
+        if shard_of_index(dataset_index, count) != shard:
+            check.error(f"Problem {dataset_index} belongs to shard {shard_of_index(dataset_index, count)}, "
+                        f"found in shard {shard}")
+        solutions_per_problem[dataset_index] = solutions_per_problem.get(dataset_index, 0) + 1
+        rows_per_shard[shard] += 1
+
+    solutions_temp = merge_sorted_csv(solution_paths, ("dataset_index", "solution_number"), output_path,
+                                      check_solution)
+    for (path, manifest), rows in zip(shards, rows_per_shard):
+        if rows != manifest["rows"]:
+            check.error(f"'{path}' has {rows} rows, its manifest says {manifest['rows']}")
+
+    expected = [0]
+
+    def check_problem(key, shard, row):
+        dataset_index, solutions = key
+        if dataset_index < expected[0]:
+            check.error(f"Problem {dataset_index} appears more than once")
+            return
+        if dataset_index > expected[0]:
+            check.error(missing_problems(expected[0], dataset_index - 1))
+        expected[0] = dataset_index + 1
+        if shard_of_index(dataset_index, count) != shard:
+            check.error(f"Problem {dataset_index} belongs to shard {shard_of_index(dataset_index, count)}, "
+                        f"found in shard {shard}")
+        if solutions_per_problem.pop(dataset_index, 0) != solutions:
+            check.error(f"Problem {dataset_index} should have {solutions} solutions")
+
+    problems_temp = merge_sorted_csv(problem_paths, ("dataset_index", "solutions"), problems_output_path,
+                                     check_problem)
+    if expected[0] < total_problems:
+        check.error(missing_problems(expected[0], total_problems - 1))
+    for dataset_index in solutions_per_problem:
+        check.error(f"Problem {dataset_index} has solutions but no aggregate row")
+    summary = load_summaries(shards, check, rows_per_shard)
+
+    try:
+        check.raise_if_failed()
+    except ValueError:
+        os.remove(solutions_temp)
+        os.remove(problems_temp)
+        raise
+    os.replace(solutions_temp, output_path)
+    os.replace(problems_temp, problems_output_path)
+    message = (f"{sum(rows_per_shard)} solutions and {total_problems} problems from {count} shards "
+               f"in {output_path} and {problems_output_path}")
+    if summary is not None:
+        summary_output_path = summary_output_path or default_summary_path(output_path)
+        summary.write(summary_output_path)
+        message += f", summary in {summary_output_path}"
+    return message
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the outputs of --shard runs into one deterministically "
+                                                 "ordered result, checking that nothing is missing or duplicated.")
+    parser.add_argument('shard_outputs', nargs='+', metavar='SHARD_OUTPUT',
+                        help="Output file of each shard (e.g. out.shard-0-of-4.jsonl), next to its .shard.json manifest.")
+    parser.add_argument('--output', '-o', type=str, required=True, help="Merged output file.")
+    parser.add_argument('--problems-output', type=str, default=None,
+                        help="Merged per-problem aggregates of dataset shards (default: <output>_problems.csv).")
+    parser.add_argument('--summary-output', type=str, default=None,
+                        help="Merged distribution summary, when the shards wrote one (default: <output>_summary.json).")
+    args = parser.parse_args()
+
+    try:
+        shards = load_shards(args.shard_outputs)
+        if shards[0][1]["kind"] == "dataset":
+            summary = merge_dataset_shards(shards, args.output, args.problems_output, args.summary_output)
+        else:
+            summary = merge_file_shards(shards, args.output, args.summary_output)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Registro das métricas calculadas pelo MetricsEngine. Cada métrica declara o
+nome, a entrada de que precisa, o custo relativo e a função que a calcula; o
+engine calcula cada entrada uma única vez por arquivo e só para as métricas
+selecionadas.
+
+Entradas disponíveis (INPUT_KINDS):
+    text             código-fonte
+    ast              árvore do ast.parse
+    traversal        métricas da travessia única do MetricsEngine.walk
+    radon_functions  complexidade do radon por linha de definição de função
+    lexical          métricas da passada única pelos tokens (lexicalMetrics), sem parse
+
+Métricas com default=False só são calculadas quando pedidas pelo nome, por um
+grupo (halstead, lexical) ou com 'all'.
+
+O radon e o cognitive_complexity percorrem a árvore com recursão: em um
+código aninhado além do limite de recursão do interpretador, as métricas
+deles ficam vazias (None) em vez dos valores de erro (-1 e 1), e as demais
+métricas do arquivo continuam valendo.
+"""
+from operator import itemgetter
+
+from complexipyComplexity import file_cognitive_complexity, statement_cognitive_complexity
+
+INPUT_KINDS = ("text", "ast", "traversal", "radon_functions", "lexical")
+
+
+class Metric:
+    """
+    function recebe a entrada do arquivo inteiro. No modo por função,
+    function_level recebe (entrada, nó da função), com a entrada restrita à
+    função quando possível (trecho do código, nó, registro da travessia); sem
+    function_level, function é aplicada a essa entrada.
+    """
+    __slots__ = ("name", "input", "function", "header", "cost", "value_type", "aliases", "default",
+                 "function_input", "function_level")
+
+    def __init__(self, name, input, function, header=None, cost=1, value_type=int, aliases=(), default=True,
+                 function_input=None, function_level=None):
+        if input not in INPUT_KINDS:
+            raise ValueError(f"Unknown metric input '{input}' (expected one of {', '.join(INPUT_KINDS)})")
+        self.name = name
+        self.input = input
+        self.function = function
+        self.header = header or name.replace("_", " ").title()
+        # Custo relativo por arquivo: 1 barato (texto), 2 uma passada na árvore, 3 backend externo
+        self.cost = cost
+        self.value_type = value_type
+        self.aliases = tuple(aliases)
+        self.default = default
+        self.function_input = function_input or input
+        self.function_level = function_level or (lambda value, node: function(value))
+
+
+class MetricRegistry:
+    def __init__(self):
+        # Ordem de registro = ordem das colunas na saída
+        self.metrics = {}
+        self.aliases = {}
+        # Nome do grupo -> nomes das métricas
+        self.groups = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics or metric.name in self.aliases:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self.metrics[metric.name] = metric
+        for alias in metric.aliases:
+            self.aliases[alias] = metric.name
+        return metric
+
+    def register_group(self, group, names):
+        self.groups[group] = tuple(names)
+
+    def names(self):
+        return tuple(self.metrics)
+
+    def default_names(self):
+        return tuple(name for name, metric in self.metrics.items() if metric.default)
+
+    def get(self, name):
+        name = self.aliases.get(name, name)
+        try:
+            return self.metrics[name]
+        except KeyError:
+            raise ValueError(f"Unknown metric '{name}' (available: {', '.join(self.metrics)})") from None
+
+    def resolve(self, names=None):
+        """
+        Métricas selecionadas na ordem do registro. names pode ser uma lista de
+        nomes, apelidos, grupos, 'default' ou 'all', ou um texto separado por vírgulas;
+        None seleciona as métricas padrão.
+        """
+        if names is None:
+            return [metric for metric in self.metrics.values() if metric.default]
+        if isinstance(names, str):
+            names = [name.strip() for name in names.split(",") if name.strip()]
+        selected = set()
+        for name in names:
+            if name == "all":
+                selected.update(self.metrics)
+            elif name == "default":
+                selected.update(self.default_names())
+            elif name in self.groups:
+                selected.update(self.groups[name])
+            else:
+                selected.add(self.get(name).name)
+        if not selected:
+            raise ValueError("No metric selected")
+        return [metric for name, metric in self.metrics.items() if name in selected]
+
+    def headers(self, names=None):
+        return [metric.header for metric in self.resolve(names)]
+
+
+def calculate_sloc(source_code):
+    lines = source_code.splitlines()
+    return sum(1 for line in lines if line.strip() and not line.strip().startswith('#'))
+
+
+def radon_cc(tree):
+    # Backends importados na primeira chamada, e não ao carregar o módulo
+    from radon.complexity import cc_visit_ast
+    try:
+        complexity_results = cc_visit_ast(tree)
+        return sum(result.complexity for result in complexity_results)
+    except RecursionError:
+        return None
+    except Exception as e:
+        return -1
+
+
+def function_cognitive_complexity(node):
+    from cognitive_complexity.api import get_cognitive_complexity
+    try:
+        return get_cognitive_complexity(node)
+    except RecursionError:
+        return None
+    except Exception:
+        return 1
+
+
+def cognitive_complexity(tree):
+    # Assim como calculate_cognitive_complexity, considera apenas o primeiro nó do módulo
+    from cognitive_complexity.api import get_cognitive_complexity
+    if not tree.body:
+        # Módulo vazio: não há primeiro nó
+        return 0
+    first_node = tree.body[0]
+    try:
+        cognitive = get_cognitive_complexity(first_node)
+    except RecursionError:
+        cognitive = None
+    except Exception:
+        cognitive = 1
+    return cognitive
+
+
+registry = MetricRegistry()
+
+registry.register(Metric("cyclomatic_complexity", "traversal", itemgetter("cyclomatic_complexity"),
+                         header="Cyclomatic Complexity", cost=2, aliases=("cyclomatic",)))
+registry.register(Metric("radon_cc", "ast", radon_cc, header="Radon CC", cost=3, aliases=("radon",),
+                         function_input="radon_functions",
+                         function_level=lambda complexity_by_line, node: complexity_by_line.get(node.lineno, -1)))
+registry.register(Metric("unique_operators", "traversal", itemgetter("unique_operators"),
+                         header="Unique Operators", cost=2))
+registry.register(Metric("total_statements", "traversal", itemgetter("total_statements"),
+                         header="Total Statements", cost=2, aliases=("statements",)))
+registry.register(Metric("avg_nested_depth", "traversal", itemgetter("avg_nested_depth"),
+                         header="Avg Nested Depth", cost=2, value_type=float, aliases=("depth",)))
+registry.register(Metric("total_operators", "traversal", itemgetter("total_operators"),
+                         header="Total Operators", cost=2, aliases=("operators",)))
+registry.register(Metric("sloc", "text", calculate_sloc, header="SLOC", cost=1))
+registry.register(Metric("cognitive_complexity", "ast", cognitive_complexity, header="Cognitive Complexity", cost=3,
+                         aliases=("cognitive",),
+                         function_level=lambda node, function_node: function_cognitive_complexity(node)))
+registry.register(Metric("complexipy_cognitive_complexity", "ast", file_cognitive_complexity,
+                         header="Complexipy Cog. C.", cost=2, aliases=("complexipy",),
+                         function_level=lambda node, function_node: statement_cognitive_complexity(node, 0)))
+
+# Métricas léxicas: uma passada pelos tokens, sem parse (fora do conjunto padrão)
+LEXICAL_HEADERS = {
+    "lexical_sloc": "Lexical SLOC", "comment_lines": "Comment Lines", "blank_lines": "Blank Lines",
+    "halstead_n1": "Halstead n1", "halstead_n2": "Halstead n2", "halstead_N1": "Halstead N1",
+    "halstead_N2": "Halstead N2", "halstead_volume": "Halstead Volume",
+    "halstead_difficulty": "Halstead Difficulty", "halstead_effort": "Halstead Effort",
+}
+for name, header in LEXICAL_HEADERS.items():
+    value_type = float if name in ("halstead_volume", "halstead_difficulty", "halstead_effort") else int
+    registry.register(Metric(name, "lexical", itemgetter(name), header=header, cost=1, value_type=value_type,
+                             default=False))
+registry.register_group("halstead", [name for name in LEXICAL_HEADERS if name.startswith("halstead_")])
+registry.register_group("lexical", list(LEXICAL_HEADERS))
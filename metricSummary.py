@@ -0,0 +1,315 @@
+"""
+Resumo em streaming da distribuição de cada métrica de uma execução: contagem,
+média, mínimo, máximo, quantis e histograma, sem guardar os valores. O
+resultado não depende da quantidade de linhas, e resumos de processos, partes
+(--shard) ou execuções diferentes se juntam somando contadores, com o mesmo
+resultado de um resumo único.
+
+Quantis: inteiros até EXACT_LIMIT (o caso de quase todas as métricas) são
+contados um a um e dão quantis exatos; os demais valores caem em faixas
+logarítmicas (como o DDSketch), com erro relativo de no máximo
+RELATIVE_ACCURACY. O quantil q é o valor da posição q * (n - 1) da amostra
+ordenada, sem interpolação.
+
+Histograma: faixas fixas da série 1-2-5 ([0,1), [1,2), [2,5), [5,10), ...),
+as mesmas para todas as métricas e execuções, mais uma faixa para valores
+negativos (os -1 de métricas que falharam) e uma para [0, 0.001).
+
+Juntar resumos gravados:
+    python metricSummary.py a_summary.json b_summary.json -o total_summary.json
+"""
+import argparse
+import json
+import math
+import os
+import sys
+
+SUMMARY_VERSION = 1
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+# Inteiros com valor absoluto até aqui são contados exatamente
+EXACT_LIMIT = 1024
+# Valores com módulo menor que isto contam como zero nas faixas logarítmicas
+MIN_MAGNITUDE = 1e-9
+SUMMARY_QUANTILES = (0.5, 0.9, 0.99)
+
+# Faixas do histograma: 3 * expoente + posição na série 1-2-5, mais as duas especiais
+BIN_MULTIPLIERS = (1, 2, 5)
+MIN_BIN_EXPONENT = -3
+ZERO_BIN = 3 * MIN_BIN_EXPONENT - 1
+NEGATIVE_BIN = ZERO_BIN - 1
+
+
+def histogram_bin(value):
+    if value < 0:
+        return NEGATIVE_BIN
+    if value < 10 ** MIN_BIN_EXPONENT:
+        return ZERO_BIN
+    if value == math.inf:
+        value = sys.float_info.max
+    exponent = math.floor(math.log10(value))
+    # log10 não é exato nas potências de 10
+    if 10 ** (exponent + 1) <= value:
+        exponent += 1
+    elif 10 ** exponent > value:
+        exponent -= 1
+    mantissa = value / 10 ** exponent
+    return 3 * exponent + (0 if mantissa < 2 else 1 if mantissa < 5 else 2)
+
+
+def bin_edges(index):
+    # Limites [inferior, superior) de uma faixa do histograma
+    if index == NEGATIVE_BIN:
+        return -math.inf, 0.0
+    if index == ZERO_BIN:
+        return 0.0, 10.0 ** MIN_BIN_EXPONENT
+    exponent, position = divmod(index, 3)
+    lower = BIN_MULTIPLIERS[position] * 10.0 ** exponent
+    upper = BIN_MULTIPLIERS[position + 1] * 10.0 ** exponent if position < 2 else 10.0 ** (exponent + 1)
+    return lower, upper
+
+
+# Faixa de cada inteiro exato não negativo, calculada uma vez
+SMALL_BINS = [histogram_bin(value) for value in range(EXACT_LIMIT + 1)]
+
+
+def bucket_key(magnitude):
+    return math.ceil(math.log(magnitude) / LOG_GAMMA)
+
+
+def bucket_value(key):
+    # Valor representativo da faixa (GAMMA^(key-1), GAMMA^key]: erro relativo <= RELATIVE_ACCURACY
+    return 2 * GAMMA ** key / (GAMMA + 1)
+
+
+def add_counts(target, source):
+    for key, count in source.items():
+        target[key] = target.get(key, 0) + count
+
+
+class MetricSketch:
+    """
+    Distribuição de uma métrica. missing conta os valores ausentes (None ou
+    NaN, como os de um timeout), que ficam fora das estatísticas.
+    """
+    __slots__ = ("count", "missing", "total", "minimum", "maximum", "exact", "positive", "negative", "zero",
+                 "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.missing = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+        # inteiro -> quantidade
+        self.exact = {}
+        # Faixas logarítmicas dos demais valores: chave -> quantidade
+        self.positive = {}
+        self.negative = {}
+        self.zero = 0
+        # Faixa do histograma -> quantidade
+        self.histogram = {}
+
+    def add(self, value):
+        if value is None or value != value:
+            self.missing += 1
+            return
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+        if -EXACT_LIMIT <= value <= EXACT_LIMIT and value == int(value):
+            key = int(value)
+            self.exact[key] = self.exact.get(key, 0) + 1
+            index = SMALL_BINS[key] if key >= 0 else NEGATIVE_BIN
+        else:
+            if value > MIN_MAGNITUDE:
+                key = bucket_key(value)
+                self.positive[key] = self.positive.get(key, 0) + 1
+            elif value < -MIN_MAGNITUDE:
+                key = bucket_key(-value)
+                self.negative[key] = self.negative.get(key, 0) + 1
+            else:
+                self.zero += 1
+            index = histogram_bin(value)
+        self.histogram[index] = self.histogram.get(index, 0) + 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.missing += other.missing
+        self.total += other.total
+        for value in (other.minimum, other.maximum):
+            if value is not None:
+                if self.minimum is None or value < self.minimum:
+                    self.minimum = value
+                if self.maximum is None or value > self.maximum:
+                    self.maximum = value
+        add_counts(self.exact, other.exact)
+        add_counts(self.positive, other.positive)
+        add_counts(self.negative, other.negative)
+        self.zero += other.zero
+        add_counts(self.histogram, other.histogram)
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantiles(self, quantiles=SUMMARY_QUANTILES):
+        if not self.count:
+            return [None] * len(quantiles)
+        # (valor, quantidade) de todas as faixas, em ordem crescente
+        items = [(float(value), count) for value, count in self.exact.items()]
+        items.extend((bucket_value(key), count) for key, count in self.positive.items())
+        items.extend((-bucket_value(key), count) for key, count in self.negative.items())
+        if self.zero:
+            items.append((0.0, self.zero))
+        items.sort()
+
+        results = []
+        for quantile in quantiles:
+            rank = quantile * (self.count - 1)
+            cumulative = 0
+            for value, count in items:
+                cumulative += count
+                if cumulative > rank:
+                    break
+            # As faixas aproximadas nunca passam dos extremos exatos
+            results.append(min(max(value, self.minimum), self.maximum))
+        return results
+
+    def histogram_bins(self):
+        # [(inferior, superior, quantidade)] em ordem crescente
+        return [bin_edges(index) + (self.histogram[index],) for index in sorted(self.histogram)]
+
+    def state(self):
+        # Só os contadores; chaves dos dicionários como texto por causa do JSON
+        return {"count": self.count, "missing": self.missing, "sum": self.total,
+                "min": self.minimum, "max": self.maximum,
+                "exact": {str(key): count for key, count in sorted(self.exact.items())},
+                "positive": {str(key): count for key, count in sorted(self.positive.items())},
+                "negative": {str(key): count for key, count in sorted(self.negative.items())},
+                "zero": self.zero,
+                "histogram": {str(key): count for key, count in sorted(self.histogram.items())}}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls()
+        sketch.count = state["count"]
+        sketch.missing = state["missing"]
+        sketch.total = state["sum"]
+        sketch.minimum = state["min"]
+        sketch.maximum = state["max"]
+        sketch.exact = {int(key): count for key, count in state["exact"].items()}
+        sketch.positive = {int(key): count for key, count in state["positive"].items()}
+        sketch.negative = {int(key): count for key, count in state["negative"].items()}
+        sketch.zero = state["zero"]
+        sketch.histogram = {int(key): count for key, count in state["histogram"].items()}
+        return sketch
+
+
+class SummaryStats:
+    """
+    Um MetricSketch por métrica, alimentado com os dicionários de métricas de
+    cada linha (MetricsInfo.metrics ou as linhas do CSV do dataset).
+    """
+
+    def __init__(self, metric_names):
+        self.sketches = {name: MetricSketch() for name in metric_names}
+
+    def add(self, metric_values):
+        for name, sketch in self.sketches.items():
+            sketch.add(metric_values.get(name))
+
+    def merge(self, other):
+        for name, sketch in other.sketches.items():
+            if name not in self.sketches:
+                self.sketches[name] = MetricSketch()
+            self.sketches[name].merge(sketch)
+
+    def rows(self):
+        # Linhas somadas: toda linha tem valor ou falta em cada métrica
+        return max((sketch.count + sketch.missing for sketch in self.sketches.values()), default=0)
+
+    def state(self):
+        return {"version": SUMMARY_VERSION, "relative_accuracy": RELATIVE_ACCURACY,
+                "exact_limit": EXACT_LIMIT,
+                "metrics": {name: sketch.state() for name, sketch in self.sketches.items()}}
+
+    @classmethod
+    def from_state(cls, state):
+        if (state.get("version") != SUMMARY_VERSION or state.get("relative_accuracy") != RELATIVE_ACCURACY
+                or state.get("exact_limit") != EXACT_LIMIT):
+            raise ValueError("Incompatible summary (different version or sketch parameters)")
+        summary = cls(())
+        summary.sketches = {name: MetricSketch.from_state(sketch) for name, sketch in state["metrics"].items()}
+        return summary
+
+    def to_dict(self):
+        """
+        Estado para juntar com outros resumos e, ao lado, os valores já
+        calculados (média, quantis, histograma), ignorados ao carregar.
+        """
+        summary = self.state()
+        for name, sketch in self.sketches.items():
+            metric = summary["metrics"][name]
+            metric["mean"] = sketch.mean()
+            metric["quantiles"] = {f"p{quantile * 100:g}": value
+                                   for quantile, value in zip(SUMMARY_QUANTILES, sketch.quantiles())}
+            metric["bins"] = [{"lower": lower if lower != -math.inf else None, "upper": upper, "count": count}
+                              for lower, upper, count in sketch.histogram_bins()]
+        return summary
+
+    def write(self, path):
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as file:
+            try:
+                return cls.from_state(json.load(file))
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"'{path}' is not a valid metric summary: {e}") from None
+
+    def report(self):
+        # Tabela de texto com uma linha por métrica
+        header = f"{'metric':<34}{'count':>9}{'missing':>9}{'mean':>11}{'min':>11}" + "".join(
+            f"{f'p{quantile * 100:g}':>11}" for quantile in SUMMARY_QUANTILES) + f"{'max':>11}"
+        lines = [header]
+        for name, sketch in self.sketches.items():
+            values = [sketch.mean(), sketch.minimum] + sketch.quantiles() + [sketch.maximum]
+            lines.append(f"{name:<34}{sketch.count:>9}{sketch.missing:>9}" +
+                         "".join(f"{format_value(value):>11}" for value in values))
+        return "\n".join(lines)
+
+
+def format_value(value):
+    return "" if value is None else f"{value:.4g}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge metric summaries (--summary-output files) and print "
+                                                 "the combined distributions.")
+    parser.add_argument('summaries', nargs='+', metavar='SUMMARY', help="Summary JSON files to merge.")
+    parser.add_argument('--output', '-o', type=str, default=None, help="Also write the merged summary here.")
+    args = parser.parse_args()
+
+    try:
+        summary = SummaryStats.load(args.summaries[0])
+        for path in args.summaries[1:]:
+            summary.merge(SummaryStats.load(path))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(summary.report())
+    if args.output:
+        summary.write(args.output)
+
+
+if __name__ == "__main__":
+    main()
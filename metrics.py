@@ -1,20 +1,34 @@
 import ast
 import argparse
+import hashlib
+import json
 import os
-import subprocess
-import pandas as pd
-from cognitive_complexity.api import get_cognitive_complexity
-from radon.complexity import cc_visit
-from radon.raw import analyze
-from tabulate import tabulate
-from simple_colors import *
+import sys
 import myComplexity as mc
 
-from metricsInfo import MetricsInfo
+from metricsInfo import MetricsInfo, FunctionMetricsInfo
+from metricsEngine import MetricsEngine
+from complexipyComplexity import file_cognitive_complexity
+from metricsCache import MetricsCache, DEFAULT_CACHE_DIR
+from runManifest import RunManifest
+from resultStore import MetricsBatch
+from metricsProfiler import MetricsProfiler, call_untimed
+from fileDiscovery import FileDiscovery, read_paths0
+from outputRenderer import FORMATS, table_headers, color_header_line, make_renderer
+from metricRegistry import registry
+from shardAssignment import ShardFilter, parse_shard, shard_output_path, write_shard_manifest
+from timeBudget import AnalysisTimeout, TimeBudget
+from metricSummary import SummaryStats
 
 class Metrics:
-    def __init__(self):
-        self.complexity_dict = {}
+    def __init__(self, cache=None, profiler=None, metrics=None, time_budget=None):
+        # Limite de tempo por arquivo, em segundos (None = sem limite)
+        self.time_budget = time_budget
+        # metrics: nomes das métricas a calcular (None = todas as do registro)
+        self.engine = MetricsEngine(metrics=metrics)
+        self.engine.profiler = profiler
+        self.cache = cache
+        self.profiler = profiler
 
     def calculate_unique_operators(self, source_code):
         tree = ast.parse(source_code)
@@ -52,14 +66,15 @@ class Metrics:
             self.current_depth = 0
 
         def visit(self, node):
-            if isinstance(node, (ast.If, ast.For, ast.While, ast.Try)):
-                self.current_depth += 1
-                self.total_depth += self.current_depth
-                self.block_count += 1
-                self.generic_visit(node)
-                self.current_depth -= 1
-            else:
-                self.generic_visit(node)
+            # Pilha explícita de (nó, profundidade): árvores profundas não estouram a recursão
+            stack = [(node, self.current_depth)]
+            while stack:
+                node, depth = stack.pop()
+                if isinstance(node, (ast.If, ast.For, ast.While, ast.Try)):
+                    depth += 1
+                    self.total_depth += depth
+                    self.block_count += 1
+                stack.extend((child, depth) for child in ast.iter_child_nodes(node))
 
         def get_average_depth(self):
             return self.total_depth / self.block_count if self.block_count else 0
@@ -74,76 +89,45 @@ class Metrics:
         def __init__(self):
             self.operator_count = 0
 
-        def visit_BinOp(self, node):
-            self.operator_count += 1
-            self.generic_visit(node)
-
-        def visit_UnaryOp(self, node):
-            self.operator_count += 1
-            self.generic_visit(node)
-
-        def visit_BoolOp(self, node):
-            self.operator_count += 1
-            self.generic_visit(node)
-
-        def visit_Compare(self, node):
-            self.operator_count += len(node.ops)
-            self.generic_visit(node)
-
-        def visit_AugAssign(self, node):
-            self.operator_count += 1
-            self.generic_visit(node)
-
-        def visit_Assign(self, node):
-            self.operator_count += 1
-            self.generic_visit(node)
+        def visit(self, node):
+            # ast.walk percorre a árvore com uma fila, sem recursão; a contagem não depende da ordem
+            for child in ast.walk(node):
+                if isinstance(child, (ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.AugAssign, ast.Assign)):
+                    self.operator_count += 1
+                elif isinstance(child, ast.Compare):
+                    self.operator_count += len(child.ops)
 
     def calculate_sloc(self, source_code):
         lines = source_code.splitlines()
         return sum(1 for line in lines if line.strip() and not line.strip().startswith('#'))
 
+    def calculate_complexipy_cognitive_complexity(self, source_code):
+        return file_cognitive_complexity(ast.parse(source_code))
+
     def calculate_cognitive_complexity(self, source_code):
-        tree = ast.parse(source_code).body[0]
+        from cognitive_complexity.api import get_cognitive_complexity
+        body = ast.parse(source_code).body
+        if not body:
+            # Módulo vazio: não há primeiro nó
+            return 0
+        tree = body[0]
         try:
             cognitive = get_cognitive_complexity(tree)
-        except:
+        except Exception:
             cognitive = 1
         return cognitive
 
     def radon_cc(self, source_code):
+        from radon.complexity import cc_visit
         try:
             complexity_results = cc_visit(source_code)
             return sum(result.complexity for result in complexity_results)
         except Exception as e:
             return -1
 
-    def run_complexipy_command(self, file_path):
-        project_dir = '/home/vodiniz/Prog/codeMetrics'
-        virtualenv_activate_script = os.path.join(project_dir, '.env/bin/activate')
-        command = f"source {virtualenv_activate_script} && complexipy {file_path} -l file -o"
-        try:
-            result = subprocess.run(command, shell=True, text=True, capture_output=True, cwd=project_dir, check=True)
-            csv_file_path = os.path.join(project_dir, 'complexipy.csv')
-            return csv_file_path
-        except subprocess.CalledProcessError as e:
-            print(f"Erro ao executar o comando: {e}")
-            print(f"Saída do erro: {e.stderr}")
-            return None
-
-    def read_complexipy_csv(self, csv_file_path):
-        try:
-            df = pd.read_csv(csv_file_path)
-            if 'Path' not in df.columns or 'Cognitive Complexity' not in df.columns:
-                raise ValueError("O arquivo CSV não contém as colunas esperadas.")
-            self.complexity_dict = dict(zip(df['Path'], df['Cognitive Complexity']))
-        except Exception as e:
-            print(f"Erro ao ler o arquivo CSV: {e}")
-    def print_code_metrics(self, data, show_headers=False):
-        headers = [
-            "Path", "File", "Cyclomatic Complexity", "Radon CC",
-            "Unique Operators", "Total Statements", 
-            "Avg Nested Depth", "Total Operators", "SLOC", "Cognitive Complexity", "Complexipy Cog. C."
-        ]
+    def print_code_metrics(self, data, show_headers=False, file=None):
+        from tabulate import tabulate
+        headers = table_headers(self.engine.metric_names)
         
         if show_headers:
             # Formatando a tabela com cabeçalhos
@@ -152,76 +136,487 @@ class Metrics:
             # Formatando a tabela sem cabeçalhos
             table = tabulate(data, headers=[], tablefmt="fancy_grid", numalign="left", stralign="left")
 
-        # Colorindo apenas os cabeçalhos
+        # Colorindo apenas os cabeçalhos: só a linha do cabeçalho (a segunda) é percorrida
         if show_headers:
-            colored_headers = [f"\x1b[1;35m{header}\x1b[0m" for header in headers]
-            for i, header in enumerate(headers):
-                table = table.replace(header, colored_headers[i])
-
-        print(table)
+            top_border, header_line, body = table.split("\n", 2)
+            table = "\n".join((top_border, color_header_line(header_line, headers), body))
+
+        print(table, file=file)
+
+    def run_with_budget(self, function, *args):
+        # Análise dentro do limite de tempo por arquivo; sem limite, chamada direta
+        if not self.time_budget:
+            return function(*args)
+        with TimeBudget(self.time_budget):
+            return function(*args)
+
+    def analyze_source(self, code):
+        if self.cache is None:
+            return self.run_with_budget(self.engine.analyze, code)
+
+        measure = self.profiler.measure if self.profiler else call_untimed
+        key = self.cache.key(code)
+        metrics = measure('cache', self.cache.get, key)
+        if metrics is not None:
+            return metrics
+        try:
+            # Um timeout não entra no cache: depende da máquina e da carga, não do arquivo
+            metrics = self.run_with_budget(self.engine.analyze, code)
+        except (SyntaxError, ValueError) as e:
+            # Entrada negativa: o arquivo não será analisado de novo enquanto não mudar
+            self.cache.put_error(key, e)
+            raise
+        measure('cache', self.cache.put, key, metrics)
+        return metrics
+
+    def build_metrics_info(self, filename, code, metric_values, status=None):
+        # Com limite de tempo, toda linha diz se foi analisada ('ok') ou interrompida ('timeout')
+        if status is None and self.time_budget:
+            status = "ok"
+        return MetricsInfo(
+            path=filename,
+            filename=filename,
+            name=filename,
+            code_source=code,
+            description="",
+            solution="",
+            solution_number="",
+            status=status,
+            **metric_values
+        )
+
+    def timeout_metrics_info(self, filename, code, error):
+        print(f"Timeout analyzing '{filename}': {error}", file=sys.stderr)
+        return self.build_metrics_info(filename, code, dict.fromkeys(self.engine.metric_names), "timeout")
 
     def process_file(self, filename, source_code):
+            profiler = self.profiler
+            if profiler is not None:
+                profiler.begin_file(filename)
             try:
-                cognitive_complexity = self.complexity_dict.get(filename, 'N/A')
                 with open(filename, 'r') as file:
-                    code = source_code if source_code else file.read()
-                    return MetricsInfo(
-                        path=filename,
-                        filename=filename,
-                        name=filename,
-                        code_source=code,
-                        description="",
-                        solution="",
-                        solution_number="",
-                        cyclomatic_complexity=self.calculate_cyclomatic_complexity(code),
-                        radon_cc=self.radon_cc(code),
-                        unique_operators=self.calculate_unique_operators(code),
-                        total_statements=self.calculate_total_statements(code),
-                        avg_nested_depth=self.calculate_average_depth(code),
-                        total_operators=self.calculate_total_operators(code),
-                        sloc=self.calculate_sloc(code),
-                        cognitive_complexity=self.calculate_cognitive_complexity(code),
-                        complexipy_cognitive_complexity=cognitive_complexity
-                    )
+                    if source_code:
+                        code = source_code
+                    elif profiler is not None:
+                        code = profiler.measure('read', file.read)
+                    else:
+                        code = file.read()
+                    # Um único parse e uma única travessia para todas as métricas
+                    return self.build_metrics_info(filename, code, self.analyze_source(code))
             except FileNotFoundError:
-                print(f"Error: The file '{filename}' was not found.")
+                print(f"Error: The file '{filename}' was not found.", file=sys.stderr)
+            except AnalysisTimeout as e:
+                return self.timeout_metrics_info(filename, code, e)
+            except (SyntaxError, ValueError) as e:
+                if isinstance(e, UnicodeDecodeError):
+                    print(f"Error opening the file: {e}", file=sys.stderr)
+                else:
+                    print(f"Error analyzing '{filename}': {e}", file=sys.stderr)
             except Exception as e:
-                print(f"Error opening the file: {e}")
+                print(f"Error opening the file: {e}", file=sys.stderr)
+            finally:
+                if profiler is not None:
+                    profiler.end_file()
+
+    def process_source(self, name, source_code, dedupe=None):
+        """
+        Analisa um código-fonte que já está em memória, sem passar pelo disco.
+        Com um DedupeIndex, soluções estruturalmente iguais a uma já vista
+        reaproveitam as métricas dela.
+        """
+        try:
+            if dedupe is not None:
+                metric_values = self.run_with_budget(dedupe.analyze, self.engine, source_code)
+                return self.build_metrics_info(name, source_code, metric_values)
+            return self.build_metrics_info(name, source_code, self.analyze_source(source_code))
+        except AnalysisTimeout as e:
+            return self.timeout_metrics_info(name, source_code, e)
+        except Exception as e:
+            print(f"Error analyzing '{name}': {e}", file=sys.stderr)
+
+    def process_functions(self, filename, source_code=None):
+        """
+        Gera um FunctionMetricsInfo por função/método do arquivo, à medida que
+        a travessia (única) termina cada função.
+        """
+        try:
+            if source_code is None:
+                with open(filename, 'r') as file:
+                    source_code = file.read()
+            for metric_values in self.engine.iter_functions(source_code):
+                qualified_name = metric_values.pop("qualified_name")
+                yield FunctionMetricsInfo(
+                    path=filename,
+                    filename=filename,
+                    name=qualified_name,
+                    code_source="",
+                    description="",
+                    solution="",
+                    solution_number="",
+                    **metric_values
+                )
+        except FileNotFoundError:
+            print(f"Error: The file '{filename}' was not found.", file=sys.stderr)
+        except Exception as e:
+            print(f"Error opening the file: {e}", file=sys.stderr)
+
+    @staticmethod
+    def open_cache(cache_dir, metrics=None):
+        if cache_dir is None:
+            return None
+        return MetricsCache(cache_dir, MetricsEngine(metrics=metrics).config_version())
+
+    @staticmethod
+    def default_manifest_path(cache_dir, path, shard=None):
+        # Cada parte de um --shard tem o seu manifesto
+        key = os.path.abspath(path) + (f"#{shard[0]}/{shard[1]}" if shard else "")
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(cache_dir, 'manifests', f'{digest}.json')
+
+    @staticmethod
+    def file_discovery(excludes=(), use_ignore=True):
+        if use_ignore:
+            return FileDiscovery(excludes)
+        return FileDiscovery(excludes, use_gitignore=False, ignored_dirs=frozenset())
+
+    @staticmethod
+    def collect_files(path, excludes=(), use_ignore=True):
+        # Gerador: os arquivos saem enquanto a busca ainda percorre a árvore
+        return Metrics.file_discovery(excludes, use_ignore).iter_files(path)
+
+    @staticmethod
+    def read_files0(files0_from):
+        if files0_from == '-':
+            yield from read_paths0(sys.stdin.buffer)
+            return
+        with open(files0_from, 'rb') as file:
+            yield from read_paths0(file)
+
+    @staticmethod
+    def input_files(args, shard_filter=None, on_directory=None):
+        """
+        Arquivos a processar segundo os argumentos da linha de comando: a lista
+        de --files0-from, um único arquivo ou a busca no diretório. Com
+        shard_filter, só os arquivos daquela parte; on_directory é repassado
+        ao FileDiscovery.
+        """
+        discovery = Metrics.file_discovery(args.exclude, not args.no_ignore)
+        if args.files0_from is not None:
+            file_paths = discovery.iter_paths(Metrics.read_files0(args.files0_from), on_directory)
+        elif os.path.isfile(args.path):
+            file_paths = discovery.iter_paths([args.path], on_directory)
+        else:
+            file_paths = discovery.iter_files(args.path, on_directory)
+        if shard_filter is not None:
+            return shard_filter.filter(file_paths)
+        return file_paths
+
     @staticmethod
     def main():
         parser = argparse.ArgumentParser(description="Process files or directories for code metrics.")
-        parser.add_argument('path', type=str, help="The file or directory to process.")
+        parser.add_argument('path', type=str, nargs='?', default=None, help="The file or directory to process.")
+        parser.add_argument('--files0-from', type=str, default=None, metavar='FILE',
+                            help="Read NUL-separated paths to process from FILE ('-' for stdin), "
+                                 "e.g. from `git ls-files -z` or `find -print0`.")
+        parser.add_argument('--exclude', action='append', default=[], metavar='GLOB',
+                            help="Skip files and directories matching this .gitignore-style glob (repeatable).")
+        parser.add_argument('--no-ignore', action='store_true',
+                            help="Do not read .gitignore files nor skip .git, .venv, __pycache__ and similar directories.")
+        parser.add_argument('--jobs', '-j', type=int, default=1,
+                            help="Number of worker processes for directories (0 uses every core).")
+        parser.add_argument('--shard', type=parse_shard, default=None, metavar='I/N',
+                            help="Only process the files of shard I out of N (stable, by path hash). Requires --output; "
+                                 "combine the shards with merge_shards.py.")
+        parser.add_argument('--output', '-o', type=str, default=None, metavar='FILE',
+                            help="Write the results to FILE instead of stdout (with --shard, FILE gets a "
+                                 ".shard-I-of-N suffix and a .shard.json manifest).")
+        parser.add_argument('--timeout', type=float, default=None, metavar='SECONDS',
+                            help="Wall-clock budget per file. A file that exceeds it is reported with status "
+                                 "'timeout' and empty metrics, and the run moves on.")
+        parser.add_argument('--watch', action='store_true',
+                            help="Keep running after the first analysis and re-analyze only the files that change, "
+                                 "updating the output (tables are redrawn; jsonl/csv emit one record per change).")
+        # Sem default aqui: watchMode (com DEFAULT_POLL_INTERVAL) só é importado com --watch
+        parser.add_argument('--poll-interval', type=float, default=None, metavar='SECONDS',
+                            help="How often --watch checks for changes (default: 0.05).")
+        parser.add_argument('--git-range', type=str, default=None, metavar='A..B',
+                            help="Analyze the Python files of every commit in this git revision range (path is the "
+                                 "repository or a directory in it, default '.'), reading them from the object store "
+                                 "without checkouts, and emit one aggregate row per commit (csv or jsonl).")
+        parser.add_argument('--no-cache', action='store_true', help="Do not read or write the result cache.")
+        parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR,
+                            help=f"Directory of the result cache (default: {DEFAULT_CACHE_DIR}).")
+        parser.add_argument('--incremental', action='store_true',
+                            help="Only re-read files whose mtime or size changed since the previous run.")
+        parser.add_argument('--manifest', type=str, default=None,
+                            help="Manifest file used by --incremental (default: inside --cache-dir).")
+        parser.add_argument('--per-function', action='store_true',
+                            help="Emit one record per function/method instead of one row per file.")
+        parser.add_argument('--metrics', type=str, default=None, metavar='NAMES',
+                            help="Comma-separated metrics or groups to compute, e.g. 'sloc,cyclomatic' or 'default,halstead' "
+                                 "('all' for every metric; see --list-metrics).")
+        parser.add_argument('--list-metrics', action='store_true',
+                            help="List the available metrics with their input and relative cost, then exit.")
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help="Output format: 'table' (default; sorted, printed at the end), or the streaming "
+                                 "'plain', 'jsonl' and 'csv' (default with --per-function: jsonl).")
+        parser.add_argument('--profile', action='store_true',
+                            help="Time each metric and print a report at the end (to stderr).")
+        parser.add_argument('--profile-top', type=int, default=10, help="Number of slowest files in the profile report.")
+        parser.add_argument('--profile-output', type=str, default=None,
+                            help="With --profile, also write a cProfile dump (*.pstats, *.prof) or a speedscope JSON file.")
+        parser.add_argument('--parquet', type=str, default=None,
+                            help="Also write the results to this Parquet file (requires pyarrow).")
+        parser.add_argument('--summary', action='store_true',
+                            help="Print the distribution of each metric (count, mean, quantiles) at the end (to stderr).")
+        parser.add_argument('--summary-output', type=str, default=None, metavar='FILE',
+                            help="Write the mergeable distribution summary (quantile sketches and histograms) to this "
+                                 "JSON file; combine several with metricSummary.py.")
         args = parser.parse_args()
+        if args.jobs < 0:
+            parser.error("--jobs must be a positive number of processes, or 0 for one per core")
+        # 0 vira o número de núcleos aqui, e o resto da execução só vê um número de processos
+        args.jobs = args.jobs or os.cpu_count() or 1
+        if args.list_metrics:
+            for metric in registry.metrics.values():
+                aliases = f" (alias: {', '.join(metric.aliases)})" if metric.aliases else ""
+                default = "default" if metric.default else "optional"
+                print(f"{metric.name:<34} input={metric.input:<16} cost={metric.cost} {default}{aliases}")
+            for group, names in registry.groups.items():
+                print(f"group {group}: {', '.join(names)}")
+            return
+        if args.git_range is not None:
+            unsupported = [option for option, value in (("--files0-from", args.files0_from), ("--shard", args.shard),
+                                                        ("--watch", args.watch), ("--per-function", args.per_function),
+                                                        ("--incremental", args.incremental),
+                                                        ("--parquet", args.parquet), ("--profile", args.profile),
+                                                        ("--summary", args.summary or args.summary_output))
+                           if value]
+            if unsupported:
+                parser.error(f"--git-range cannot be combined with {', '.join(unsupported)}")
+            if args.format in ("table", "plain"):
+                parser.error("--git-range requires --format jsonl or csv")
+            args.path = args.path or "."
+        if args.path is None and args.files0_from is None:
+            parser.error("a path or --files0-from is required")
+        try:
+            metric_names = [metric.name for metric in registry.resolve(args.metrics)]
+        except ValueError as e:
+            parser.error(str(e))
+        shard = args.shard
+        if shard is not None:
+            if args.output is None:
+                parser.error("--shard requires --output")
+            if args.per_function:
+                parser.error("--shard does not support --per-function")
+            if args.format in ("table", "plain"):
+                parser.error("--shard requires --format jsonl or csv")
+        if args.watch:
+            unsupported = [option for option, value in (("--shard", shard), ("--per-function", args.per_function),
+                                                        ("--incremental", args.incremental),
+                                                        ("--parquet", args.parquet), ("--profile", args.profile),
+                                                        ("--summary", args.summary or args.summary_output))
+                           if value]
+            if unsupported:
+                parser.error(f"--watch cannot be combined with {', '.join(unsupported)}")
+            if args.files0_from == '-':
+                parser.error("--watch needs a --files0-from file it can read again, not stdin")
         path = args.path
-        data = []
-        tabulate_data = []
+        # Resultados por coluna, sem o texto dos arquivos
+        data = MetricsBatch(metric_names=metric_names)
+        cache_dir = None if args.no_cache else args.cache_dir
+        output_format = args.format or ("jsonl" if args.per_function or shard is not None else
+                                        "csv" if args.git_range is not None else "table")
+        output_path = shard_output_path(args.output, shard) if shard is not None else args.output
+        output = open(output_path, 'w', newline='') if output_path else sys.stdout
+        try:
+            if args.git_range is not None:
+                Metrics.git_history(args, metric_names, cache_dir, output_format, output)
+            elif args.watch:
+                Metrics.watch(args, metric_names, cache_dir, output_format, output)
+            else:
+                Metrics.run(args, metric_names, data, cache_dir, output_format, output)
+        finally:
+            if output is not sys.stdout:
+                output.close()
 
-        # Instanciando Metrics para acessar métodos que não podem ser estáticos
-        metrics_instance = Metrics()
+    @staticmethod
+    def watch(args, metric_names, cache_dir, output_format, output):
+        # --watch: análise inicial e depois só os arquivos alterados, até Ctrl+C
+        from watchMode import PollingWatcher, WatchSession
+        if args.files0_from is None and not os.path.exists(args.path):
+            print(f"Error: The path '{args.path}' is neither a file nor a directory.", file=sys.stderr)
+            return
+        metrics_instance = Metrics(Metrics.open_cache(cache_dir, metric_names), None, metric_names, args.timeout)
+        watcher = PollingWatcher(lambda on_directory: Metrics.input_files(args, on_directory=on_directory))
+        session = WatchSession(metrics_instance, watcher, output_format, output, make_renderer,
+                               poll_interval=args.poll_interval, jobs=args.jobs, cache_dir=cache_dir)
+        try:
+            session.run()
+        finally:
+            if metrics_instance.cache is not None:
+                metrics_instance.cache.close()
 
-        csv_file_path = metrics_instance.run_complexipy_command(path)
-        if csv_file_path:
-            metrics_instance.read_complexipy_csv(csv_file_path)
+    @staticmethod
+    def git_history(args, metric_names, cache_dir, output_format, output):
+        # --git-range: uma linha por commit, cada blob distinto analisado uma vez
+        from gitHistory import GitHistory, TimeSeriesWriter
+        try:
+            history = GitHistory(args.path, args.exclude)
+            writer = TimeSeriesWriter(output_format, output)
+            commits, blobs, file_versions = history.run(args.git_range, metric_names, writer.row, jobs=args.jobs,
+                                                        cache_dir=cache_dir, time_budget=args.timeout)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"{commits} commits: {blobs} distinct blobs analyzed for {file_versions} file versions",
+              file=sys.stderr)
 
-        if os.path.isfile(path):
-            metrics = metrics_instance.process_file(path, None)
-            if metrics:
+    @staticmethod
+    def finish_summary(args, summary, shard=None):
+        """
+        Imprime e/ou grava o resumo das distribuições. Devolve o caminho gravado
+        (com o sufixo da parte, com --shard) ou None.
+        """
+        if summary is None:
+            return None
+        if args.summary:
+            print(summary.report(), file=sys.stderr)
+        if not args.summary_output:
+            return None
+        summary_path = shard_output_path(args.summary_output, shard) if shard is not None else args.summary_output
+        summary.write(summary_path)
+        return summary_path
+
+    @staticmethod
+    def run(args, metric_names, data, cache_dir, output_format, output):
+        """
+        Corpo de main depois da leitura dos argumentos: analisa os arquivos e
+        escreve os resultados em output no formato pedido.
+        """
+        path = args.path
+        shard = args.shard
+        shard_filter = ShardFilter(*shard) if shard is not None else None
+        # Distribuição de cada métrica, acumulada à medida que os resultados saem
+        summary = SummaryStats(metric_names) if args.summary or args.summary_output else None
+
+        if args.per_function:
+            # Cada registro sai assim que a travessia termina a função
+            file_paths = Metrics.input_files(args)
+            function_analyzer = Metrics(metrics=metric_names)
+            renderer = make_renderer(output_format, function_analyzer, output)
+            for file_path in file_paths:
+                for function_metrics in function_analyzer.process_functions(file_path):
+                    renderer.row(function_metrics)
+                    if summary is not None:
+                        summary.add(function_metrics.metrics)
+            renderer.close()
+            Metrics.finish_summary(args, summary, shard)
+            return
+
+        profiler = MetricsProfiler(args.profile_top) if args.profile else None
+        python_profile = None
+        if profiler is not None and args.profile_output and args.profile_output.endswith(('.pstats', '.prof')):
+            import cProfile
+            python_profile = cProfile.Profile()
+            python_profile.enable()
+
+        # Instanciando Metrics para acessar métodos que não podem ser estáticos
+        metrics_instance = Metrics(Metrics.open_cache(cache_dir, metric_names), profiler, metric_names, args.timeout)
+        try:
+            renderer = make_renderer(output_format, metrics_instance, output)
+            cache_stats = None
+            # Arquivos com resultado, para o manifesto da parte
+            emitted_paths = set()
+
+            def emit(metrics):
                 data.append(metrics)
-        elif os.path.isdir(path):
-            for root, dirs, files in os.walk(path):
-                for file in files:
-                    if file.endswith('.py'):
-                        file_path = os.path.join(root, file)
+                renderer.row(metrics)
+                if summary is not None:
+                    summary.add(metrics.metrics)
+                if shard_filter is not None:
+                    emitted_paths.add(metrics.filename)
+
+            if args.files0_from is None and os.path.isfile(path):
+                if shard_filter is None or shard_filter.accept(path):
+                    metrics = metrics_instance.process_file(path, None)
+                    if metrics:
+                        emit(metrics)
+            elif args.files0_from is not None or os.path.isdir(path):
+                file_paths = Metrics.input_files(args, shard_filter)
+                manifest = None
+                if args.incremental:
+                    manifest_path = args.manifest or Metrics.default_manifest_path(
+                        args.cache_dir, path or args.files0_from, shard)
+                    manifest = RunManifest(manifest_path, metrics_instance.engine.config_version())
+                    unchanged, changed = manifest.split(file_paths)
+                    # Arquivos inalterados vêm do manifesto sem abrir o arquivo
+                    for file_path, entry in unchanged:
+                        if entry["metrics"] is not None:
+                            emit(metrics_instance.build_metrics_info(file_path, "", entry["metrics"]))
+                    file_paths = [file_path for file_path, signature in changed]
+
+                if args.jobs != 1:
+                    # Import tardio: parallelMetrics importa este módulo
+                    from parallelMetrics import process_files_parallel
+                    processed, cache_stats = process_files_parallel(file_paths, args.jobs, cache_dir, profiler,
+                                                                    on_result=emit, metrics=metric_names,
+                                                                    time_budget=args.timeout)
+                else:
+                    processed = []
+                    for file_path in file_paths:
                         metrics = metrics_instance.process_file(file_path, None)
                         if metrics:
-                            data.append(metrics)
-                            tabulate_data.append(metrics.metrics_to_tabulate())
-        else:
-            print(f"Error: The path '{path}' is neither a file nor a directory.")
-            return
-
-        tabulate_data.sort(key=lambda x: x[1])
-        metrics_instance.print_code_metrics(tabulate_data, show_headers=True)
+                            processed.append(metrics)
+                            emit(metrics)
+
+                if manifest is not None:
+                    entries = {file_path: entry for file_path, entry in unchanged}
+                    processed_by_path = {metrics.filename: metrics for metrics in processed}
+                    for file_path, signature in changed:
+                        metrics = processed_by_path.get(file_path)
+                        if metrics is not None and metrics.status == "timeout":
+                            # Fica fora do manifesto para ser analisado de novo na próxima execução
+                            continue
+                        entries[file_path] = RunManifest.entry(signature, metrics.metric_values() if metrics else None)
+                    manifest.save(entries)
+            else:
+                print(f"Error: The path '{path}' is neither a file nor a directory.", file=sys.stderr)
+                return
+
+            if python_profile is not None:
+                python_profile.disable()
+
+            renderer.close()
+            summary_path = Metrics.finish_summary(args, summary, shard)
+
+            if shard_filter is not None:
+                # Arquivos desta parte que falharam: o merge confere que nenhum outro sumiu
+                failed = sorted(set(shard_filter.assigned) - emitted_paths)
+                extra = {"summary": os.path.relpath(summary_path, os.path.dirname(os.path.abspath(output.name)))
+                         } if summary_path else {}
+                write_shard_manifest(output.name, shard, "files", format=output_format, metrics=metric_names,
+                                     assigned=len(shard_filter.assigned), failed=failed, **extra)
+
+            if args.parquet:
+                data.sort()
+                data.write_parquet(shard_output_path(args.parquet, shard) if shard is not None else args.parquet)
+
+            if profiler is not None:
+                profiler.report()
+                if python_profile is not None:
+                    python_profile.dump_stats(args.profile_output)
+                elif args.profile_output:
+                    profiler.write_speedscope(args.profile_output)
+        finally:
+            # Também em uma interrupção ou erro: confirma o que foi gravado e remove o excesso
+            if metrics_instance.cache is not None:
+                metrics_instance.cache.close()
+
+        if metrics_instance.cache is not None:
+            cache_stats = cache_stats or metrics_instance.cache.stats()
+            print(f"Cache: {cache_stats['hits']} hits, {cache_stats['negative_hits']} negative hits, "
+                  f"{cache_stats['misses']} misses", file=sys.stderr)
 
 
 # Ensure that this script is run directly
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import time
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'codeMetrics')
+# Uma transação fica aberta por no máximo este número de escritas ou de segundos:
+# outros processos não esperam por ela, e uma interrupção perde pouco
+COMMIT_EVERY = 100
+COMMIT_INTERVAL = 1.0
+# Inserções entre duas remoções das entradas em excesso (feitas no commit)
+EVICT_EVERY = 1000
+
+
+class CachedParseError(Exception):
+    """
+    Falha de parse registrada no cache (entrada negativa). A mensagem é a do erro original.
+    """
+
+
+class MetricsCache:
+    """
+    Cache em SQLite dos resultados por arquivo, endereçado pelo conteúdo.
+
+    A chave é o sha256 da versão da configuração das métricas mais o código-fonte,
+    então mudar os pesos ou a versão do MetricsEngine invalida tudo automaticamente.
+    Falhas de parse ficam guardadas como entradas negativas.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, config_version="", max_entries=200000):
+        self.cache_dir = cache_dir
+        self.config_version = config_version
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.inserts = 0
+        # Escritas ainda não confirmadas e inserções desde a última remoção
+        self.pending = 0
+        self.last_commit = time.monotonic()
+        self.inserts_since_evict = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        # Importado aqui: execuções com --no-cache não pagam o import do sqlite3
+        import sqlite3
+        self.connection = sqlite3.connect(os.path.join(cache_dir, 'metrics_cache.sqlite'), timeout=30)
+        # WAL permite que vários processos do pool leiam e escrevam ao mesmo tempo
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " metrics TEXT,"
+            " error TEXT,"
+            " last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+        self.connection.commit()
+
+    def key(self, source_code):
+        digest = hashlib.sha256(self.config_version.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(source_code.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Retorna o dicionário de métricas guardado, None se não houver entrada,
+        ou levanta CachedParseError para uma entrada negativa.
+        """
+        row = self.connection.execute("SELECT metrics, error FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.connection.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._written()
+        metrics, error = row
+        if error is not None:
+            self.negative_hits += 1
+            raise CachedParseError(error)
+        self.hits += 1
+        return json.loads(metrics)
+
+    def put(self, key, metrics):
+        self._store(key, json.dumps(metrics), None)
+
+    def put_error(self, key, error):
+        self._store(key, None, str(error))
+
+    def _store(self, key, metrics, error):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO entries (key, metrics, error, last_used) VALUES (?, ?, ?, ?)",
+            (key, metrics, error, time.time()),
+        )
+        self.inserts += 1
+        self.inserts_since_evict += 1
+        self._written()
+
+    def _written(self):
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY or time.monotonic() - self.last_commit >= COMMIT_INTERVAL:
+            self.commit()
+
+    def evict(self):
+        # Remove as entradas menos usadas recentemente acima de max_entries
+        self.inserts_since_evict = 0
+        count = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.connection.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+        return max(excess, 0)
+
+    def stats(self):
+        return {"hits": self.hits, "negative_hits": self.negative_hits, "misses": self.misses}
+
+    def commit(self):
+        # Os processos do pool nunca chamam close, então o excesso também é removido aqui
+        if self.inserts_since_evict >= EVICT_EVERY:
+            self.evict()
+        self.connection.commit()
+        self.pending = 0
+        self.last_commit = time.monotonic()
+
+    def close(self):
+        self.evict()
+        self.commit()
+        self.connection.close()
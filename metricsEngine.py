@@ -0,0 +1,272 @@
+import ast
+import myComplexity as mc
+from lexicalMetrics import lexical_metrics
+from metricRegistry import registry, calculate_sloc, radon_cc, cognitive_complexity, function_cognitive_complexity
+from metricsProfiler import call_untimed
+
+
+class NestingTooDeepError(ValueError):
+    """
+    O parser do CPython desiste de expressões aninhadas demais (RecursionError
+    ou MemoryError durante a construção da árvore). Como ValueError, o arquivo
+    entra no cache como erro e não é analisado de novo enquanto não mudar.
+    """
+
+
+class MetricsEngine:
+    """
+    Calcula as métricas selecionadas do registro (metricRegistry) com no
+    máximo um ast.parse e uma travessia da árvore por arquivo: cada entrada
+    (árvore, travessia) é calculada uma vez, na primeira métrica que
+    precisar dela. Uma seleção só com métricas de texto nem chega a fazer o parse.
+
+    Com todas as métricas, os resultados são idênticos aos de
+    calculate_cyclomatic_complexity, calculate_unique_operators,
+    calculate_total_statements, calculate_average_depth,
+    calculate_total_operators, radon_cc e calculate_cognitive_complexity
+    chamados separadamente. A coluna do complexipy sai da mesma árvore, sem
+    chamar o executável.
+    """
+
+    # Mesmos nós contados por NestedBlockDepthCounter
+    BLOCK_NODES = (ast.If, ast.For, ast.While, ast.Try)
+    # Nós contados uma única vez por OperatorCounter
+    SINGLE_OPERATOR_NODES = (ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.AugAssign, ast.Assign)
+    # Nós cujo tipo de operador entra em calculate_unique_operators
+    UNIQUE_OPERATOR_NODES = (ast.BinOp, ast.UnaryOp, ast.BoolOp)
+    # Nós que geram um registro no modo por função
+    FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+    # Incrementar sempre que o cálculo de alguma métrica mudar (invalida o cache)
+    VERSION = 2
+
+    # Implementações no metricRegistry, mantidas aqui como antes
+    calculate_sloc = staticmethod(calculate_sloc)
+    radon_cc = staticmethod(radon_cc)
+    cognitive_complexity = staticmethod(cognitive_complexity)
+    function_cognitive_complexity = staticmethod(function_cognitive_complexity)
+
+    def __init__(self, complexity_analyzer=None, metrics=None):
+        # Os pesos da complexidade ciclomática vêm de uma instância de myComplexity
+        self.complexity_analyzer = complexity_analyzer or mc.myComplexity()
+        # Métricas selecionadas (nomes, apelidos ou grupos; None = as padrão), na ordem do registro
+        self.metrics = registry.resolve(metrics)
+        self.metric_names = tuple(metric.name for metric in self.metrics)
+        # MetricsProfiler opcional; desligado, cada etapa é chamada diretamente
+        self.profiler = None
+
+    def config_version(self):
+        weights = sorted((node_type.__name__, weight) for node_type, weight in self.complexity_analyzer.weight_table().items())
+        version = f"{self.VERSION}:{weights}:{self.complexity_analyzer.nested_loop}"
+        # Cada seleção de métricas tem as suas próprias entradas no cache e no manifesto
+        if self.metric_names != registry.default_names():
+            version += ":" + ",".join(self.metric_names)
+        return version
+
+    def parse(self, source_code):
+        try:
+            return ast.parse(source_code)
+        except (RecursionError, MemoryError):
+            raise NestingTooDeepError("code is nested too deeply to be parsed") from None
+
+    def file_input(self, kind, inputs):
+        """
+        Entrada `kind` do arquivo, calculada uma única vez e guardada em inputs
+        (que começa com {"text": código-fonte}).
+        """
+        value = inputs.get(kind)
+        if value is not None:
+            return value
+        measure = self.profiler.measure if self.profiler else call_untimed
+        if kind == "ast":
+            value = measure('parse', self.parse, inputs["text"])
+        elif kind == "traversal":
+            # Sem acompanhar funções, a travessia produz só o registro do módulo
+            value = measure('traversal', next, self.walk(self.file_input("ast", inputs), track_functions=False))
+        elif kind == "radon_functions":
+            value = measure('radon_functions', self.radon_functions, self.file_input("ast", inputs))
+        elif kind == "lexical":
+            value = measure('lexical', lexical_metrics, inputs["text"])
+        else:
+            raise ValueError(f"Unknown metric input '{kind}'")
+        inputs[kind] = value
+        return value
+
+    def analyze(self, source_code, tree=None, known=None):
+        """
+        Retorna um dicionário com as métricas selecionadas, na ordem do registro.
+        tree evita um novo parse quando a árvore já existe; as métricas em known
+        (nome -> valor) são copiadas sem recalcular.
+        """
+        measure = self.profiler.measure if self.profiler else call_untimed
+        inputs = {"text": source_code}
+        if tree is not None:
+            inputs["ast"] = tree
+        metrics = {}
+        for metric in self.metrics:
+            if known is not None and metric.name in known:
+                metrics[metric.name] = known[metric.name]
+            else:
+                metrics[metric.name] = measure(metric.name, metric.function, self.file_input(metric.input, inputs))
+        return metrics
+
+    def iter_functions(self, source_code):
+        """
+        Gera um dicionário por função, método ou função aninhada (FunctionDef e
+        AsyncFunctionDef), com nome qualificado, linhas e as mesmas métricas do
+        arquivo, a partir de um único parse. Cada registro sai assim que a
+        travessia termina a função, sem acumular os demais.
+        """
+        tree = self.parse(source_code)
+        lines = source_code.splitlines()
+        file_inputs = {"text": source_code, "ast": tree}
+
+        for record in self.walk(tree, track_functions=True):
+            node = record["node"]
+            if node is tree:
+                continue
+            # Entradas restritas à função; as demais (radon_functions) são do arquivo
+            function_inputs = {
+                "text": "\n".join(lines[node.lineno - 1:node.end_lineno]),
+                "ast": node,
+                "traversal": record,
+            }
+            metrics = {"qualified_name": record["qualified_name"], "lineno": node.lineno, "end_lineno": node.end_lineno}
+            for metric in self.metrics:
+                kind = metric.function_input
+                if kind == "lexical" and kind not in function_inputs:
+                    function_inputs[kind] = lexical_metrics(function_inputs["text"])
+                value = function_inputs[kind] if kind in function_inputs else self.file_input(kind, file_inputs)
+                metrics[metric.name] = metric.function_level(value, node)
+            yield metrics
+
+    def walk(self, tree, track_functions=False):
+        """
+        Travessia única com pilha explícita que calcula as métricas próprias
+        (ciclomática, operadores, comandos e profundidade).
+
+        Com track_functions, cada função gera um registro ao terminar: os
+        contadores são aditivos, então as métricas da função são a diferença
+        entre os contadores na saída e na entrada dela. O registro do módulo
+        sempre sai por último.
+        """
+        weight_table = self.complexity_analyzer.weight_table()
+        nested_loop = self.complexity_analyzer.nested_loop
+        block_nodes = self.BLOCK_NODES
+        single_operator_nodes = self.SINGLE_OPERATOR_NODES
+        unique_operator_nodes = self.UNIQUE_OPERATOR_NODES
+        function_nodes = self.FUNCTION_NODES
+        loop_nodes = mc.myComplexity.LOOP_NODES
+        stmt = ast.stmt
+        AST = ast.AST
+
+        complexity = 0
+        total_statements = 0
+        total_operators = 0
+        # Tipos de operador na ordem em que aparecem; cada função olha só a sua fatia
+        operator_types = []
+        add_operator_type = operator_types.append
+        total_depth = 0
+        block_count = 0
+
+        # Pilha explícita: (nó, profundidade de blocos, dentro de laço, escopo).
+        # Uma entrada com nó None marca a saída de uma função.
+        stack = [(tree, 0, False, "")]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node, depth, in_loop, scope = pop()
+
+            if node is None:
+                function_node, qualified_name, base_depth, start = depth
+                blocks = block_count - start[4]
+                relative_depth = total_depth - start[3] - base_depth * blocks
+                yield {
+                    "node": function_node,
+                    "qualified_name": qualified_name,
+                    "cyclomatic_complexity": complexity - start[0],
+                    "unique_operators": len(set(operator_types[start[5]:])),
+                    "total_statements": total_statements - start[1],
+                    "avg_nested_depth": relative_depth / blocks if blocks else 0,
+                    "total_operators": total_operators - start[2],
+                }
+                continue
+
+            if track_functions and isinstance(node, function_nodes):
+                qualified_name = scope + node.name
+                start = (complexity, total_statements, total_operators, total_depth, block_count, len(operator_types))
+                push((None, (node, qualified_name, depth, start), False, ""))
+                scope = qualified_name + ".<locals>."
+            elif track_functions and isinstance(node, ast.ClassDef):
+                scope = scope + node.name + "."
+
+            if isinstance(node, stmt):
+                total_statements += 1
+
+            if isinstance(node, block_nodes):
+                depth += 1
+                total_depth += depth
+                block_count += 1
+
+            # Mesma tabela de pesos de myComplexity
+            weight = weight_table.get(type(node))
+            if weight is not None:
+                if type(node) is ast.FunctionDef:
+                    if node.name != "main":
+                        complexity += weight
+                elif in_loop and isinstance(node, loop_nodes):
+                    complexity += weight + nested_loop
+                else:
+                    complexity += weight
+
+            if isinstance(node, single_operator_nodes):
+                total_operators += 1
+                if isinstance(node, unique_operator_nodes):
+                    add_operator_type(type(node.op))
+            elif isinstance(node, ast.Compare):
+                total_operators += len(node.ops)
+                for op in node.ops:
+                    add_operator_type(type(op))
+
+            child_in_loop = in_loop or isinstance(node, loop_nodes)
+            # Filhos empilhados de trás para frente: saem da pilha na ordem do código
+            for field in reversed(node._fields):
+                value = getattr(node, field, None)
+                if isinstance(value, list):
+                    for item in reversed(value):
+                        if isinstance(item, AST):
+                            push((item, depth, child_in_loop, scope))
+                elif isinstance(value, AST):
+                    push((value, depth, child_in_loop, scope))
+
+        yield {
+            "node": tree,
+            "qualified_name": None,
+            "cyclomatic_complexity": complexity,
+            "unique_operators": len(set(operator_types)),
+            "total_statements": total_statements,
+            "avg_nested_depth": total_depth / block_count if block_count else 0,
+            "total_operators": total_operators,
+        }
+
+    def radon_functions(self, tree):
+        """
+        Complexidade do radon de cada função (métodos e closures inclusive),
+        indexada pela linha da definição. Uma única visita do radon por arquivo.
+        """
+        from radon.complexity import cc_visit_ast
+        try:
+            blocks = list(cc_visit_ast(tree))
+        except RecursionError:
+            # Fundo demais para o radon: as funções ficam sem valor, em vez do -1 de erro
+            return {node.lineno: None for node in ast.walk(tree)
+                    if type(node) is ast.FunctionDef or type(node) is ast.AsyncFunctionDef}
+        except Exception as e:
+            return {}
+        complexity_by_line = {}
+        while blocks:
+            block = blocks.pop()
+            if hasattr(block, 'closures'):
+                complexity_by_line[block.lineno] = block.complexity
+                blocks.extend(block.closures)
+        return complexity_by_line
@@ -1,6 +1,21 @@
+from metricRegistry import registry
+
+
 class MetricsInfo:
-    def __init__(self, path, filename, name, code_source, description, solution, solution_number, cyclomatic_complexity, radon_cc, unique_operators, 
-                 total_statements, avg_nested_depth, total_operators, sloc, cognitive_complexity, complexipy_cognitive_complexity):
+    """
+    Resultado de um arquivo: dados de origem e as métricas calculadas em
+    `metrics` (nome -> valor, na ordem do registro). Cada métrica também pode
+    ser lida como atributo (metrics_info.sloc), então métricas novas do
+    registro não exigem mudanças nesta classe.
+    """
+    __slots__ = ("path", "filename", "name", "code_source", "description", "solution", "solution_number",
+                 "status", "metrics")
+
+    # Métricas calculadas por padrão pelo MetricsEngine
+    METRIC_FIELDS = registry.default_names()
+
+    def __init__(self, path, filename, name, code_source="", description="", solution="", solution_number="",
+                 status=None, **metrics):
         self.path = path
         self.filename = filename
         self.name = name
@@ -8,64 +23,80 @@ class MetricsInfo:
         self.description = description
         self.solution = solution
         self.solution_number = solution_number
-        self.cyclomatic_complexity = cyclomatic_complexity
-        self.radon_cc = radon_cc
-        self.unique_operators = unique_operators
-        self.total_statements = total_statements
-        self.avg_nested_depth = avg_nested_depth
-        self.total_operators = total_operators
-        self.sloc = sloc
-        self.cognitive_complexity = cognitive_complexity
-        self.complexipy_cognitive_complexity = complexipy_cognitive_complexity
+        # 'ok' ou 'timeout' quando há limite de tempo por arquivo; None sem limite
+        self.status = status
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        # Só chamado quando o atributo não é um dos slots
+        if name == "metrics" or name.startswith("__"):
+            raise AttributeError(name)
+        try:
+            return self.metrics[name]
+        except KeyError:
+            raise AttributeError(f"'{type(self).__name__}' has no metric '{name}'") from None
 
     def metrics_to_row_data(self):
-        return {
+        row_data = {
             "name": self.name,
             "code_source": self.code_source,
             "description": self.description,
             "solution": self.solution,
             "solution_number": self.solution_number,
-            "cyclomatic_complexity": self.cyclomatic_complexity,
-            "unique_operators": self.unique_operators,
-            "total_statements": self.total_statements,
-            "avg_nested_depth": self.avg_nested_depth,
-            "total_operators": self.total_operators,
-            "sloc": self.sloc,
-            "cognitive_complexity": self.cognitive_complexity,
-            "complexipy_cognitive_complexity": self.complexipy_cognitive_complexity
         }
+        row_data.update(self.metrics)
+        if self.status is not None:
+            row_data["status"] = self.status
+        return row_data
+
+    def metric_values(self):
+        return dict(self.metrics)
+
+    def metrics_to_record(self):
+        # Registro das saídas jsonl/csv: caminho e métricas, sem o código-fonte
+        record = {"path": self.path}
+        record.update(self.metric_values())
+        if self.status is not None:
+            record["status"] = self.status
+        return record
+
     def metrics_to_tabulate(self):
-        return [self.filename,
-                self.filename,
-                self.cyclomatic_complexity,
-                self.radon_cc,
-                self.unique_operators,
-                self.total_statements,
-                self.avg_nested_depth,
-                self.total_operators,
-                self.sloc,
-                self.cognitive_complexity,
-                self.complexipy_cognitive_complexity
-                ]
-    
+        return [self.filename, self.filename] + list(self.metrics.values())
 
     def __str__(self):
-        return (
-            f"MetricsInfo:\n"
-            f"  Path: {self.path}\n"
-            f"  Filename: {self.filename}\n"
-            f"  Name: {self.name}\n"
-            f"  Code Source: {self.code_source[:100]}...\n"  # Limita a exibição do código para não sobrecarregar
-            f"  Description: {self.description}\n"
-            f"  Solution: {self.solution}\n"
-            f"  Solution Number: {self.solution_number}\n"
-            f"  Cyclomatic Complexity: {self.cyclomatic_complexity}\n"
-            f"  Radon CC: {self.radon_cc}\n"
-            f"  Unique Operators: {self.unique_operators}\n"
-            f"  Total Statements: {self.total_statements}\n"
-            f"  Avg Nested Depth: {self.avg_nested_depth}\n"
-            f"  Total Operators: {self.total_operators}\n"
-            f"  SLOC: {self.sloc}\n"
-            f"  Cognitive Complexity: {self.cognitive_complexity}\n"
-            f"  Complexipy Cognitive Complexity: {self.complexipy_cognitive_complexity}\n"
-        )
\ No newline at end of file
+        lines = [
+            "MetricsInfo:",
+            f"  Path: {self.path}",
+            f"  Filename: {self.filename}",
+            f"  Name: {self.name}",
+            f"  Code Source: {self.code_source[:100]}...",  # Limita a exibição do código para não sobrecarregar
+            f"  Description: {self.description}",
+            f"  Solution: {self.solution}",
+            f"  Solution Number: {self.solution_number}",
+        ]
+        lines.extend(f"  {registry.get(name).header}: {value}" for name, value in self.metrics.items())
+        return "\n".join(lines) + "\n"
+
+
+class FunctionMetricsInfo(MetricsInfo):
+    """
+    Métricas de uma única função ou método. name guarda o nome qualificado.
+    """
+    __slots__ = ("lineno", "end_lineno")
+
+    def __init__(self, lineno, end_lineno, **kwargs):
+        super().__init__(**kwargs)
+        self.lineno = lineno
+        self.end_lineno = end_lineno
+
+    def metrics_to_row_data(self):
+        row_data = {"path": self.path, "qualified_name": self.name,
+                    "lineno": self.lineno, "end_lineno": self.end_lineno}
+        row_data.update(self.metric_values())
+        return row_data
+
+    def metrics_to_record(self):
+        return self.metrics_to_row_data()
+
+    def metrics_to_tabulate(self):
+        return [self.path, f"{self.name}:{self.lineno}-{self.end_lineno}"] + super().metrics_to_tabulate()[2:]
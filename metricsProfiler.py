@@ -0,0 +1,118 @@
+import heapq
+import json
+import sys
+import time
+
+
+def call_untimed(name, function, *args):
+    # Usado no lugar de MetricsProfiler.measure quando o profiling está desligado
+    return function(*args)
+
+
+class MetricsProfiler:
+    """
+    Tempo de parede de cada métrica, acumulado por execução e por arquivo.
+
+    O MetricsEngine mede as entradas ('parse', 'traversal',
+    'radon_functions', 'lexical') e cada métrica pelo nome dela no registro; as métricas
+    da travessia só leem o resultado de 'traversal'. Metrics.process_file
+    acrescenta 'read' e 'cache'.
+    """
+
+    def __init__(self, slowest_count=10):
+        self.slowest_count = slowest_count
+        self.totals = {}
+        self.calls = {}
+        self.file_count = 0
+        self.files_time = 0.0
+        # Heap mínimo com os arquivos mais lentos: (tempo, nome)
+        self.slowest = []
+        self.current_file = None
+        self.current_times = None
+        self.current_start = 0.0
+        self.last_record = None
+
+    def measure(self, name, function, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.totals[name] = self.totals.get(name, 0.0) + elapsed
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if self.current_times is not None:
+                self.current_times[name] = self.current_times.get(name, 0.0) + elapsed
+
+    def begin_file(self, filename):
+        self.current_file = filename
+        self.current_times = {}
+        self.current_start = time.perf_counter()
+
+    def end_file(self):
+        """
+        Fecha o arquivo atual e retorna o registro (nome, tempo total, tempos por métrica).
+        """
+        record = (self.current_file, time.perf_counter() - self.current_start, self.current_times)
+        self.current_file = None
+        self.current_times = None
+        self.last_record = record
+        self.add_file_record(record, count_metrics=False)
+        return record
+
+    def add_file_record(self, record, count_metrics=True):
+        """
+        Acrescenta o registro de um arquivo; count_metrics=True soma também os
+        tempos por métrica (registros vindos de outros processos).
+        """
+        filename, elapsed, times = record
+        if count_metrics:
+            for name, value in times.items():
+                self.totals[name] = self.totals.get(name, 0.0) + value
+                self.calls[name] = self.calls.get(name, 0) + 1
+        self.file_count += 1
+        self.files_time += elapsed
+        if len(self.slowest) < self.slowest_count:
+            heapq.heappush(self.slowest, (elapsed, filename))
+        elif elapsed > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (elapsed, filename))
+
+    def report(self, file=sys.stderr):
+        total = sum(self.totals.values()) or 1.0
+        print(f"\nProfile: {self.file_count} files, {self.files_time:.3f}s in process_file", file=file)
+        print(f"{'metric':<32} {'calls':>8} {'total (s)':>11} {'mean (ms)':>11} {'share':>7}", file=file)
+        for name, value in sorted(self.totals.items(), key=lambda item: -item[1]):
+            calls = self.calls[name]
+            print(f"{name:<32} {calls:>8} {value:>11.3f} {value / calls * 1e3:>11.3f} {value / total:>7.1%}", file=file)
+
+        parse_time = self.totals.get('parse', 0.0)
+        analysis_time = sum(value for name, value in self.totals.items() if name not in ('parse', 'read', 'cache'))
+        print(f"parse {parse_time:.3f}s vs traversal/analysis {analysis_time:.3f}s "
+              f"(built-in traversal {self.totals.get('traversal', 0.0):.3f}s)", file=file)
+
+        print(f"\nSlowest {len(self.slowest)} files:", file=file)
+        for elapsed, filename in sorted(self.slowest, reverse=True):
+            print(f"{elapsed * 1e3:>10.2f} ms  {filename}", file=file)
+
+    def write_speedscope(self, output_path):
+        """
+        Grava os tempos acumulados no formato do speedscope (perfil 'sampled',
+        uma amostra process_file -> métrica por métrica, com o tempo total como peso).
+        """
+        names = sorted(self.totals)
+        frames = [{"name": "process_file"}] + [{"name": name} for name in names]
+        weights = [self.totals[name] for name in names]
+        profile = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": "codeMetrics",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": [[0, index + 1] for index in range(len(names))],
+                "weights": weights,
+            }],
+        }
+        with open(output_path, 'w') as file:
+            json.dump(profile, file)
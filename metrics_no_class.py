@@ -91,14 +91,15 @@ class NestedBlockDepthCounter(ast.NodeVisitor):
         self.current_depth = 0
 
     def visit(self, node):
-        if isinstance(node, (ast.If, ast.For, ast.While, ast.Try)):
-            self.current_depth += 1
-            self.total_depth += self.current_depth
-            self.block_count += 1
-            self.generic_visit(node)
-            self.current_depth -= 1
-        else:
-            self.generic_visit(node)
+        # Pilha explícita de (nó, profundidade): árvores profundas não estouram a recursão
+        stack = [(node, self.current_depth)]
+        while stack:
+            node, depth = stack.pop()
+            if isinstance(node, (ast.If, ast.For, ast.While, ast.Try)):
+                depth += 1
+                self.total_depth += depth
+                self.block_count += 1
+            stack.extend((child, depth) for child in ast.iter_child_nodes(node))
 
     def get_average_depth(self):
         if self.block_count == 0:
@@ -121,29 +122,13 @@ class OperatorCounter(ast.NodeVisitor):
     def __init__(self):
         self.operator_count = 0
 
-    def visit_BinOp(self, node):
-        self.operator_count += 1
-        self.generic_visit(node)
-
-    def visit_UnaryOp(self, node):
-        self.operator_count += 1
-        self.generic_visit(node)
-
-    def visit_BoolOp(self, node):
-        self.operator_count += 1
-        self.generic_visit(node)
-
-    def visit_Compare(self, node):
-        self.operator_count += len(node.ops)
-        self.generic_visit(node)
-
-    def visit_AugAssign(self, node):
-        self.operator_count += 1
-        self.generic_visit(node)
-
-    def visit_Assign(self, node):
-        self.operator_count += 1
-        self.generic_visit(node)
+    def visit(self, node):
+        # ast.walk percorre a árvore com uma fila, sem recursão; a contagem não depende da ordem
+        for child in ast.walk(node):
+            if isinstance(child, (ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.AugAssign, ast.Assign)):
+                self.operator_count += 1
+            elif isinstance(child, ast.Compare):
+                self.operator_count += len(child.ops)
 
 def calculate_total_operators(source_code):
     """
@@ -1,10 +1,8 @@
 import ast
-import astpretty
 
-from radon.complexity import cc_visit
-from radon.raw import analyze
 
 def radon_cc(source_code):
+    from radon.complexity import cc_visit
     try:
         # Análise do código fonte para calcular a complexidade ciclomática
         complexity_results = cc_visit(source_code)
@@ -19,6 +17,8 @@ def radon_cc(source_code):
 
 
 class myComplexity():
+    LOOP_NODES = (ast.For, ast.While)
+
     def __init__(self) -> None:
         self.if_complexity = 1
         self.elif_complexity = 1
@@ -37,77 +37,86 @@ class myComplexity():
 
         self.complexity = 0
 
-    def get_weight(self, node):
-
-        #     # Verifica se o nó já foi visitado para evitar contar várias vezes
-        # if getattr(node, 'visited', False):
-        #     return 0
-
-        # # Marca o nó como visitado
-        # node.visited = True
-
-        if isinstance(node, ast.If):
-    
-            # Se não for elif nem else, então é um If
-            self.debug_print(f"Linha: {node.lineno}. Nó atual é um If, com complexidade de {self.if_complexity}.")
-            return self.if_complexity
-            
-        elif isinstance(node, ast.For):
-            if self.is_inside_loop(node):
-                self.debug_print(f"Linha: {node.lineno}. Nó atual é um For aninhado, com complexidade de {self.nested_loop + self.for_complexity}.")
-                return self.nested_loop + self.for_complexity
-            else:
-                self.debug_print(f"Linha: {node.lineno}. Nó atual é um For, com complexidade de {self.for_complexity}.")
-                return self.for_complexity
-        
-        elif isinstance(node, ast.While):
-            if self.is_inside_loop(node):
-                self.debug_print(f"Linha: {node.lineno}. Nó atual é um While aninhado, com complexidade de {self.while_complexity + self.nested_loop}.")
-                return self.while_complexity + self.nested_loop
+    def weight_table(self):
+        """
+        Tabela tipo do nó -> peso, montada a partir dos pesos atuais da instância.
+        """
+        return {
+            ast.If: self.if_complexity,
+            ast.For: self.for_complexity,
+            ast.While: self.while_complexity,
+            ast.FunctionDef: self.function_complexity,
+        }
+
+    def get_weight(self, node, loop_depth=0, table=None):
+        """
+        Peso de um nó. loop_depth é a quantidade de laços (For ou While) acima do nó.
+        """
+        node_type = type(node)
+        weight = (table or self.weight_table()).get(node_type)
+        if weight is None:
+            return 0
 
-            self.debug_print(f"Linha: {node.lineno}. Nó atual é um While, com complexidade de {self.while_complexity}.")
-            return self.while_complexity
-        
-        elif isinstance(node, ast.FunctionDef):
+        if node_type is ast.FunctionDef:
             if node.name == "main":
                 return 0
-            self.debug_print(f"Linha: {node.lineno}. Nó atual é uma função, com complexidade de {self.function_complexity}.")
-            return self.function_complexity
-        
-        return 0
+            if self.debug:
+                self.debug_print(f"Linha: {node.lineno}. Nó atual é uma função, com complexidade de {weight}.")
+            return weight
+
+        name = node_type.__name__
+        if node_type in self.LOOP_NODES and loop_depth:
+            weight += self.nested_loop
+            name += " aninhado"
+        if self.debug:
+            self.debug_print(f"Linha: {node.lineno}. Nó atual é um {name}, com complexidade de {weight}.")
+        return weight
+
+    def calculateComplexity(self, source_code: str):
+        return self.calculateTreeComplexity(ast.parse(source_code))
 
-    def is_inside_loop(self, node):
+    def calculateTreeComplexity(self, tree):
         """
-        Função auxiliar que verifica se um nó está dentro de um laço (For ou While).
+        Percorre a árvore com uma pilha explícita, guardando em cada entrada a
+        quantidade de laços acima do nó. Não escreve nada nos nós da árvore.
         """
-        # Subir pela árvore de pais para verificar se há um loop acima
-        parent = getattr(node, 'parent', None)
-        while parent:
-            if isinstance(parent, (ast.For, ast.While)):
-                return True
-            parent = getattr(parent, 'parent', None)
-        return False    
+        table = self.weight_table()
+        loop_nodes = self.LOOP_NODES
+        nested_loop = self.nested_loop
+        debug = self.debug
+        AST = ast.AST
 
-    def calculateComplexity(self, source_code: str):
-        # print("--------------------COMPLEXIDADE MINHA--------------------------\n")
         self.complexity = 0
-        tree = ast.parse(source_code)
-        # astpretty.pprint(tree.body[0])
-
-        # Adiciona referência ao pai para cada nó
-        for node in ast.walk(tree):
-            
-            # if hasattr(node, 'lineno') and self.debug:
-                # print(f"Nó {type(node).__name__} na linha: {node.lineno}")
-
-            # Define o pai do nó atual
+        stack = [(tree, 0)]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node, loop_depth = pop()
+            node_type = type(node)
+
+            weight = table.get(node_type)
+            if weight is not None:
+                if debug:
+                    self.complexity += self.get_weight(node, loop_depth, table)
+                elif node_type is ast.FunctionDef:
+                    if node.name != "main":
+                        self.complexity += weight
+                elif node_type in loop_nodes and loop_depth:
+                    self.complexity += weight + nested_loop
+                else:
+                    self.complexity += weight
+
+            if node_type in loop_nodes:
+                loop_depth += 1
+            for field in node._fields:
+                value = getattr(node, field, None)
+                if isinstance(value, list):
+                    for item in value:
+                        if isinstance(item, AST):
+                            push((item, loop_depth))
+                elif isinstance(value, AST):
+                    push((value, loop_depth))
 
-            for child in ast.iter_child_nodes(node):
-                child.parent = node
-            self.complexity += self.get_weight(node)
-        
-        # print("--------------------COMPLEXIDADE MINHA--------------------------\n")
-        
         return self.complexity
 
     def debug_print(self, string):
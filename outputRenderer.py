@@ -0,0 +1,126 @@
+import csv
+import json
+import sys
+
+from metricRegistry import registry
+
+
+def table_headers(metric_names=None):
+    return ["Path", "File"] + registry.headers(metric_names)
+
+
+# Cabeçalhos com todas as métricas
+HEADERS = table_headers()
+
+FORMATS = ("table", "plain", "jsonl", "csv")
+
+
+def color_header(header):
+    return f"\x1b[1;35m{header}\x1b[0m"
+
+
+def color_header_line(line, headers=HEADERS):
+    """
+    Colore os cabeçalhos de uma única linha de cabeçalho: o custo não depende
+    do tamanho da tabela.
+    """
+    for header in headers:
+        line = line.replace(header, color_header(header), 1)
+    return line
+
+
+class TableRenderer:
+    """
+    Formato original (fancy_grid do tabulate): precisa de todas as linhas antes
+    de imprimir, ordenadas pelo caminho.
+    """
+
+    def __init__(self, metrics_instance, stream=sys.stdout):
+        self.metrics_instance = metrics_instance
+        self.stream = stream
+        self.rows = []
+
+    def row(self, metrics_info):
+        self.rows.append(metrics_info.metrics_to_tabulate())
+
+    def close(self):
+        self.rows.sort(key=lambda x: x[1])
+        self.metrics_instance.print_code_metrics(self.rows, show_headers=True, file=self.stream)
+
+
+class PlainTableRenderer:
+    """
+    Tabela em texto simples impressa por páginas de page_size linhas, com o
+    cabeçalho repetido em cada página. A largura das colunas é calculada por página.
+    """
+
+    def __init__(self, stream=sys.stdout, page_size=50, headers=HEADERS):
+        self.stream = stream
+        self.headers = headers
+        self.page_size = page_size
+        self.page = []
+
+    def row(self, metrics_info):
+        self.page.append([str(value) for value in metrics_info.metrics_to_tabulate()])
+        if len(self.page) >= self.page_size:
+            self.flush()
+
+    def flush(self):
+        if not self.page:
+            return
+        widths = [max(len(header), *(len(row[index]) for row in self.page)) for index, header in enumerate(self.headers)]
+        header_line = "  ".join(color_header(header.ljust(width)) for header, width in zip(self.headers, widths))
+        lines = [header_line]
+        lines.extend("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in self.page)
+        self.stream.write("\n".join(lines) + "\n\n")
+        self.stream.flush()
+        self.page = []
+
+    def close(self):
+        self.flush()
+
+
+class JsonLinesRenderer:
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+
+    def row(self, metrics_info):
+        self.stream.write(json.dumps(metrics_info.metrics_to_record()) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+class CsvRenderer:
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self.writer = None
+
+    def row(self, metrics_info):
+        record = metrics_info.metrics_to_record()
+        if self.writer is None:
+            # Colunas tiradas do primeiro registro (arquivo ou função)
+            self.writer = csv.DictWriter(self.stream, fieldnames=list(record))
+            self.writer.writeheader()
+        self.writer.writerow(record)
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+def make_renderer(output_format, metrics_instance=None, stream=sys.stdout):
+    """
+    Todos os formatos, menos 'table', imprimem cada linha assim que ela chega.
+    """
+    if output_format == "table":
+        return TableRenderer(metrics_instance, stream)
+    if output_format == "plain":
+        headers = table_headers(metrics_instance.engine.metric_names) if metrics_instance is not None else HEADERS
+        return PlainTableRenderer(stream, headers=headers)
+    if output_format == "jsonl":
+        return JsonLinesRenderer(stream)
+    if output_format == "csv":
+        return CsvRenderer(stream)
+    raise ValueError(f"Unknown output format: {output_format}")
@@ -0,0 +1,96 @@
+import os
+import sys
+from multiprocessing import Pool
+
+from metrics import Metrics
+from metricsProfiler import MetricsProfiler
+
+# Instância de Metrics de cada processo do pool, criada uma única vez em init_worker
+_worker_metrics = None
+
+
+def init_worker(cache_dir=None, profile=False, metrics=None, time_budget=None):
+    """
+    Inicializa o processo do pool: os backends (radon, cognitive_complexity)
+    são importados aqui, uma vez por processo, e a instância de Metrics é
+    reaproveitada para todos os arquivos deste processo.
+    Cada processo abre a sua própria conexão com o cache e, com profile, tem
+    o seu próprio MetricsProfiler. O limite de tempo vale para cada arquivo,
+    na thread principal do processo.
+    """
+    global _worker_metrics
+    # Só nos processos do pool: a execução em um processo continua importando sob demanda
+    import cognitive_complexity.api
+    import radon.complexity
+    _worker_metrics = Metrics(Metrics.open_cache(cache_dir, metrics), MetricsProfiler() if profile else None, metrics,
+                              time_budget)
+
+
+def process_path(file_path):
+    # Um arquivo com problema não pode derrubar o processo nem a execução inteira
+    try:
+        metrics = _worker_metrics.process_file(file_path, None)
+    except Exception as e:
+        print(f"Error processing '{file_path}': {e!r}", file=sys.stderr)
+        metrics = None
+
+    # Registro de tempo do arquivo, somado ao profiler do processo principal
+    profiler = _worker_metrics.profiler
+    profile_record = profiler.last_record if profiler is not None else None
+
+    cache = _worker_metrics.cache
+    if cache is None:
+        return metrics, None, profile_record
+    cache.commit()
+    return metrics, (os.getpid(), cache.stats()), profile_record
+
+
+# Tamanho dos blocos quando os arquivos chegam de um gerador e o total não é conhecido
+STREAMING_CHUNKSIZE = 8
+
+
+def default_chunksize(total_files, jobs):
+    # Alguns blocos por processo para equilibrar a carga sem pagar IPC por arquivo
+    return max(1, min(64, total_files // (jobs * 4)))
+
+
+def process_files_parallel(file_paths, jobs, cache_dir=None, profiler=None, chunksize=None, on_result=None,
+                           metrics=None, time_budget=None):
+    """
+    Processa os arquivos em um pool de `jobs` processos e devolve os MetricsInfo
+    ordenados pelo caminho, independente da ordem em que terminaram, junto com
+    os contadores do cache somados entre os processos (None sem cache).
+    Com um profiler, os tempos de cada arquivo medidos nos processos são somados nele.
+    on_result, se dado, é chamado com cada MetricsInfo assim que ele chega.
+    metrics seleciona as métricas calculadas (None = todas); time_budget é o
+    limite de tempo por arquivo, em segundos.
+    file_paths pode ser um gerador: o pool o consome aos poucos, e os processos
+    começam a trabalhar antes de a busca dos arquivos terminar.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = default_chunksize(len(file_paths), jobs) if hasattr(file_paths, '__len__') else STREAMING_CHUNKSIZE
+
+    results = []
+    # Contadores acumulados de cada processo; vale o último recebido de cada pid
+    stats_by_worker = {}
+    with Pool(processes=jobs, initializer=init_worker, initargs=(cache_dir, profiler is not None, metrics, time_budget)) as pool:
+        for metrics, worker_stats, profile_record in pool.imap_unordered(process_path, file_paths, chunksize=chunksize):
+            if metrics:
+                results.append(metrics)
+                if on_result is not None:
+                    on_result(metrics)
+            if profile_record is not None:
+                profiler.add_file_record(profile_record)
+            if worker_stats:
+                pid, stats = worker_stats
+                stats_by_worker[pid] = stats
+
+    results.sort(key=lambda metrics: metrics.filename)
+    if cache_dir is None:
+        return results, None
+    cache_stats = {"hits": 0, "negative_hits": 0, "misses": 0}
+    for stats in stats_by_worker.values():
+        for name, value in stats.items():
+            cache_stats[name] += value
+    return results, cache_stats
@@ -1,89 +1,444 @@
+import argparse
+import itertools
+import json
 import os
+import statistics
+import sys
+import threading
+from multiprocessing import Pool
 from metrics import Metrics
 from datasets import load_dataset
 from metricsInfo import MetricsInfo
+from astFingerprint import DEDUPE_LEVELS, DedupeIndex, DedupeReport
+from shardAssignment import parse_shard, shard_of_index, shard_output_path, write_shard_manifest
+
+from metricSummary import SummaryStats
 
 import csv
 
+# Linguagem das soluções analisadas (PYTHON3 no code_contests)
+PYTHON3 = 3
+
+# Instâncias de cada processo do pool, criadas uma única vez em init_solution_worker
+_worker_metrics = None
+_worker_dedupe = None
+
+
+def init_solution_worker(dedupe="none", time_budget=None):
+    global _worker_metrics, _worker_dedupe
+    _worker_metrics = Metrics(time_budget=time_budget)
+    _worker_dedupe = DedupeIndex(dedupe) if dedupe != "none" else None
+
+
+def analyze_solution(task):
+    """
+    Analisa uma solução (dataset_index, solution_number, rótulo, código) e
+    devolve só as métricas e o status: nome, descrição e código já estão no
+    processo principal e não voltam pelo pool.
+    """
+    dataset_index, solution_number, label, solution = task
+    if solution_number is None:
+        # Problema sem soluções em Python 3: só marca o fim dele, na ordem
+        return dataset_index, None, None, None, None, None
+    metrics_info = _worker_metrics.process_source(label, solution, _worker_dedupe)
+    metric_values = metrics_info.metrics if metrics_info is not None else None
+    status = metrics_info.status if metrics_info is not None else None
+    if _worker_dedupe is None:
+        return dataset_index, solution_number, metric_values, status, None, None
+    fingerprint = _worker_dedupe.last_fingerprint if status != "timeout" and metrics_info is not None else None
+    return (dataset_index, solution_number, metric_values, status, fingerprint,
+            (os.getpid(), _worker_dedupe.stats()))
+
+
+class ProblemAggregates:
+    """
+    Mínimo, mediana e máximo de cada métrica e a quantidade de soluções de um
+    problema. Só os valores do problema atual ficam em memória; a linha é
+    gravada assim que a última solução dele chega. Soluções com erro ou timeout
+    contam como soluções, mas não entram nas estatísticas.
+    """
+
+    def __init__(self, metric_columns):
+        self.metric_columns = metric_columns
+        self.csv_columns = ["dataset_index", "name", "solutions"] + [
+            f"{metric}_{statistic}" for metric in metric_columns for statistic in ("min", "median", "max")]
+
+    def row(self, dataset_index, name, metric_rows):
+        row_data = {"dataset_index": dataset_index, "name": name, "solutions": len(metric_rows)}
+        for metric in self.metric_columns:
+            values = [metrics[metric] for metrics in metric_rows if metrics[metric] is not None]
+            row_data[f"{metric}_min"] = min(values) if values else None
+            row_data[f"{metric}_median"] = statistics.median(values) if values else None
+            row_data[f"{metric}_max"] = max(values) if values else None
+        return row_data
+
+
 class ProcessDataset:
-    def __init__(self) -> None:
-        self.csv_path = 'metrics_dataset.csv'
-        self.csv_columns = [
-        "name", "description", "solution", "solution_number",
+    def __init__(self, csv_path='metrics_dataset.csv', batch_size=500, problems_path=None, shard=None,
+                 time_budget=None, summary_path=None) -> None:
+        # Com shard (i, N) só os problemas com dataset_index % N == i, em arquivos próprios da parte
+        self.shard = shard
+        if shard is not None:
+            csv_path = shard_output_path(csv_path, shard)
+            problems_path = shard_output_path(problems_path, shard) if problems_path else None
+            summary_path = shard_output_path(summary_path, shard) if summary_path else None
+        self.csv_path = csv_path
+        self.checkpoint_path = csv_path + '.checkpoint.json'
+        self.problems_path = problems_path or os.path.splitext(csv_path)[0] + '_problems.csv'
+        self.summary_path = summary_path or os.path.splitext(csv_path)[0] + '_summary.json'
+        self.dataset_name = 'deepmind/code_contests'
+        self.metric_columns = [
         "cyclomatic_complexity", "unique_operators", "total_statements",
-        "avg_nested_depth", "total_operators", "sloc", "cognitive_complexity"
+        "avg_nested_depth", "total_operators", "sloc", "cognitive_complexity",
+        "complexipy_cognitive_complexity"
         ]
-        file_exists = os.path.isfile(self.csv_path)
+        self.csv_columns = ["dataset_index", "name", "description", "solution", "solution_number"] + self.metric_columns
+        # 'ok', 'error' (solução que não pôde ser analisada, com métricas vazias) ou 'timeout'
+        self.csv_columns.append("status")
+        # Limite de tempo por solução, em segundos
+        self.time_budget = time_budget
+        self.aggregates = ProblemAggregates(self.metric_columns)
+        # Distribuição de cada métrica no dataset todo, atualizada com cada lote gravado
+        self.summary = SummaryStats(self.metric_columns)
+        # Linhas são gravadas em lotes de pelo menos batch_size, sempre ao fim de um
+        # problema, cada lote seguido de fsync e checkpoint
+        self.batch_size = batch_size
+        self.pending_rows = []
+        self.pending_problems = []
+        self.rows_written = 0
+        self.csv_file = None
+        self.csv_writer = None
+        self.problems_file = None
+        self.problems_writer = None
 
-        with open(self.csv_path, mode='a', newline='') as file:
-            self.csv_writer = csv.DictWriter(file, fieldnames=self.csv_columns)
-            if not self.csv_writer:
-                self.csv_writer.writeheader()
-        
+    def open_output(self, resume=False):
+        """
+        Abre o CSV para escrita e retorna o checkpoint a partir do qual continuar
+        (None para uma execução do zero).
+        """
+        checkpoint = self.load_checkpoint() if resume else None
+        if checkpoint is None:
+            # Execução nova: começa os arquivos do zero com cabeçalho
+            self.csv_file = open(self.csv_path, mode='w', newline='')
+            self.csv_writer = csv.DictWriter(self.csv_file, fieldnames=self.csv_columns, extrasaction='ignore')
+            self.csv_writer.writeheader()
+            self.problems_file = open(self.problems_path, mode='w', newline='')
+            self.problems_writer = csv.DictWriter(self.problems_file, fieldnames=self.aggregates.csv_columns)
+            self.problems_writer.writeheader()
+            self.commit_batch(None)
+            return None
 
-    def write_row(self, row_data):
-        self.csv_writer.writerow(row_data)
-        
+        # Descarta o que foi escrito depois do último checkpoint (lote interrompido no meio)
+        self.csv_file = self.reopen_truncated(self.csv_path, checkpoint["csv_size"])
+        self.csv_writer = csv.DictWriter(self.csv_file, fieldnames=self.csv_columns, extrasaction='ignore')
+        if "problems_size" in checkpoint:
+            self.problems_file = self.reopen_truncated(self.problems_path, checkpoint["problems_size"])
+        else:
+            # Checkpoint de uma versão sem agregados: começa o arquivo deles agora
+            self.problems_file = open(self.problems_path, mode='w', newline='')
+        self.problems_writer = csv.DictWriter(self.problems_file, fieldnames=self.aggregates.csv_columns)
+        if "problems_size" not in checkpoint:
+            self.problems_writer.writeheader()
+        self.rows_written = checkpoint["rows"]
+        if "summary" in checkpoint:
+            self.summary = SummaryStats.from_state(checkpoint["summary"])
+        else:
+            # Checkpoint de uma versão sem resumo: refeito a partir das linhas já gravadas
+            self.rebuild_summary()
+        return checkpoint
 
-    def run(self):
+    def rebuild_summary(self):
+        csv.field_size_limit(sys.maxsize)
+        with open(self.csv_path, 'r', newline='') as file:
+            for row in csv.DictReader(file):
+                self.summary.add({metric: float(row[metric]) if row.get(metric) else None
+                                  for metric in self.metric_columns})
 
-        # Carrega o dataset deepmind/code_contests do Hugging Face
-        dataset = load_dataset('deepmind/code_contests')
+    @staticmethod
+    def reopen_truncated(path, size):
+        file = open(path, mode='r+', newline='')
+        file.truncate(size)
+        file.seek(size)
+        return file
 
-        # Acessa o conjunto de dados de treinamento
-        train_dataset = dataset['train']
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
 
-        total_lines = len(train_dataset)
+    def write_row(self, row_data):
+        self.pending_rows.append(row_data)
 
-        print(total_lines)
+    def end_problem(self, dataset_index, solution_number, aggregate_row):
+        """
+        Fim de um problema: a linha de agregados entra no lote, e o lote é
+        gravado se já tiver batch_size linhas. Assim o checkpoint sempre cai
+        entre dois problemas e --resume nunca deixa um agregado pela metade.
+        """
+        self.pending_problems.append(aggregate_row)
+        if len(self.pending_rows) >= self.batch_size:
+            self.flush(dataset_index, solution_number)
+
+    def flush(self, dataset_index, solution_number):
+        if not self.pending_rows and not self.pending_problems:
+            return
+        self.csv_writer.writerows(self.pending_rows)
+        self.problems_writer.writerows(self.pending_problems)
+        for row_data in self.pending_rows:
+            self.summary.add(row_data)
+        self.rows_written += len(self.pending_rows)
+        self.pending_rows = []
+        self.pending_problems = []
+        self.commit_batch({"dataset_index": dataset_index, "solution_number": solution_number,
+                           "problem_complete": True})
+
+    def commit_batch(self, position):
+        """
+        Garante o lote em disco e só então grava o checkpoint, de forma atômica.
+        O checkpoint guarda o tamanho do CSV para que --resume descarte linhas
+        escritas depois dele, e o resumo das distribuições até ali.
+        """
+        for file in (self.csv_file, self.problems_file):
+            file.flush()
+            os.fsync(file.fileno())
 
-        # Contador para nomear os arquivos
+        checkpoint = {"rows": self.rows_written, "csv_size": self.csv_file.tell(),
+                      "problems_size": self.problems_file.tell(), "summary": self.summary.state()}
+        if position is not None:
+            checkpoint.update(position)
+        temp_path = self.checkpoint_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(checkpoint, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.checkpoint_path)
 
+    def close(self, dataset_index, solution_number):
+        self.flush(dataset_index, solution_number)
+        self.csv_file.close()
+        self.problems_file.close()
 
-        for idx,line in enumerate(train_dataset):
-            name = line['name']
-            description = line['description']
-            solutions = line['solutions']  # Acessa a coluna 'solutions' de cada exemplo
-            languages = solutions['language']  # Extrai o vetor 'language'
-            cont = 0
-            solution_counter = 0
+    def load_train_dataset(self, data_files=None, streaming=False):
+        """
+        Carrega o split de treino. Com data_files (arquivos ou globs de shards
+        Parquet/Arrow de uma cópia local do dataset) funciona sem rede; com
+        streaming as linhas são lidas sob demanda, sem materializar o split.
+        """
+        if data_files:
+            builder = 'arrow' if all(path.endswith('.arrow') for path in data_files) else 'parquet'
+            return load_dataset(builder, data_files={'train': data_files}, split='train', streaming=True)
+        return load_dataset(self.dataset_name, split='train', streaming=streaming)
 
-            for language in languages:
-                if language == 3:
+    def iter_solution_tasks(self, train_dataset, start_index, last_solution, open_problems, in_flight=None,
+                            stop=None):
+        """
+        Tarefas (dataset_index, solution_number, rótulo, código) de todas as
+        soluções em Python 3, problema a problema. Antes das tarefas de cada
+        problema, registra em open_problems o nome, a descrição, os códigos e
+        quantas soluções faltam. Com in_flight (semáforo) só avança quando há
+        vaga: o pool consome o iterador numa thread própria e, sem limite,
+        leria o dataset inteiro para a fila. stop encerra o iterador quando a
+        execução é interrompida, para que o pool consiga terminar.
+        """
+        for idx, line in enumerate(itertools.islice(train_dataset, start_index, None), start=start_index):
+            self.problems_scanned = idx + 1
+            if self.shard is not None and shard_of_index(idx, self.shard[1]) != self.shard[0]:
+                continue
+            solutions = line['solutions']
+            python_solutions = [solution for language, solution in zip(solutions['language'], solutions['solution'])
+                                if language == PYTHON3]
+            # Soluções já gravadas antes do checkpoint
+            first = last_solution + 1 if idx == start_index else 0
+            if first and first >= len(python_solutions):
+                continue
 
-                    solution = solutions['solution'][cont]
+            name = line['name'] if line['name'] is not None else 'None'
+            open_problems[idx] = {
+                "name": name,
+                "description": line['description'] if line['description'] is not None else 'None',
+                "solutions": python_solutions,
+                "remaining": len(python_solutions) - first,
+                "metrics": [],
+            }
+            # Um problema sem soluções também tem a sua linha de agregados
+            solution_numbers = range(first, len(python_solutions)) or [None]
+            for solution_number in solution_numbers:
+                if in_flight is not None:
+                    in_flight.acquire()
+                    if stop.is_set():
+                        return
+                if solution_number is None:
+                    yield idx, None, None, None
+                else:
+                    yield idx, solution_number, f"{name}#{solution_number}", python_solutions[solution_number]
 
-                    file_name = f"temp.py"
+    @staticmethod
+    def analyze_tasks(tasks, jobs, chunksize, dedupe, time_budget=None):
+        """
+        Resultados na mesma ordem das tarefas, o que mantém o CSV determinístico
+        e o checkpoint sempre depois de tudo o que já foi gravado.
+        """
+        if jobs == 1:
+            init_solution_worker(dedupe, time_budget)
+            yield from map(analyze_solution, tasks)
+            return
+        with Pool(processes=jobs, initializer=init_solution_worker, initargs=(dedupe, time_budget)) as pool:
+            yield from pool.imap(analyze_solution, tasks, chunksize=chunksize)
 
-                    # Salva a solução em um arquivo .py
-                    with open(file_name, 'w') as file:
-                        file.write(solution)
-                    metrics = Metrics()
-                    metrics_info: MetricsInfo = metrics.process_file("temp.py", solution)
+    def write_results(self, results, open_problems, in_flight, dedupe_summary, verbose):
+        for dataset_index, solution_number, metric_values, status, fingerprint, worker_stats in results:
+            if in_flight is not None:
+                in_flight.release()
+            problem = open_problems[dataset_index]
+            if solution_number is not None:
+                solution = problem["solutions"][solution_number]
+                # O código não é mais necessário depois da linha desta solução
+                problem["solutions"][solution_number] = None
+                problem["remaining"] -= 1
 
-                    metrics_info.name = name if name is not None else 'None'
-                    metrics_info.description = description if description is not None else 'None'
-                    metrics_info.solution = solution
-                    metrics_info.solution_number = solution_counter
-                    # Incrementa o contador
-                    solution_counter += 1
+                if metric_values is None:
+                    # Solução que não pôde ser analisada: também tem linha e conta no problema
+                    metric_values = dict.fromkeys(self.metric_columns)
+                    status = "error"
+                label = f"{problem['name']}#{solution_number}"
+                metrics_info = MetricsInfo(path=label, filename=label, name=problem["name"], code_source=solution,
+                                           description=problem["description"], solution=solution,
+                                           solution_number=solution_number, status=status or "ok", **metric_values)
+                row_data = metrics_info.metrics_to_row_data()
+                row_data["dataset_index"] = dataset_index
+                self.write_row(row_data)
+                problem["metrics"].append(metric_values)
 
+                if verbose:
                     print(metrics_info)
 
-                    
-                    break
+                if dedupe_summary is not None and fingerprint is not None:
+                    dedupe_summary.add(fingerprint, label)
+            if worker_stats is not None:
+                dedupe_summary.update_stats(*worker_stats)
 
-                cont += 1
-            percent_done = (idx + 1) / total_lines * 100
+            if problem["remaining"] == 0:
+                # Última solução do problema: os agregados saem já, e os valores são descartados
+                if solution_number is None:
+                    solution_number = -1
+                self.last_complete = (dataset_index, solution_number)
+                self.end_problem(dataset_index, solution_number,
+                                 self.aggregates.row(dataset_index, problem["name"], problem["metrics"]))
+                del open_problems[dataset_index]
 
-            # if solution_counter >= 100:
-            #     break;
+    def run(self, data_files=None, streaming=False, resume=False, verbose=False, dedupe="none", dedupe_report=None,
+            jobs=1, chunksize=16):
 
-        
-        print(f"Progresso: {percent_done:.2f}%")
+        # Carrega o dataset deepmind/code_contests do Hugging Face (ou os shards locais)
+        train_dataset = self.load_train_dataset(data_files, streaming)
+
+        # Datasets em streaming não têm tamanho conhecido
+        total_lines = len(train_dataset) if hasattr(train_dataset, '__len__') else None
+
+        print(total_lines)
 
+        checkpoint = self.open_output(resume)
+        start_index = 0
+        last_solution = -1
+        # Posição da última solução do último problema concluído, gravada no checkpoint
+        self.last_complete = (-1, -1)
+        if checkpoint is not None and "dataset_index" in checkpoint:
+            idx = checkpoint["dataset_index"]
+            self.last_complete = (idx, checkpoint["solution_number"])
+            if checkpoint.get("problem_complete"):
+                start_index = idx + 1
+            else:
+                # Checkpoint de uma versão anterior, no meio de um problema: continua
+                # depois da última solução gravada (o agregado cobre só as restantes)
+                start_index = idx
+                last_solution = checkpoint["solution_number"]
+            print(f"Retomando do problema {start_index}, solução {last_solution + 1} ({self.rows_written} linhas)")
+
+        # Soluções repetidas (a menos de comentários, formatação e, conforme o nível, nomes e constantes)
+        dedupe_summary = DedupeReport(keep_labels=dedupe_report is not None) if dedupe != "none" else None
+        jobs = jobs or os.cpu_count() or 1
+        # Limite de soluções enviadas ao pool e ainda não recebidas (ao menos um bloco)
+        in_flight = threading.Semaphore(chunksize * jobs * 4) if jobs > 1 else None
+        stop = threading.Event()
+        # Problemas com soluções ainda em análise: dataset_index -> dados do problema
+        open_problems = {}
+        self.problems_scanned = start_index
+
+        tasks = self.iter_solution_tasks(train_dataset, start_index, last_solution, open_problems, in_flight, stop)
+        results = self.analyze_tasks(tasks, jobs, chunksize, dedupe, self.time_budget)
+        try:
+            self.write_results(results, open_problems, in_flight, dedupe_summary, verbose)
+        finally:
+            # Libera a thread do pool que espera vaga no semáforo antes de fechar o pool
+            stop.set()
+            if in_flight is not None:
+                in_flight.release()
+            results.close()
+        self.close(*self.last_complete)
+
+        processed_lines = self.problems_scanned
+        if total_lines:
+            print(f"Progresso: {processed_lines / total_lines * 100:.2f}%")
+        else:
+            print(f"Progresso: {processed_lines} problemas")
+        print(f"{self.rows_written} linhas em {self.csv_path}, agregados por problema em {self.problems_path}")
+        self.summary.write(self.summary_path)
+        print(self.summary.report())
+        print(f"Resumo das distribuições em {self.summary_path}")
+
+        if self.shard is not None:
+            # Execução completa da parte: o manifesto diz ao merge o que esperar dela
+            output_dir = os.path.dirname(os.path.abspath(self.csv_path))
+            write_shard_manifest(self.csv_path, self.shard, "dataset", metrics=self.metric_columns,
+                                 problems=processed_lines, rows=self.rows_written,
+                                 problems_output=os.path.relpath(self.problems_path, output_dir),
+                                 summary=os.path.relpath(self.summary_path, output_dir))
+
+        if dedupe_summary is not None:
+            print(dedupe_summary.summary())
+            if dedupe_report:
+                dedupe_summary.write_report(dedupe_report)
 
 
 if __name__ == "__main__":
-    process_dataset = ProcessDataset()
-    process_dataset.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Calcula as métricas de todas as soluções em Python 3 do deepmind/code_contests.")
+    parser.add_argument('--data-files', nargs='+', default=None,
+                        help="Shards Parquet/Arrow locais do split de treino (aceita globs). Funciona offline.")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Lê o dataset do Hub sob demanda, sem materializar o split inteiro.")
+    parser.add_argument('--output', type=str, default='metrics_dataset.csv', help="CSV de saída, uma linha por solução.")
+    parser.add_argument('--problems-output', type=str, default=None,
+                        help="CSV com mínimo, mediana e máximo de cada métrica por problema "
+                             "(padrão: <output>_problems.csv).")
+    parser.add_argument('--summary-output', type=str, default=None,
+                        help="JSON com a distribuição de cada métrica (contagem, média, quantis e histograma), "
+                             "que pode ser juntado com o de outras execuções (padrão: <output>_summary.json).")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="Processos que analisam as soluções (0 usa todos os núcleos).")
+    parser.add_argument('--chunksize', type=int, default=16, help="Soluções enviadas de uma vez a cada processo.")
+    parser.add_argument('--timeout', type=float, default=30.0, metavar='SECONDS',
+                        help="Limite de tempo por solução (padrão 30; 0 desliga). Uma solução que passa dele sai "
+                             "com status 'timeout' e métricas vazias, e a execução continua.")
+    parser.add_argument('--shard', type=parse_shard, default=None, metavar='I/N',
+                        help="Processa só os problemas com dataset_index %% N == I, em arquivos com o sufixo "
+                             ".shard-I-of-N; junte as partes com merge_shards.py.")
+    parser.add_argument('--batch-size', type=int, default=500, help="Linhas por lote gravado com fsync e checkpoint.")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continua a partir do checkpoint da execução anterior, sem repetir nem perder linhas.")
+    parser.add_argument('--verbose', action='store_true', help="Imprime as métricas de cada solução.")
+    parser.add_argument('--dedupe', choices=DEDUPE_LEVELS, default='none',
+                        help="Reaproveita as métricas de soluções com a mesma árvore: 'ast' ignora comentários e "
+                             "formatação, 'names' também os identificadores e 'all' também as constantes.")
+    parser.add_argument('--dedupe-report', type=str, default=None,
+                        help="Grava os grupos de soluções duplicadas neste arquivo JSON.")
+    args = parser.parse_args()
+    if args.jobs < 0:
+        parser.error("--jobs precisa ser um número positivo de processos, ou 0 para um por núcleo")
+
+    process_dataset = ProcessDataset(args.output, args.batch_size, args.problems_output, args.shard,
+                                     args.timeout or None, args.summary_output)
+    process_dataset.run(data_files=args.data_files, streaming=args.streaming, resume=args.resume, verbose=args.verbose,
+                        dedupe=args.dedupe, dedupe_report=args.dedupe_report, jobs=args.jobs,
+                        chunksize=max(1, args.chunksize))
@@ -0,0 +1,109 @@
+from array import array
+
+from metricRegistry import registry
+from metricsInfo import MetricsInfo
+
+
+class MetricsBatch:
+    """
+    Resultados guardados por coluna (struct-of-arrays): cada métrica numérica é
+    um array tipado, sem um objeto Python por valor. Os textos (código-fonte,
+    descrição e solução) só são guardados com keep_source=True.
+
+    Linhas continuam disponíveis como MetricsInfo, então metrics_to_row_data e
+    metrics_to_tabulate funcionam como antes.
+    """
+
+    # Tipo do array de cada tipo de valor das métricas ('q' = int64, 'd' = float64)
+    TYPECODES = {int: 'q', float: 'd'}
+    STRING_COLUMNS = ("path", "filename", "name")
+    SOURCE_COLUMNS = ("code_source", "description", "solution")
+
+    # solution_number vazio (arquivos fora do dataset) é guardado como -1
+    MISSING_SOLUTION_NUMBER = -1
+    # Métricas de uma linha de timeout (status 'timeout'), que não têm valor
+    MISSING_METRIC = {'q': -1, 'd': float('nan')}
+
+    def __init__(self, keep_source=False, metric_names=None):
+        self.keep_source = keep_source
+        # Uma coluna por métrica selecionada (None = todas as do registro)
+        self.metric_names = tuple(metric.name for metric in registry.resolve(metric_names))
+        self.columns = {"solution_number": array('q')}
+        for metric in registry.resolve(metric_names):
+            self.columns[metric.name] = array(self.TYPECODES[metric.value_type])
+        for name in self.STRING_COLUMNS:
+            self.columns[name] = []
+        # 'ok'/'timeout' com limite de tempo por arquivo, None sem limite
+        self.columns["status"] = []
+        if keep_source:
+            for name in self.SOURCE_COLUMNS:
+                self.columns[name] = []
+
+    def __len__(self):
+        return len(self.columns["path"])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(self, index):
+        values = {name: column[index] for name, column in self.columns.items()}
+        if values["solution_number"] == self.MISSING_SOLUTION_NUMBER:
+            values["solution_number"] = ""
+        if values["status"] == "timeout":
+            values.update(dict.fromkeys(self.metric_names))
+        if not self.keep_source:
+            values.update(code_source="", description="", solution="")
+        return MetricsInfo(**values)
+
+    def append(self, metrics_info):
+        for name, column in self.columns.items():
+            value = getattr(metrics_info, name)
+            if name == "solution_number" and value == "":
+                value = self.MISSING_SOLUTION_NUMBER
+            elif value is None and name in self.metric_names:
+                value = self.MISSING_METRIC[column.typecode]
+            column.append(value)
+
+    def extend(self, metrics_infos):
+        for metrics_info in metrics_infos:
+            self.append(metrics_info)
+
+    def sort(self, key_column="filename"):
+        order = sorted(range(len(self)), key=self.columns[key_column].__getitem__)
+        for name, column in self.columns.items():
+            if isinstance(column, array):
+                self.columns[name] = array(column.typecode, (column[index] for index in order))
+            else:
+                self.columns[name] = [column[index] for index in order]
+
+    def metrics_to_tabulate(self):
+        return [metrics_info.metrics_to_tabulate() for metrics_info in self]
+
+    def metrics_to_row_data(self):
+        return [metrics_info.metrics_to_row_data() for metrics_info in self]
+
+    def to_arrow(self):
+        """
+        Tabela Arrow com as colunas do lote. As colunas numéricas apontam para o
+        buffer dos arrays (sem cópia); o lote não deve mudar enquanto a tabela existir.
+        """
+        import pyarrow as pa
+
+        arrow_types = {'q': pa.int64(), 'd': pa.float64()}
+        arrays = {}
+        for name, column in self.columns.items():
+            if name == "status" and not any(column):
+                # Sem limite de tempo a coluna não existe no Parquet
+                continue
+            if isinstance(column, array):
+                arrays[name] = pa.Array.from_buffers(arrow_types[column.typecode], len(column),
+                                                     [None, pa.py_buffer(column)])
+            else:
+                arrays[name] = pa.array(column, type=pa.large_string())
+        return pa.table(arrays)
+
+    def write_parquet(self, parquet_path):
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), parquet_path)
@@ -0,0 +1,73 @@
+import json
+import os
+
+
+class RunManifest:
+    """
+    Manifesto da execução anterior: para cada arquivo guarda mtime, tamanho e as
+    métricas calculadas. Na execução seguinte só os arquivos cuja assinatura de
+    stat mudou precisam ser lidos de novo.
+    """
+
+    VERSION = 1
+
+    def __init__(self, manifest_path, config_version=""):
+        self.manifest_path = manifest_path
+        self.config_version = config_version
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.manifest_path, 'r') as file:
+                data = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return
+        # Manifesto de outra versão ou outra configuração de métricas: descarta tudo
+        if data.get("version") != self.VERSION or data.get("config_version") != self.config_version:
+            return
+        self.entries = data.get("files", {})
+
+    @staticmethod
+    def signature(file_path):
+        stat = os.stat(file_path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def split(self, file_paths):
+        """
+        Separa os arquivos em (inalterados, alterados). Inalterados é uma lista de
+        (caminho, entrada do manifesto); alterados é uma lista de (caminho, assinatura).
+        Arquivos que sumiram do disco não aparecem em nenhuma das duas.
+        """
+        unchanged = []
+        changed = []
+        for file_path in file_paths:
+            try:
+                signature = self.signature(file_path)
+            except OSError:
+                continue
+            entry = self.entries.get(file_path)
+            if entry is not None and entry["stat"] == signature:
+                unchanged.append((file_path, entry))
+            else:
+                changed.append((file_path, signature))
+        return unchanged, changed
+
+    @staticmethod
+    def entry(signature, metrics):
+        # metrics None registra que o arquivo falhou, para não reler enquanto não mudar
+        return {"stat": signature, "metrics": metrics}
+
+    def save(self, entries):
+        """
+        Grava o manifesto com as entradas desta execução. Arquivos removidos
+        desde a execução anterior ficam de fora.
+        """
+        self.entries = entries
+        directory = os.path.dirname(self.manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump({"version": self.VERSION, "config_version": self.config_version, "files": entries}, file)
+        os.replace(temp_path, self.manifest_path)
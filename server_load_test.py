@@ -0,0 +1,180 @@
+"""
+Teste de carga do analysisServer.py: envia pedidos analyze com até
+--concurrency deles em andamento e mede a latência de cada um (do envio à
+resposta). Sem --socket, inicia o servidor pela entrada/saída padrão e mede
+também a partida dele; com --cold, compara com chamadas avulsas do metrics.py.
+
+    python server_load_test.py code --requests 500 --concurrency 8 --jobs 4
+    python server_load_test.py code --socket /tmp/metrics.sock --source
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from fileDiscovery import FileDiscovery
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPORTED_PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values, percent):
+    # Valor da posição p% * (n - 1), sem interpolação
+    if not sorted_values:
+        return None
+    return sorted_values[int(percent / 100 * (len(sorted_values) - 1))]
+
+
+class ServerClient:
+    """
+    Canal com o servidor (processo filho ou socket): os pedidos saem por uma
+    thread e as respostas, que podem chegar fora de ordem, são casadas pelo id
+    em outra.
+    """
+
+    def __init__(self, reader, writer, concurrency):
+        self.reader = reader
+        self.writer = writer
+        self.slots = threading.Semaphore(concurrency)
+        self.sent = {}
+        self.latencies = []
+        self.errors = []
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.answered = threading.Condition(self.lock)
+        self.thread = threading.Thread(target=self.read_responses, daemon=True)
+        self.thread.start()
+
+    def read_responses(self):
+        for line in self.reader:
+            received = time.perf_counter()
+            message = json.loads(line)
+            with self.lock:
+                started = self.sent.pop(message.get("id"), None)
+                if started is not None:
+                    self.latencies.append(received - started)
+                if "error" in message:
+                    self.errors.append(message["error"]["message"])
+                self.answered.notify_all()
+            self.slots.release()
+
+    def call(self, method, params=None):
+        # Envia sem esperar a resposta; bloqueia só quando já há --concurrency pedidos em andamento
+        self.slots.acquire()
+        with self.lock:
+            self.next_id += 1
+            request_id = self.next_id
+            self.sent[request_id] = time.perf_counter()
+        self.writer.write(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method,
+                                      "params": params or {}}) + "\n")
+        self.writer.flush()
+
+    def wait(self):
+        with self.lock:
+            while self.sent:
+                self.answered.wait()
+
+
+def request_params(paths, send_source, metrics):
+    # Parâmetros de cada arquivo, preparados antes da medição
+    params = []
+    for path in paths:
+        if send_source:
+            with open(path, 'r') as file:
+                item = {"source": file.read(), "name": path}
+        else:
+            item = {"path": os.path.abspath(path)}
+        if metrics:
+            item["metrics"] = metrics
+        params.append(item)
+    return params
+
+
+def cold_latencies(paths, count):
+    # Uma execução do metrics.py por arquivo, como faz um hook sem o servidor
+    latencies = []
+    for index in range(count):
+        path = paths[index % len(paths)]
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(HERE, "metrics.py"), path, "--no-cache", "--format", "jsonl"],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)
+
+
+def format_latencies(latencies):
+    values = [f"p{percent} {percentile(latencies, percent) * 1000:.2f} ms" for percent in REPORTED_PERCENTILES]
+    return ", ".join(values) + f", max {latencies[-1] * 1000:.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for analysisServer.py: request latency percentiles "
+                                                 "and throughput.")
+    parser.add_argument('paths', nargs='+', help="Python files or directories whose files are analyzed.")
+    parser.add_argument('--socket', type=str, default=None, metavar='PATH',
+                        help="Connect to a server already listening here instead of starting one over stdio.")
+    parser.add_argument('--jobs', '-j', type=int, default=0, help="Workers of the started server (0: every core).")
+    parser.add_argument('--requests', '-n', type=int, default=200, help="Number of analyze requests (default 200).")
+    parser.add_argument('--concurrency', '-c', type=int, default=4, help="Requests in flight at once (default 4).")
+    parser.add_argument('--source', action='store_true', help="Send the file contents instead of the paths.")
+    parser.add_argument('--metrics', type=str, default=None, help="Metric selection sent with every request.")
+    parser.add_argument('--cold', type=int, default=0, metavar='N',
+                        help="Also time N separate `metrics.py FILE` runs for comparison.")
+    args = parser.parse_args()
+
+    discovery = FileDiscovery()
+    paths = sorted(discovery.iter_paths(args.paths))
+    if not paths:
+        parser.error("no Python files found")
+    params = request_params(paths, args.source, args.metrics)
+
+    server = None
+    start = time.perf_counter()
+    if args.socket:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(args.socket)
+        reader = connection.makefile('r', encoding='utf-8')
+        writer = connection.makefile('w', encoding='utf-8')
+    else:
+        command = [sys.executable, os.path.join(HERE, "analysisServer.py"), "--no-cache", "--jobs", str(args.jobs)]
+        server = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+        reader, writer = server.stdout, server.stdin
+    client = ServerClient(reader, writer, max(1, args.concurrency))
+
+    # Primeira resposta: servidor pronto (a partida, se foi iniciado aqui)
+    client.call("ping")
+    client.wait()
+    startup = time.perf_counter() - start
+    client.latencies.clear()
+
+    start = time.perf_counter()
+    for index in range(args.requests):
+        client.call("analyze", params[index % len(params)])
+    client.wait()
+    elapsed = time.perf_counter() - start
+
+    if server is not None:
+        client.call("shutdown")
+        client.wait()
+        writer.close()
+        server.wait()
+        print(f"Server startup: {startup * 1000:.1f} ms")
+    else:
+        connection.close()
+
+    latencies = sorted(client.latencies)
+    print(f"{args.requests} requests over {len(paths)} files, concurrency {args.concurrency}: "
+          f"{args.requests / elapsed:.1f} requests/s, {len(client.errors)} errors")
+    print(f"Latency: {format_latencies(latencies)}")
+    for message in client.errors[:5]:
+        print(f"  error: {message}")
+    if args.cold:
+        print(f"Separate metrics.py runs ({args.cold}): {format_latencies(cold_latencies(paths, args.cold))}")
+
+
+if __name__ == "__main__":
+    main()
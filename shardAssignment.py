@@ -0,0 +1,102 @@
+"""
+Divisão estática do trabalho em N partes (--shard i/N), para rodar em várias
+máquinas sem coordenação. Arquivos vão para a parte dada pelo hash do
+caminho, estável entre execuções e máquinas (um arquivo novo não muda a
+parte dos outros); linhas do dataset vão para a parte dataset_index % N.
+
+Cada parte grava, ao lado da saída, um manifesto (<saída>.shard.json) com a
+parte, a configuração e as contagens que merge_shards.py usa para conferir que
+nada ficou faltando nem apareceu duas vezes.
+"""
+import argparse
+import hashlib
+import json
+import os
+
+SHARD_MANIFEST_SUFFIX = ".shard.json"
+SHARD_MANIFEST_VERSION = 1
+
+
+def parse_shard(text):
+    # Tipo do argparse para --shard i/N (i de 0 a N-1)
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard '{text}' (expected I/N, e.g. 0/4)") from None
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"invalid shard '{text}' (I must be between 0 and N-1)")
+    return index, count
+
+
+def shard_key(path):
+    # Mesma chave para o mesmo caminho em qualquer sistema: normalizado e com '/'
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+def shard_of_path(path, count):
+    digest = hashlib.blake2b(shard_key(path).encode("utf-8", "surrogateescape"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def shard_of_index(dataset_index, count):
+    return dataset_index % count
+
+
+def shard_output_path(path, shard):
+    # out.jsonl -> out.shard-0-of-4.jsonl, para que as partes nunca gravem no mesmo arquivo
+    index, count = shard
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.shard-{index}-of-{count}{extension}"
+
+
+class ShardFilter:
+    """
+    Deixa passar só os arquivos desta parte e guarda quais foram, para que o
+    manifesto registre também os que falharam na análise.
+    """
+
+    def __init__(self, index, count):
+        self.index = index
+        self.count = count
+        self.assigned = []
+
+    def accept(self, path):
+        if shard_of_path(path, self.count) != self.index:
+            return False
+        self.assigned.append(path)
+        return True
+
+    def filter(self, paths):
+        for path in paths:
+            if self.accept(path):
+                yield path
+
+
+def write_shard_manifest(output_path, shard, kind, **fields):
+    """
+    Grava o manifesto da parte ao lado de output_path. Os caminhos de outras
+    saídas são gravados relativos ao manifesto, para que as partes possam ser
+    copiadas de máquinas diferentes para um mesmo diretório.
+    """
+    index, count = shard
+    manifest = {"version": SHARD_MANIFEST_VERSION, "kind": kind, "shard": index, "count": count,
+                "output": os.path.basename(output_path)}
+    manifest.update(fields)
+    manifest_path = output_path + SHARD_MANIFEST_SUFFIX
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(temp_path, manifest_path)
+    return manifest_path
+
+
+def read_shard_manifest(output_path):
+    manifest_path = output_path + SHARD_MANIFEST_SUFFIX
+    try:
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        raise ValueError(f"'{output_path}' has no shard manifest ({manifest_path})") from None
+    if manifest.get("version") != SHARD_MANIFEST_VERSION:
+        raise ValueError(f"Unsupported shard manifest version in {manifest_path}")
+    return manifest
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório, sem pacote
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+CODE_DIR = os.path.join(ROOT, "code")
+
+
+@pytest.fixture
+def dataset_files(tmp_path):
+    """
+    Cópia mínima do split de treino do code_contests em Parquet: soluções em
+    Python 3 e em outras linguagens, um problema sem soluções em Python 3,
+    uma solução vazia e uma com erro de sintaxe.
+    """
+    pyarrow = pytest.importorskip("pyarrow")
+    parquet = pytest.importorskip("pyarrow.parquet")
+    solutions = [
+        [(3, "print(input())"), (2, "print raw_input()"), (3, "n = int(input())\nprint(n * 2)\n")],
+        [(1, "int main() {}")],
+        [(3, "for i in range(3):\n    if i % 2:\n        print(i)\n"), (3, "")],
+        [(3, "def (")],
+        [(3, "def f(x):\n    while x:\n        x -= 1\n    return x\nprint(f(3))\n")],
+        [(3, "a, b = map(int, input().split())\nprint(a + b if a > b else a - b)\n"), (3, "print(1)")],
+        [(3, "import sys\nfor line in sys.stdin:\n    print(line.strip()[::-1])\n")],
+    ]
+    table = pyarrow.table({
+        "name": [f"problem-{index}" for index in range(len(solutions))],
+        "description": [f"Description {index}" for index in range(len(solutions))],
+        "solutions": [{"language": [language for language, _ in problem],
+                       "solution": [code for _, code in problem]} for problem in solutions],
+    })
+    path = tmp_path / "train-00000-of-00001.parquet"
+    parquet.write_table(table, path)
+    os.environ.setdefault("HF_DATASETS_OFFLINE", "1")
+    return [str(path)]
@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+pytest.importorskip("datasets")
+from process_dataset_metrics import ProcessDataset  # noqa: E402
+
+
+def read(path):
+    with open(path, "r") as file:
+        return file.read()
+
+
+def outputs(csv_path):
+    # CSV das soluções, agregados por problema e resumo das distribuições de uma execução
+    base = os.path.splitext(csv_path)[0]
+    return read(csv_path), read(base + "_problems.csv"), json.loads(read(base + "_summary.json"))["metrics"]
+
+
+@pytest.fixture
+def reference(dataset_files, tmp_path):
+    csv_path = str(tmp_path / "reference.csv")
+    ProcessDataset(csv_path, 2).run(data_files=dataset_files, jobs=1)
+    return outputs(csv_path)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_resume_after_interruption_matches_full_run(dataset_files, reference, tmp_path, monkeypatch, jobs):
+    csv_path = str(tmp_path / "resumed.csv")
+    written = []
+    original_write_row = ProcessDataset.write_row
+
+    def interrupted_write_row(self, row_data):
+        # Interrompe no meio de um lote, depois do primeiro checkpoint
+        if len(written) == 3:
+            raise KeyboardInterrupt
+        written.append(row_data)
+        original_write_row(self, row_data)
+
+    monkeypatch.setattr(ProcessDataset, "write_row", interrupted_write_row)
+    with pytest.raises(KeyboardInterrupt):
+        ProcessDataset(csv_path, 2).run(data_files=dataset_files, jobs=jobs, chunksize=1)
+    monkeypatch.setattr(ProcessDataset, "write_row", original_write_row)
+
+    checkpoint = json.loads(read(csv_path + ".checkpoint.json"))
+    assert 0 < checkpoint["rows"] < 3
+    ProcessDataset(csv_path, 2).run(data_files=dataset_files, resume=True, jobs=jobs, chunksize=1)
+    assert outputs(csv_path) == reference
+
+
+def test_every_solution_has_a_row(reference):
+    solutions, problems = (list(csv.DictReader(io.StringIO(text))) for text in reference[:2])
+    # A solução com erro de sintaxe sai com status 'error' e métricas vazias, e conta no problema;
+    # o problema sem Python 3 tem agregado com 0 soluções
+    assert [(row["name"], row["solution_number"], row["status"]) for row in solutions] == [
+        ("problem-0", "0", "ok"), ("problem-0", "1", "ok"), ("problem-2", "0", "ok"), ("problem-2", "1", "ok"),
+        ("problem-3", "0", "error"), ("problem-4", "0", "ok"), ("problem-5", "0", "ok"), ("problem-5", "1", "ok"),
+        ("problem-6", "0", "ok")]
+    assert solutions[4]["sloc"] == "" and solutions[3]["sloc"] == "0"
+    assert [(row["name"], row["solutions"], row["sloc_max"]) for row in problems] == [
+        ("problem-0", "2", "2"), ("problem-1", "0", ""), ("problem-2", "2", "3"), ("problem-3", "1", ""),
+        ("problem-4", "1", "5"), ("problem-5", "2", "2"), ("problem-6", "1", "3")]
+
+
+def test_dataset_shards_merge_into_full_run(dataset_files, reference, tmp_path):
+    csv_path = str(tmp_path / "sharded.csv")
+    shard_outputs = []
+    for index in range(3):
+        processor = ProcessDataset(csv_path, 2, shard=(index, 3))
+        processor.run(data_files=dataset_files, jobs=1)
+        shard_outputs.append(processor.csv_path)
+    merged_path = str(tmp_path / "merged.csv")
+    subprocess.run([sys.executable, os.path.join(ROOT, "merge_shards.py"), "-o", merged_path, *shard_outputs],
+                   check=True, capture_output=True)
+    merged = outputs(merged_path)
+    assert merged[:2] == reference[:2]
+    # Contagens exatas; a soma pode diferir no último dígito pela ordem das parcelas
+    for name, metric in reference[2].items():
+        assert merged[2][name]["exact"] == metric["exact"]
+        assert merged[2][name]["count"] == metric["count"]
+
+
+def test_merge_rejects_missing_shard(dataset_files, tmp_path):
+    csv_path = str(tmp_path / "partial.csv")
+    shard_outputs = []
+    for index in range(2):
+        processor = ProcessDataset(csv_path, 2, shard=(index, 3))
+        processor.run(data_files=dataset_files, jobs=1)
+        shard_outputs.append(processor.csv_path)
+    merged_path = str(tmp_path / "merged.csv")
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "merge_shards.py"), "-o", merged_path,
+                             *shard_outputs], capture_output=True, text=True)
+    assert result.returncode != 0
+    assert "Missing shard(s) 2 of 3" in result.stderr
+    assert not os.path.exists(merged_path)
+
+
+def test_file_shards_merge_into_full_run(tmp_path):
+    metrics_script = os.path.join(ROOT, "metrics.py")
+    code_dir = os.path.join(ROOT, "code")
+    full = subprocess.run([sys.executable, metrics_script, code_dir, "--no-cache", "--format", "jsonl"],
+                          check=True, capture_output=True, text=True).stdout
+    output = str(tmp_path / "out.jsonl")
+    for index in range(3):
+        subprocess.run([sys.executable, metrics_script, code_dir, "--no-cache", "--shard", f"{index}/3",
+                        "-o", output], check=True, capture_output=True)
+    merged_path = str(tmp_path / "merged.jsonl")
+    subprocess.run([sys.executable, os.path.join(ROOT, "merge_shards.py"), "-o", merged_path,
+                    *(str(tmp_path / f"out.shard-{index}-of-3.jsonl") for index in range(3))],
+                   check=True, capture_output=True)
+    merged = read(merged_path).splitlines()
+    assert merged == sorted(full.splitlines(), key=lambda line: json.loads(line)["path"])
@@ -0,0 +1,65 @@
+import shutil
+import sqlite3
+import subprocess
+
+import pytest
+
+from gitHistory import GitHistory
+from metricRegistry import registry
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+METRIC_NAMES = [metric.name for metric in registry.resolve(None)]
+
+
+def git(repository, *args):
+    subprocess.run(["git", "-C", str(repository), *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def repository(tmp_path):
+    """
+    Dois commits: um pacote com __init__.py vazio e, no segundo, um arquivo
+    com erro de sintaxe (o módulo vazio é analisado normalmente).
+    """
+    path = tmp_path / "repo"
+    (path / "pkg").mkdir(parents=True)
+    git(path, "init", "-q")
+    git(path, "config", "user.email", "test@example.com")
+    git(path, "config", "user.name", "Test")
+    (path / "pkg" / "__init__.py").write_text("")
+    (path / "pkg" / "a.py").write_text("def f(x):\n    if x:\n        return 1\n    return 0\n")
+    git(path, "add", ".")
+    git(path, "commit", "-q", "-m", "first")
+    (path / "pkg" / "b.py").write_text("def (\n")
+    git(path, "add", ".")
+    git(path, "commit", "-q", "-m", "second")
+    return path
+
+
+def cache_entries(cache_dir):
+    with sqlite3.connect(str(cache_dir / "metrics_cache.sqlite")) as connection:
+        return connection.execute("SELECT COUNT(*), COUNT(error) FROM entries").fetchone()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_failed_blobs_are_counted_and_cached(repository, tmp_path, jobs, capsys):
+    cache_dir = tmp_path / "cache"
+    # Duas vezes: a segunda lê as falhas do cache como entradas negativas
+    for _ in range(2):
+        rows = []
+        commits, blobs, file_versions = GitHistory(str(repository)).run(
+            "HEAD", METRIC_NAMES, rows.append, jobs=jobs, cache_dir=str(cache_dir))
+        assert (commits, blobs, file_versions) == (2, 3, 5)
+        assert [(row["subject"], row["files"], row["failed"]) for row in rows] == [("first", 2, 0), ("second", 3, 1)]
+        assert rows[0]["cyclomatic_complexity_sum"] == rows[1]["cyclomatic_complexity_sum"]
+        # Gravado e confirmado: os três blobs, um deles como falha
+        assert cache_entries(cache_dir) == (3, 1)
+    errors = capsys.readouterr().err
+    assert "pkg/b.py" in errors and "pkg/__init__.py" not in errors
+
+
+def test_without_cache(repository):
+    rows = []
+    GitHistory(str(repository)).run("HEAD~1..HEAD", METRIC_NAMES, rows.append)
+    assert [(row["files"], row["new_blobs"], row["failed"]) for row in rows] == [(3, 3, 1)]
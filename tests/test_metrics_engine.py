@@ -0,0 +1,112 @@
+import ast
+import csv
+import glob
+import os
+
+import pytest
+
+from conftest import CODE_DIR, ROOT
+from complexipyComplexity import file_cognitive_complexity
+from metrics import Metrics
+
+# Métrica do engine -> método antigo do Metrics que calculava o mesmo valor com um parse próprio
+LEGACY_METHODS = {
+    "cyclomatic_complexity": "calculate_cyclomatic_complexity",
+    "radon_cc": "radon_cc",
+    "unique_operators": "calculate_unique_operators",
+    "total_statements": "calculate_total_statements",
+    "avg_nested_depth": "calculate_average_depth",
+    "total_operators": "calculate_total_operators",
+    "sloc": "calculate_sloc",
+    "cognitive_complexity": "calculate_cognitive_complexity",
+}
+
+SNIPPETS = {
+    "nested": "class A:\n    def f(self, x):\n        def g(y):\n            return [z for z in y if z]\n"
+              "        return g(x) or (lambda v: -v)(x)\n",
+    "control_flow": "def f(x):\n    try:\n        while x > 0:\n            x -= 1\n            if x == 3 and not x % 2:\n"
+                    "                break\n        else:\n            pass\n    except ValueError:\n        raise\n"
+                    "    finally:\n        x = ~x\n    return x if x else None\n",
+    "async_match": "async def f(items):\n    async for item in items:\n        match item:\n"
+                   "            case 1 | 2:\n                await g()\n            case _:\n                pass\n",
+    "comments": "# cabeçalho\n\nx = 1  # valor\n\n\n'''texto'''\ny = x ** 2 // 3\n",
+    "empty": "",
+}
+
+
+def parity_sources():
+    # Os exemplos do repositório, alguns módulos da biblioteca padrão e trechos com construções variadas
+    sources = [(os.path.relpath(path, ROOT), path) for path in sorted(glob.glob(os.path.join(CODE_DIR, "*.py")))]
+    stdlib = os.path.dirname(os.__file__)
+    sources += [(f"stdlib/{name}", os.path.join(stdlib, name))
+                for name in ("argparse.py", "csv.py", "heapq.py", "textwrap.py", "fractions.py", "shlex.py")]
+    return sources
+
+
+@pytest.mark.parametrize("label, path", parity_sources())
+def test_engine_matches_legacy_process_file(label, path):
+    with open(path, "r") as file:
+        code = file.read()
+    metrics = Metrics()
+    values = metrics.engine.analyze(code)
+    for metric, method in LEGACY_METHODS.items():
+        assert values[metric] == getattr(metrics, method)(code), metric
+
+
+@pytest.mark.parametrize("name", sorted(SNIPPETS))
+def test_engine_matches_legacy_on_snippets(name):
+    metrics = Metrics()
+    values = metrics.engine.analyze(SNIPPETS[name])
+    for metric, method in LEGACY_METHODS.items():
+        assert values[metric] == getattr(metrics, method)(SNIPPETS[name]), metric
+
+
+def test_engine_process_file_record(tmp_path):
+    # process_file devolve as métricas do engine com os mesmos nomes de coluna de antes
+    path = tmp_path / "sample.py"
+    path.write_text(SNIPPETS["control_flow"])
+    metrics_info = Metrics().process_file(str(path), None)
+    assert metrics_info.filename == str(path)
+    assert metrics_info.cyclomatic_complexity == Metrics().calculate_cyclomatic_complexity(SNIPPETS["control_flow"])
+
+
+def test_empty_module_has_no_cognitive_complexity():
+    # Módulo vazio: sem primeiro nó, a complexidade cognitiva é 0 nos dois caminhos
+    assert Metrics().engine.analyze("")["cognitive_complexity"] == 0
+    assert Metrics().calculate_cognitive_complexity("") == 0
+
+
+def test_complexipy_port_matches_complexipy_output():
+    # complexipy.csv: saída do complexipy original (`complexipy code -l file -o`) para os exemplos
+    with open(os.path.join(ROOT, "complexipy.csv"), newline="") as file:
+        expected = {row["Path"]: int(row["Cognitive Complexity"]) for row in csv.DictReader(file)}
+    assert expected
+    for path, complexity in expected.items():
+        with open(os.path.join(ROOT, path), "r") as file:
+            tree = ast.parse(file.read())
+        assert file_cognitive_complexity(tree) == complexity, path
+
+
+def elif_chain(branches):
+    # Cada elif é um If no orelse do anterior: a árvore fica tão funda quanto a cadeia é longa
+    return "def f(x):\n    if x == 0:\n        pass\n" + "".join(
+        f"    elif x == {index}:\n        pass\n" for index in range(1, branches))
+
+
+def test_deep_nesting_is_analyzed_without_recursion():
+    metrics = Metrics()
+    values = metrics.engine.analyze(elif_chain(1500))
+    assert values["complexipy_cognitive_complexity"] == 1500
+    assert values["cyclomatic_complexity"] == 1501
+    assert values["total_statements"] == 3001
+    # radon e cognitive_complexity recursivos: além do limite de recursão, métrica vazia
+    assert values["radon_cc"] is None and values["cognitive_complexity"] is None
+    [function] = metrics.engine.iter_functions(elif_chain(1500))
+    assert (function["radon_cc"], function["cognitive_complexity"]) == (None, None)
+    assert function["complexipy_cognitive_complexity"] == 1500
+
+
+def test_recursive_backends_below_the_limit():
+    values = Metrics().engine.analyze(elif_chain(100))
+    assert (values["radon_cc"], values["cognitive_complexity"], values["complexipy_cognitive_complexity"]) == (
+        101, 100, 100)
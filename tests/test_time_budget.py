@@ -0,0 +1,43 @@
+import signal
+import time
+
+import pytest
+
+from timeBudget import AnalysisTimeout, TimeBudget
+
+pytestmark = pytest.mark.skipif(not TimeBudget.available(), reason="SIGALRM timers are not available")
+
+
+def test_timeout_interrupts_the_block():
+    with pytest.raises(AnalysisTimeout):
+        with TimeBudget(0.05):
+            while True:
+                pass
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+    assert signal.getsignal(signal.SIGALRM) is signal.SIG_DFL
+
+
+def test_swallowed_timeout_is_raised_on_exit():
+    with pytest.raises(AnalysisTimeout):
+        with TimeBudget(0.01):
+            try:
+                time.sleep(0.05)
+            except BaseException:
+                pass
+
+
+def test_late_alarms_never_escape_the_block():
+    # Limites minúsculos: o alarme cai em qualquer ponto, inclusive em __enter__ e __exit__
+    escaped = 0
+    for _ in range(3000):
+        try:
+            try:
+                with TimeBudget(0.00002):
+                    sum(range(50))
+            except AnalysisTimeout:
+                pass
+            assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+            assert signal.getsignal(signal.SIGALRM) is signal.SIG_DFL
+        except AnalysisTimeout:
+            escaped += 1
+    assert escaped == 0
@@ -0,0 +1,74 @@
+"""
+Limite de tempo de parede para a análise de um arquivo. Uma entrada
+patológica não pode parar a execução inteira: passado o limite, a análise é
+interrompida e o arquivo sai como uma linha de timeout.
+
+Usa SIGALRM (setitimer), então só tem efeito na thread principal de sistemas
+POSIX; fora disso a análise roda sem limite. Código em C que não devolve o
+controle ao interpretador (um único ast.parse enorme) só é interrompido
+quando termina.
+"""
+import signal
+import threading
+
+
+class AnalysisTimeout(BaseException):
+    """
+    Análise interrompida pelo limite de tempo. Deriva de BaseException, como
+    KeyboardInterrupt, para não ser engolida pelos `except Exception` dos
+    backends (radon, cognitive_complexity).
+    """
+
+
+class TimeBudget:
+    """
+    Gerenciador de contexto: `with TimeBudget(seconds):` levanta
+    AnalysisTimeout no bloco quando o tempo acaba. Se algum código engolir a
+    exceção mesmo assim, ela é levantada de novo na saída: um resultado
+    interrompido nunca é usado.
+
+    O timer dispara uma única vez, e o tratador só levanta enquanto o bloco
+    está ativo (inside); fora disso só marca o limite como estourado. Ao
+    levantar, o tratador já devolve o SIGALRM ao tratador anterior. Assim um
+    alarme que chega em __enter__ ou em __exit__ não deixa timer armado nem
+    tratador trocado, e nenhum alarme chega depois do bloco.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expired = False
+        self.active = False
+        self.inside = False
+        self.previous_handler = None
+
+    @staticmethod
+    def available():
+        return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+    def __enter__(self):
+        self.expired = False
+        self.active = bool(self.seconds) and self.available()
+        if self.active:
+            self.previous_handler = signal.signal(signal.SIGALRM, self.on_alarm)
+            self.inside = True
+            signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        return self
+
+    def on_alarm(self, signum, frame):
+        self.expired = True
+        if self.inside:
+            self.inside = False
+            signal.signal(signal.SIGALRM, self.previous_handler)
+            raise AnalysisTimeout(f"analysis exceeded the time budget of {self.seconds:g}s")
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self.active:
+            # Nesta ordem: depois de setitimer(0) nenhum alarme novo é gerado, e um já recebido só
+            # marca expired (ou é descartado, se chegar a ser tratado depois da troca do tratador)
+            self.inside = False
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.previous_handler)
+            self.active = False
+        if self.expired and exc_type is None:
+            raise AnalysisTimeout(f"analysis exceeded the time budget of {self.seconds:g}s")
+        return False
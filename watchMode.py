@@ -0,0 +1,201 @@
+"""
+Modo --watch do metrics.py: o processo continua vivo depois da primeira
+análise, com os backends já importados e o resultado de cada arquivo em
+memória, e a cada mudança só os arquivos alterados são analisados de novo.
+
+As mudanças são detectadas por polling (sem dependências nem permissões
+especiais): a cada intervalo, um stat por arquivo e por diretório observado.
+A lista de arquivos só é refeita quando algum diretório muda (arquivo criado,
+removido ou renomeado). Mudanças em um .gitignore editado no lugar só valem
+na próxima vez que a lista for refeita.
+"""
+import hashlib
+import os
+import sys
+import time
+
+# Intervalo padrão entre duas verificações, em segundos
+DEFAULT_POLL_INTERVAL = 0.05
+
+
+def file_signature(path):
+    # Muda quando o arquivo é reescrito ou substituído (editores que gravam em outro arquivo e renomeiam)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class PollingWatcher:
+    """
+    Arquivos novos, alterados e removidos desde a verificação anterior.
+    discover(on_directory) devolve os caminhos dos arquivos e chama
+    on_directory com cada diretório antes de listá-lo; o estado do diretório é
+    guardado nesse momento, então nada criado durante a listagem se perde.
+    """
+
+    def __init__(self, discover):
+        self.discover = discover
+        # caminho -> assinatura, dos arquivos e dos diretórios observados
+        self.files = {}
+        self.directories = {}
+
+    def scan(self):
+        directories = {}
+
+        def on_directory(directory):
+            directories[directory] = file_signature(directory)
+
+        signatures = {}
+        for path in self.discover(on_directory):
+            signature = file_signature(path)
+            if signature is not None:
+                signatures[path] = signature
+        self.directories = directories
+        return signatures
+
+    def start(self):
+        self.files = self.scan()
+        return sorted(self.files)
+
+    def poll(self):
+        """
+        (alterados ou novos, removidos), cada lista em ordem de caminho.
+        """
+        if any(file_signature(directory) != signature for directory, signature in self.directories.items()):
+            current = self.scan()
+        else:
+            current = {}
+            for path in self.files:
+                signature = file_signature(path)
+                if signature is not None:
+                    current[path] = signature
+        changed = sorted(path for path, signature in current.items() if self.files.get(path) != signature)
+        removed = sorted(path for path in self.files if path not in current)
+        self.files = current
+        return changed, removed
+
+
+class WatchSession:
+    """
+    Resultado atual de cada arquivo e a saída atualizada a cada mudança. Nos
+    formatos de streaming (jsonl, csv) sai um registro por arquivo alterado,
+    com status 'ok', 'timeout', 'error' (o arquivo não passa mais pela
+    análise) ou 'removed', e vale o último registro de cada caminho; nas
+    tabelas ('table', 'plain') a tabela inteira é desenhada de novo.
+    """
+
+    def __init__(self, metrics_instance, watcher, output_format, output, make_renderer,
+                 poll_interval=None, jobs=1, cache_dir=None):
+        self.metrics_instance = metrics_instance
+        self.watcher = watcher
+        self.output_format = output_format
+        self.output = output
+        self.make_renderer = make_renderer
+        self.poll_interval = DEFAULT_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.jobs = jobs
+        self.cache_dir = cache_dir
+        # caminho -> MetricsInfo (sem o código) e hash do texto analisado
+        self.results = {}
+        self.digests = {}
+        self.streaming = output_format in ("jsonl", "csv")
+        # Um único renderer na sessão inteira: o cabeçalho do csv sai uma vez
+        self.renderer = make_renderer(output_format, metrics_instance, output) if self.streaming else None
+
+    def status_info(self, path, status):
+        # Linha sem métricas de um arquivo com erro ou removido
+        metric_names = self.metrics_instance.engine.metric_names
+        return self.metrics_instance.build_metrics_info(path, "", dict.fromkeys(metric_names), status)
+
+    def store(self, path, metrics_info):
+        if metrics_info is None:
+            metrics_info = self.status_info(path, "error")
+        elif metrics_info.status is None:
+            metrics_info.status = "ok"
+        # O texto não fica em memória, só o hash dele
+        metrics_info.code_source = ""
+        self.results[path] = metrics_info
+        return metrics_info
+
+    def analyze(self, path):
+        """
+        Analisa o arquivo de novo, a menos que o texto seja o mesmo da última
+        análise (só o mtime mudou). Devolve o novo MetricsInfo ou None.
+        """
+        try:
+            with open(path, 'r') as file:
+                code = file.read()
+        except (OSError, ValueError):
+            code = None
+        if code is not None:
+            digest = hashlib.blake2b(code.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+            if self.digests.get(path) == digest and path in self.results:
+                return None
+            self.digests[path] = digest
+        else:
+            self.digests.pop(path, None)
+        return self.store(path, self.metrics_instance.process_file(path, code))
+
+    def initial(self, paths):
+        if self.jobs != 1 and len(paths) > 1:
+            # Primeira análise no pool; as seguintes, de poucos arquivos, no próprio processo
+            from parallelMetrics import process_files_parallel
+            process_files_parallel(paths, self.jobs, self.cache_dir,
+                                   on_result=lambda metrics_info: self.store(metrics_info.filename, metrics_info),
+                                   metrics=self.metrics_instance.engine.metric_names,
+                                   time_budget=self.metrics_instance.time_budget)
+            for path in paths:
+                if path not in self.results:
+                    self.store(path, None)
+        else:
+            for path in paths:
+                self.analyze(path)
+        self.render([self.results[path] for path in paths])
+
+    def update(self, changed, removed):
+        start = time.perf_counter()
+        updates = []
+        for path in removed:
+            self.digests.pop(path, None)
+            if self.results.pop(path, None) is not None:
+                updates.append(self.status_info(path, "removed"))
+        for path in changed:
+            metrics_info = self.analyze(path)
+            if metrics_info is not None:
+                updates.append(metrics_info)
+        if updates:
+            self.render(updates)
+        elapsed = time.perf_counter() - start
+        print(f"[{time.strftime('%H:%M:%S')}] {len(updates)} updated ({len(changed)} changed, {len(removed)} removed) "
+              f"in {elapsed * 1000:.1f} ms; watching {len(self.results)} files", file=sys.stderr)
+
+    def render(self, updates):
+        if self.streaming:
+            for metrics_info in updates:
+                self.renderer.row(metrics_info)
+            return
+        if self.output.isatty():
+            # Limpa a tela antes de desenhar a tabela atualizada
+            self.output.write("\x1b[H\x1b[2J")
+        renderer = self.make_renderer(self.output_format, self.metrics_instance, self.output)
+        for path in sorted(self.results):
+            renderer.row(self.results[path])
+        renderer.close()
+        self.output.flush()
+
+    def run(self):
+        paths = self.watcher.start()
+        self.initial(paths)
+        print(f"Watching {len(paths)} files every {self.poll_interval * 1000:g} ms (Ctrl+C to stop)", file=sys.stderr)
+        try:
+            while True:
+                time.sleep(self.poll_interval)
+                changed, removed = self.watcher.poll()
+                if changed or removed:
+                    self.update(changed, removed)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.renderer is not None:
+                self.renderer.close()